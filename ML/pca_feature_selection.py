@@ -1,20 +1,91 @@
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
 import pandas as pd
 import numpy as np
-from sklearn.decomposition import PCA
+import joblib
+from joblib import Parallel, delayed
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.preprocessing import StandardScaler
-from sklearn.feature_selection import SelectKBest, f_classif, mutual_info_classif
-import matplotlib.pyplot as plt
-import seaborn as sns
+from sklearn.feature_selection import f_classif, mutual_info_classif
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
+from sklearn.pipeline import make_pipeline
+
+METHODS = ('pca', 'univariate', 'mutual_info')
+METHOD_NAMES = {'pca': 'PCA', 'univariate': 'Univariate', 'mutual_info': 'Mutual Info'}
+DEFAULT_COUNTS = (10, 15, 20)
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / '.feature_cache'
+# Rows from which PCA switches to randomized SVD, and to IncrementalPCA in batches
+RANDOMIZED_PCA_ROWS = 20000
+INCREMENTAL_PCA_ROWS = 500000
+INCREMENTAL_BATCH_SIZE = 50000
+
+def dataset_hash(X, y=None):
+    """Content hash of the feature matrix (and target): the cache key of everything fitted on it"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, X.columns))).encode())
+    digest.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    if y is not None:
+        digest.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+    return digest.hexdigest()[:16]
+
+def make_model():
+    """Classifier used to score candidate feature sets (the production model type)"""
+    return GradientBoostingClassifier(n_estimators=100, random_state=42)
+
+def _cv_score(X, y, features, cv, random_state):
+    """Mean cross-validated AUC and F1 of the production model on one feature subset"""
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    pipeline = make_pipeline(StandardScaler(), make_model())
+    scores = cross_validate(pipeline, X[list(features)], y, cv=folds, scoring=['roc_auc', 'f1'])
+    return {'auc': scores['test_roc_auc'].mean(), 'f1': scores['test_f1'].mean()}
 
 class CKDFeatureSelector:
-    def __init__(self):
+    """Feature selection for the CKD model
+    
+    The scaled matrix, PCA fit and per-feature scores of each method are
+    cached on disk under `cache_dir`, keyed by the dataset hash, so repeated
+    selections (other methods, other feature counts, later runs) refit nothing.
+    Independent fits (the selection methods, candidate evaluation) run in
+    parallel over `n_jobs` processes.
+    """
+    
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, n_jobs=-1, random_state=42):
         self.pca = None
         self.scaler = StandardScaler()
         self.selected_features = None
         self.feature_importance = None
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self._memory = {}
+    
+    def _cached(self, name, key, build):
+        """build() once per (name, dataset hash): in memory, then from cache_dir"""
+        memory_key = (name, key)
+        if memory_key in self._memory:
+            return self._memory[memory_key]
+        
+        path = self.cache_dir / f'{name}-{key}.joblib' if self.cache_dir else None
+        if path is not None and path.exists():
+            value = joblib.load(path)
+        else:
+            value = build()
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename so a concurrent reader never sees a partial file
+                tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+                joblib.dump(value, tmp_path)
+                os.replace(tmp_path, path)
+        self._memory[memory_key] = value
+        return value
     
-    def load_and_preprocess_data(self, csv_path):
-        """Load and preprocess CKD dataset"""
+    def load_and_preprocess_data(self, csv_path, features=None):
+        """Load and preprocess CKD dataset, optionally keeping only the given feature columns"""
         df = pd.read_csv(csv_path)
         
         # Remove non-numeric columns
@@ -24,6 +95,10 @@ class CKDFeatureSelector:
         # Remove ID columns and target
         exclude_cols = ['PatientID', 'Diagnosis', 'DoctorInCharge']
         feature_cols = [col for col in df_numeric.columns if col not in exclude_cols]
+        if features is not None:
+            feature_cols = [col for col in feature_cols if col in features]
+            if not feature_cols:
+                raise ValueError(f"{csv_path} has none of the features: {', '.join(features)}")
         
         X = df_numeric[feature_cols]
         y = df_numeric['Diagnosis'] if 'Diagnosis' in df_numeric.columns else None
@@ -33,20 +108,48 @@ class CKDFeatureSelector:
         
         return X, y, feature_cols
     
-    def perform_pca_analysis(self, X, n_components=None):
-        """Perform PCA and analyze component importance"""
-        # Standardize features
-        X_scaled = self.scaler.fit_transform(X)
-        
-        # Fit PCA
+    def make_pca(self, n_samples, n_features, n_components=None):
+        """PCA suited to the data size: exact, randomized SVD, or incremental in batches"""
         if n_components is None:
-            n_components = min(X.shape[0], X.shape[1])
+            n_components = min(n_samples, n_features)
+        if n_samples >= INCREMENTAL_PCA_ROWS:
+            return IncrementalPCA(n_components=n_components, batch_size=max(INCREMENTAL_BATCH_SIZE, n_components))
+        if n_samples >= RANDOMIZED_PCA_ROWS:
+            return PCA(n_components=n_components, svd_solver='randomized', random_state=self.random_state)
+        return PCA(n_components=n_components)
+    
+    def fit_scaled(self, X):
+        """(scaler, scaled matrix) for X, cached by dataset hash"""
+        def build():
+            scaler = StandardScaler()
+            if len(X) >= INCREMENTAL_PCA_ROWS:
+                # Fit in batches, then scale in place as float32 to bound memory
+                for start in range(0, len(X), INCREMENTAL_BATCH_SIZE):
+                    scaler.partial_fit(X.iloc[start:start + INCREMENTAL_BATCH_SIZE].to_numpy(dtype=np.float64))
+                return scaler, scaler.transform(X.to_numpy(dtype=np.float32), copy=False)
+            return scaler, scaler.fit_transform(X)
+        
+        return self._cached('scaled', dataset_hash(X), build)
+    
+    def fit_pca(self, X, n_components=None):
+        """PCA fitted on the scaled X, cached by dataset hash and component count"""
+        scaler, X_scaled = self.fit_scaled(X)
+        
+        def build():
+            return self.make_pca(*X_scaled.shape, n_components=n_components).fit(X_scaled)
         
-        self.pca = PCA(n_components=n_components)
-        X_pca = self.pca.fit_transform(X_scaled)
+        self.scaler = scaler
+        self.pca = self._cached(f'pca{n_components or ""}', dataset_hash(X), build)
+        return self.pca
+    
+    def perform_pca_analysis(self, X, n_components=None):
+        """Perform PCA and analyze component importance"""
+        pca = self.fit_pca(X, n_components)
+        _, X_scaled = self.fit_scaled(X)
+        X_pca = pca.transform(X_scaled)
         
         # Calculate explained variance
-        explained_variance_ratio = self.pca.explained_variance_ratio_
+        explained_variance_ratio = pca.explained_variance_ratio_
         cumulative_variance = np.cumsum(explained_variance_ratio)
         
         return X_pca, explained_variance_ratio, cumulative_variance
@@ -77,36 +180,99 @@ class CKDFeatureSelector:
         self.feature_importance = importance_df
         return importance_df
     
+    def feature_scores(self, X, y, method):
+        """Score of every feature under one method (higher is better), cached by dataset hash
+        
+        Scores don't depend on how many features are kept, so every feature
+        count reuses them: top-k is a sort.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method}; use one of {', '.join(METHODS)}")
+        
+        def build():
+            if method == 'pca':
+                pca = self.fit_pca(X)
+                n_components = self.select_optimal_components(pca.explained_variance_ratio_, threshold=0.95)
+                return np.sum(np.abs(pca.components_[:n_components]), axis=0)
+            if method == 'univariate':
+                scores, _ = f_classif(X, y)
+                return np.nan_to_num(scores)
+            return mutual_info_classif(X, y, random_state=self.random_state)
+        
+        key = dataset_hash(X, None if method == 'pca' else y)
+        return pd.Series(self._cached(f'scores-{method}', key, build), index=X.columns.tolist())
+    
+    def all_feature_scores(self, X, y, methods=METHODS):
+        """{method: scores} with uncached methods computed in parallel processes"""
+        scores = Parallel(n_jobs=min(self._jobs(), len(methods)))(
+            delayed(self.feature_scores)(X, y, method) for method in methods
+        )
+        scores = dict(zip(methods, scores))
+        # Parallel workers fill their own memory; keep the results here too
+        for method, values in scores.items():
+            key = dataset_hash(X, None if method == 'pca' else y)
+            self._memory[(f'scores-{method}', key)] = values.to_numpy()
+        return scores
+    
+    def _jobs(self):
+        if self.n_jobs in (None, -1):
+            return os.cpu_count() or 1
+        return max(self.n_jobs, 1)
+    
     def select_top_features(self, X, y, method='pca', n_features=15):
         """Select top features using different methods"""
-        feature_names = X.columns.tolist()
+        scores = self.feature_scores(X, y, method)
+        if method == 'pca':
+            self.feature_importance = pd.DataFrame({
+                'feature': scores.index,
+                'importance': scores.to_numpy()
+            }).sort_values('importance', ascending=False)
         
+        # Stable sort: ties keep column order
+        order = np.argsort(-scores.to_numpy(), kind='stable')[:n_features]
         if method == 'pca':
-            # Use PCA-based selection
-            _, explained_var, _ = self.perform_pca_analysis(X)
-            n_components = self.select_optimal_components(explained_var, threshold=0.95)
-            importance_df = self.get_feature_importance_from_pca(feature_names, n_components)
-            selected_features = importance_df.head(n_features)['feature'].tolist()
-            
-        elif method == 'univariate':
-            # Use univariate statistical tests
-            selector = SelectKBest(score_func=f_classif, k=n_features)
-            X_selected = selector.fit_transform(X, y)
-            selected_indices = selector.get_support(indices=True)
-            selected_features = [feature_names[i] for i in selected_indices]
-            
-        elif method == 'mutual_info':
-            # Use mutual information
-            selector = SelectKBest(score_func=mutual_info_classif, k=n_features)
-            X_selected = selector.fit_transform(X, y)
-            selected_indices = selector.get_support(indices=True)
-            selected_features = [feature_names[i] for i in selected_indices]
+            selected_features = scores.index[order].tolist()
+        else:
+            # SelectKBest order: dataset column order
+            selected_features = scores.index[np.sort(order)].tolist()
         
         self.selected_features = selected_features
         return selected_features
     
+    def evaluate_candidates(self, X, y, methods=METHODS, counts=DEFAULT_COUNTS, cv=5):
+        """Cross-validate every (method, feature count) candidate in parallel
+        
+        Returns a DataFrame (method, n_features, features, auc, f1) sorted
+        best-first by AUC, then F1, then fewer features.
+        """
+        key = hashlib.sha256(f'{dataset_hash(X, y)}:{sorted(methods)}:{sorted(counts)}:{cv}'.encode()).hexdigest()[:16]
+        return self._cached('candidates', key, lambda: self._evaluate_candidates(X, y, methods, counts, cv))
+    
+    def _evaluate_candidates(self, X, y, methods, counts, cv):
+        self.all_feature_scores(X, y, methods)
+        candidates = {}
+        for method in methods:
+            for n_features in counts:
+                features = tuple(self.select_top_features(X, y, method, min(n_features, X.shape[1])))
+                # Methods often agree: score each distinct subset once
+                candidates.setdefault(frozenset(features), []).append((method, len(features), features))
+        
+        subsets = list(candidates)
+        scores = Parallel(n_jobs=self._jobs())(
+            delayed(_cv_score)(X, y, candidates[subset][0][2], cv, self.random_state) for subset in subsets
+        )
+        rows = [
+            {'method': method, 'n_features': n_features, 'features': list(features), **score}
+            for subset, score in zip(subsets, scores)
+            for method, n_features, features in candidates[subset]
+        ]
+        results = pd.DataFrame(rows).sort_values(['auc', 'f1', 'n_features'], ascending=[False, False, True])
+        return results.reset_index(drop=True)
+    
     def plot_pca_analysis(self, explained_variance_ratio, cumulative_variance):
         """Plot PCA analysis results"""
+        import matplotlib.pyplot as plt
+        
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
         
         # Plot explained variance ratio
@@ -133,6 +299,9 @@ class CKDFeatureSelector:
         if self.feature_importance is None:
             raise ValueError("Feature importance not calculated yet")
         
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        
         plt.figure(figsize=(12, 8))
         top_features = self.feature_importance.head(top_n)
         
@@ -155,6 +324,65 @@ class CKDFeatureSelector:
         
         return report
 
+def run_selection_pipeline(csv_path, output_dir, methods=METHODS, counts=DEFAULT_COUNTS, cv=5,
+                           cache_dir=DEFAULT_CACHE_DIR, n_jobs=-1, features=None):
+    """Pick the best feature set, train the final model and write the MLService artifacts
+    
+    Candidates are drawn from `features` (every numeric column when None).
+    Writes best_ckd_model.pkl, feature_scaler.pkl, selected_features.pkl and
+    model_summary.json (plus the PCA importance and candidate comparison CSVs)
+    to output_dir. Returns the summary dict.
+    """
+    selector = CKDFeatureSelector(cache_dir=cache_dir, n_jobs=n_jobs)
+    X, y, feature_names = selector.load_and_preprocess_data(csv_path, features)
+    
+    candidates = selector.evaluate_candidates(X, y, methods, counts, cv)
+    best = candidates.iloc[0]
+    best_features = list(best['features'])
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X[best_features], y, test_size=0.2, random_state=42, stratify=y
+    )
+    final_scaler = StandardScaler()
+    X_train_scaled = final_scaler.fit_transform(X_train)
+    X_test_scaled = final_scaler.transform(X_test)
+    final_model = make_model().fit(X_train_scaled, y_train)
+    y_pred = final_model.predict(X_test_scaled)
+    y_pred_proba = final_model.predict_proba(X_test_scaled)[:, 1]
+    
+    cumulative_variance = np.cumsum(selector.fit_pca(X).explained_variance_ratio_)
+    summary_report = {
+        'best_model': 'Gradient Boosting',
+        'best_feature_set': f"{METHOD_NAMES[best['method']]} Top {best['n_features']}",
+        'n_features': len(best_features),
+        'selected_features': best_features,
+        'performance': {
+            'accuracy': accuracy_score(y_test, y_pred),
+            'precision': precision_score(y_test, y_pred),
+            'recall': recall_score(y_test, y_pred),
+            'f1_score': f1_score(y_test, y_pred),
+            'auc': roc_auc_score(y_test, y_pred_proba)
+        },
+        'pca_analysis': {
+            'components_for_95_variance': int(np.argmax(cumulative_variance >= 0.95) + 1),
+            'components_for_90_variance': int(np.argmax(cumulative_variance >= 0.90) + 1)
+        },
+        'dataset_hash': dataset_hash(X, y)
+    }
+    
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(final_model, output_dir / 'best_ckd_model.pkl')
+    joblib.dump(final_scaler, output_dir / 'feature_scaler.pkl')
+    joblib.dump(best_features, output_dir / 'selected_features.pkl')
+    selector.select_top_features(X, y, method='pca', n_features=len(feature_names))
+    selector.feature_importance.to_csv(output_dir / 'feature_importance_pca.csv', index=False)
+    candidates.to_csv(output_dir / 'model_comparison_results.csv', index=False)
+    with open(output_dir / 'model_summary.json', 'w') as f:
+        json.dump(summary_report, f, indent=2, default=str)
+    
+    return summary_report
+
 # Usage example
 def analyze_ckd_features():
     """Main function to analyze CKD features"""
@@ -191,4 +419,18 @@ def analyze_ckd_features():
     return selector, report
 
 if __name__ == "__main__":
-    selector, report = analyze_ckd_features()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='CKD feature selection')
+    parser.add_argument('--csv', default='Chronic_Kidney_Dsease_data.csv')
+    parser.add_argument('--output-dir', help='Run the selection pipeline and write model artifacts here')
+    parser.add_argument('--counts', type=int, nargs='+', default=list(DEFAULT_COUNTS), help='Feature counts to evaluate')
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+    
+    if args.output_dir:
+        summary = run_selection_pipeline(args.csv, args.output_dir, counts=args.counts, cv=args.cv,
+                                         cache_dir=args.cache_dir, n_jobs=args.n_jobs)
+        print(json.dumps(summary, indent=2, default=str))
+    else:
+        selector, report = analyze_ckd_features()
\ No newline at end of file
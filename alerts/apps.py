@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class AlertsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'alerts'
\ No newline at end of file
+    name = 'alerts'
+    
+    def ready(self):
+        from . import receivers  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,115 @@
+import uuid
+from collections import Counter, defaultdict
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from backend.events import send_patient_event
+from .counters import adjust_counters
+from .models import Alert, Notification
+
+MAX_IDS = 5000
+NOTIFICATION_BATCH_SIZE = 1000
+# Ids listed in a summary notification (counts are always complete)
+NOTIFICATION_MAX_IDS = 100
+
+def _uuid(value, name):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise ValueError(f'Invalid {name}: {value}')
+
+def acknowledge_filters(data):
+    """Alert filters from a bulk acknowledge body; raises ValueError with a client message"""
+    filters = {}
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or len(ids) > MAX_IDS:
+            raise ValueError(f'"ids" must be a list of at most {MAX_IDS} alert ids')
+        filters['id__in'] = [_uuid(value, 'alert id') for value in ids]
+    if data.get('patient_id'):
+        filters['patient_id'] = _uuid(data['patient_id'], 'patient id')
+    for name, choices in (('category', Alert.CATEGORIES), ('priority', Alert.PRIORITY_LEVELS)):
+        if data.get(name):
+            values = data[name] if isinstance(data[name], list) else [data[name]]
+            if not set(values) <= {choice for choice, _ in choices}:
+                raise ValueError(f'Invalid {name}: {", ".join(map(str, values))}')
+            filters[f'{name}__in'] = values
+    return filters
+
+def acknowledge_alerts(alerts, user):
+    """Acknowledge every unacknowledged alert in `alerts` with one UPDATE
+    
+    Unread counters are adjusted once per priority, the rest of the care team
+    gets one summary Notification each (bulk_create), and each
+    patient group receives a single 'alerts_acknowledged' event after commit.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            alerts.filter(acknowledged=False).select_for_update()
+            .values_list('id', 'patient_id', 'priority', 'title')
+        )
+        ids = [row[0] for row in rows]
+        acknowledged = Alert.objects.filter(id__in=ids, acknowledged=False).update(
+            acknowledged=True, acknowledged_by=user, acknowledged_at=now
+        )
+        
+        # update() skips post_save, so the counters are adjusted here
+        released = Counter(priority for _, _, priority, _ in rows)
+        adjust_counters({priority: -count for priority, count in released.items()})
+        
+        by_patient = defaultdict(list)
+        for alert_id, patient_id, priority, title in rows:
+            by_patient[patient_id].append({'id': str(alert_id), 'priority': priority, 'title': title})
+        
+        notifications = _notifications(by_patient, user, now)
+        Notification.objects.bulk_create(notifications, batch_size=NOTIFICATION_BATCH_SIZE)
+        
+        transaction.on_commit(lambda: _broadcast(by_patient, user, now))
+    
+    return {
+        'acknowledged': acknowledged,
+        'alert_ids': [str(alert_id) for alert_id in ids],
+        'patients': {str(patient_id): len(items) for patient_id, items in by_patient.items()},
+        'notifications': len(notifications),
+    }
+
+def _notifications(by_patient, user, now):
+    """One summary Notification per other active user for the whole bulk action
+    
+    Rows grow with the number of users only, not users x patients; the
+    per-patient detail goes out in the 'alerts_acknowledged' events.
+    """
+    if not by_patient:
+        return []
+    recipients = list(User.objects.filter(is_active=True).exclude(pk=user.pk).values_list('pk', flat=True))
+    acknowledged_by = user.get_full_name() or user.username
+    items = [item for patient_items in by_patient.values() for item in patient_items]
+    patients = len(by_patient)
+    title = f'{len(items)} alert{"s" if len(items) != 1 else ""} acknowledged'
+    if patients > 1:
+        title += f' for {patients} patients'
+    message = (f'{acknowledged_by} acknowledged: ' + ', '.join(item['title'] for item in items[:5])
+               + (f' and {len(items) - 5} more' if len(items) > 5 else ''))
+    data = {
+        'patient_ids': [str(patient_id) for patient_id in list(by_patient)[:NOTIFICATION_MAX_IDS]],
+        'alert_ids': [item['id'] for item in items[:NOTIFICATION_MAX_IDS]],
+        'patients': patients,
+        'alerts': len(items),
+        'acknowledged_by': user.pk,
+        'acknowledged_at': now.isoformat(),
+    }
+    if patients == 1:
+        data['patient_id'] = data['patient_ids'][0]
+    return [
+        Notification(user_id=recipient, type='alert', title=title, message=message, data=data)
+        for recipient in recipients
+    ]
+
+def _broadcast(by_patient, user, now):
+    for patient_id, items in by_patient.items():
+        send_patient_event(patient_id, 'alerts_acknowledged', {
+            'alerts': items,
+            'acknowledged_by': user.pk,
+            'acknowledged_at': now.isoformat(),
+        })
\ No newline at end of file
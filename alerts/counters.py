@@ -0,0 +1,52 @@
+from collections import Counter
+from django.db.models import Case, Count, F, Value, When
+from .models import Alert, AlertCounter
+
+PRIORITIES = [priority for priority, _ in Alert.PRIORITY_LEVELS]
+
+def state_deltas(old_state, new_state):
+    """Counter changes between two Alert.counted_state() values (None = no row)"""
+    deltas = Counter()
+    if old_state and old_state[1]:
+        deltas[old_state[0]] -= 1
+    if new_state and new_state[1]:
+        deltas[new_state[0]] += 1
+    return deltas
+
+def adjust_counters(deltas):
+    """Apply {priority: delta} to the unread counters, one UPDATE per priority"""
+    for priority, delta in deltas.items():
+        if not delta:
+            continue
+        updated = AlertCounter.objects.filter(priority=priority).update(unread=F('unread') + delta)
+        if not updated:
+            # Row not seeded yet: count once, it is maintained incrementally from here
+            recount_counters([priority])
+
+def recount_counters(priorities=None, using='default'):
+    """Reset counters from a COUNT(*) (seeding and repair only)"""
+    priorities = priorities or PRIORITIES
+    counts = dict(
+        Alert.objects.using(using).filter(acknowledged=False, priority__in=priorities)
+        .values_list('priority').annotate(count=Count('id'))
+    )
+    for priority in priorities:
+        AlertCounter.objects.using(using).update_or_create(priority=priority, defaults={'unread': counts.get(priority, 0)})
+    return counts
+
+def unread_counts():
+    """Unacknowledged alerts per priority plus total, read from the counter rows"""
+    counts = dict(AlertCounter.objects.values_list('priority', 'unread'))
+    if len(counts) < len(PRIORITIES):
+        recount_counters([priority for priority in PRIORITIES if priority not in counts])
+        counts = dict(AlertCounter.objects.values_list('priority', 'unread'))
+    counts = {priority: counts.get(priority, 0) for priority in PRIORITIES}
+    counts['total'] = sum(counts.values())
+    return counts
+
+def backfill_priority_ranks(using='default'):
+    """Set priority_rank on rows written before the column existed"""
+    return Alert.objects.using(using).update(priority_rank=Case(
+        *[When(priority=priority, then=Value(rank)) for priority, rank in Alert.PRIORITY_RANKS.items()],
+        default=Value(1)
+    ))
\ No newline at end of file
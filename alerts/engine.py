@@ -0,0 +1,281 @@
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from backend.events import send_patient_event
+from .counters import adjust_counters
+from .models import Alert
+from .rules import DEFAULT_RULES
+from .serializers import AlertSerializer
+
+KINDS = ('threshold', 'rate', 'flag')
+ALERT_FIELDS = ('title', 'message', 'priority', 'type', 'category')
+
+# Reading time of each observation model
+TIME_FIELDS = {
+    'KidneyMetrics': 'timestamp',
+    'LabResult': 'test_date',
+    'VitalSigns': 'timestamp',
+}
+
+class RuleError(ValueError):
+    pass
+
+class _Context(dict):
+    def __missing__(self, key):
+        return '-'
+
+def _number(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return '-'
+    return f'{float(value):.2f}'.rstrip('0').rstrip('.')
+
+def _window(delta):
+    hours = delta.total_seconds() / 3600
+    return f'{hours / 24:g} days' if hours >= 48 else f'{hours:g} hours'
+
+class CompiledRule:
+    """One rule declaration turned into a vectorized check over a batch frame"""
+    
+    def __init__(self, spec):
+        missing = [key for key in ('id', 'model', 'kind', 'field', *ALERT_FIELDS) if key not in spec]
+        if missing:
+            raise RuleError(f"Rule {spec.get('id', '?')} is missing: {', '.join(missing)}")
+        if spec['kind'] not in KINDS:
+            raise RuleError(f"Rule {spec['id']}: kind must be one of {', '.join(KINDS)}")
+        if spec['model'] not in TIME_FIELDS:
+            raise RuleError(f"Rule {spec['id']}: unknown model {spec['model']}")
+        if spec['priority'] not in Alert.PRIORITY_RANKS:
+            raise RuleError(f"Rule {spec['id']}: unknown priority {spec['priority']}")
+        
+        self.spec = spec
+        self.id = spec['id']
+        self.model = apps.get_model('medical_data', spec['model'])
+        self.time_field = TIME_FIELDS[spec['model']]
+        self.kind = spec['kind']
+        self.field = spec['field']
+        self.where = spec.get('where', {})
+        self.per = spec.get('per', [])
+        self.group = spec.get('group', self.id)
+        self.rank = Alert.PRIORITY_RANKS[spec['priority']]
+        self.cooldown = spec.get('cooldown', timedelta(0))
+        
+        for name in [self.field, *self.where, *self.per]:
+            self.model._meta.get_field(name)
+        if self.kind == 'threshold' and 'above' not in spec and 'below' not in spec:
+            raise RuleError(f"Rule {self.id}: threshold needs 'above' and/or 'below'")
+        if self.kind == 'rate':
+            if ('change' in spec) == ('percent' in spec) or 'window' not in spec:
+                raise RuleError(f"Rule {self.id}: rate needs 'window' and one of 'change' or 'percent'")
+            self.window = spec['window']
+            self.limit = spec.get('change', spec.get('percent'))
+    
+    def selected(self, frame):
+        mask = np.ones(len(frame), dtype=bool)
+        for name, value in self.where.items():
+            mask &= (frame[name] == value).to_numpy()
+        return mask
+    
+    def evaluate(self, frame):
+        """-> (bool mask over frame rows, {name: per-row array} for messages)"""
+        values = pd.to_numeric(frame[self.field], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        selected = self.selected(frame)
+        context = {'value': values}
+        
+        if self.kind == 'flag':
+            return selected & (frame[self.field] == True).to_numpy(), {}  # noqa: E712
+        
+        if self.kind == 'threshold':
+            hit = np.zeros(len(frame), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                if 'above' in self.spec:
+                    hit |= values > self.spec['above']
+                if 'below' in self.spec:
+                    hit |= values < self.spec['below']
+            return selected & hit, context
+        
+        baseline = self.baselines(frame, selected)
+        delta = values - baseline
+        with np.errstate(invalid='ignore', divide='ignore'):
+            percent = np.where(baseline != 0, delta / baseline * 100, np.nan)
+            change = percent if 'percent' in self.spec else delta
+            hit = change <= self.limit if self.limit < 0 else change >= self.limit
+        context.update(baseline=baseline, delta=delta, percent=percent)
+        return selected & hit & ~np.isnan(change), context
+    
+    def baselines(self, frame, selected):
+        """Per row, the extreme reading over the preceding window (max for declines, min for rises)
+        
+        One query loads every affected patient's readings for the window; the
+        rolling extreme runs per patient over the time-indexed series.
+        """
+        baseline = np.full(len(frame), np.nan)
+        if not selected.any():
+            return baseline
+        
+        rows = frame[selected]
+        readings = self.model.objects.filter(
+            patient_id__in=rows['patient_id'].unique().tolist(),
+            **{
+                f'{self.time_field}__gte': rows['time'].min() - self.window,
+                f'{self.time_field}__lte': rows['time'].max(),
+            },
+            **self.where
+        ).values_list('id', 'patient_id', self.time_field, self.field)
+        history = pd.DataFrame.from_records(list(readings), columns=['id', 'patient_id', 'time', 'value'])
+        if history.empty:
+            return baseline
+        
+        history['id'] = history['id'].astype(str)
+        history['patient_id'] = history['patient_id'].astype(str)
+        history['time'] = pd.to_datetime(history['time'], utc=True)
+        history['value'] = pd.to_numeric(history['value'], errors='coerce').astype(np.float64)
+        history = history.sort_values(['patient_id', 'time']).set_index('time')
+        
+        extreme = 'max' if self.limit < 0 else 'min'
+        grouped = history.groupby('patient_id')['value']
+        rolled = grouped.transform(lambda series: getattr(series.rolling(self.window), extreme)())
+        counts = grouped.transform(lambda series: series.rolling(self.window).count())
+        # A single reading in the window has nothing to compare against
+        rolled = rolled.where(counts >= 2)
+        
+        by_id = dict(zip(history['id'], rolled.to_numpy()))
+        return frame['id'].map(by_id).to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    def rule_id(self, row):
+        if not self.per:
+            return self.id
+        return ':'.join([self.id, *(str(row[name]) for name in self.per)])[:100]
+    
+    def build_alert(self, row, context, position):
+        values = _Context({
+            name: _number(value) if isinstance(value, (Decimal, float)) else ('-' if value is None else value)
+            for name, value in row.items()
+        })
+        for name, array in context.items():
+            values[name] = _number(abs(array[position]) if name in ('delta', 'percent') else array[position])
+        if self.kind == 'rate':
+            values['window'] = _window(self.window)
+        return Alert(
+            patient_id=row['patient_id'],
+            type=self.spec['type'],
+            title=self.spec['title'].format_map(values)[:200],
+            message=self.spec['message'].format_map(values),
+            priority=self.spec['priority'],
+            priority_rank=self.rank,
+            category=self.spec['category'],
+            rule_id=self.rule_id(row),
+        )
+
+_compiled = {}
+
+def compile_rules(specs):
+    """Rule declarations -> {model class: [CompiledRule]}"""
+    rules = {}
+    for spec in specs:
+        rule = CompiledRule(spec)
+        rules.setdefault(rule.model, []).append(rule)
+    return rules
+
+def get_rules():
+    """Compiled settings.ALERT_RULES (default alerts/rules.py), built once per process"""
+    if 'rules' not in _compiled:
+        _compiled['rules'] = compile_rules(getattr(settings, 'ALERT_RULES', None) or DEFAULT_RULES)
+    return _compiled['rules']
+
+def _frame(model, instances):
+    time_field = TIME_FIELDS[model.__name__]
+    frame = pd.DataFrame.from_records([
+        {field.attname: getattr(instance, field.attname) for field in model._meta.concrete_fields}
+        for instance in instances
+    ])
+    frame['id'] = frame['id'].astype(str)
+    frame['patient_id'] = [str(uuid.UUID(str(value))) for value in frame['patient_id']]
+    frame['time'] = pd.to_datetime(frame[time_field], utc=True)
+    return frame
+
+def evaluate_observations(model, instances, now=None):
+    """Run every rule for `model` over a batch of saved observations and raise alerts
+    
+    Each rule is one vectorized pass over the whole batch. Per patient, a rule
+    (or rule group) raises at most one alert per batch: the most urgent, then
+    the latest reading. Rules with an unacknowledged alert or one inside their
+    cooldown are skipped, checked with a single query. Returns the created alerts.
+    """
+    rules = get_rules().get(model)
+    if not rules or not instances:
+        return []
+    
+    frame = _frame(model, instances)
+    hits, contexts = [], []
+    for index, rule in enumerate(rules):
+        mask, context = rule.evaluate(frame)
+        positions = np.flatnonzero(mask)
+        if not len(positions):
+            continue
+        contexts.append(context)
+        rows = frame.iloc[positions]
+        hits.append(pd.DataFrame({
+            'rule': index,
+            'context': len(contexts) - 1,
+            'position': positions,
+            'group': rule.group,
+            'patient_id': rows['patient_id'].to_numpy(),
+            'key': rows[rule.per].astype(str).agg(':'.join, axis=1).to_numpy() if rule.per else '',
+            'rank': rule.rank,
+            'time': rows['time'].to_numpy(),
+        }))
+    if not hits:
+        return []
+    
+    # Most urgent, then latest, hit per (group, patient, per-values)
+    hits = pd.concat(hits, ignore_index=True).sort_values(['rank', 'time'], ascending=False)
+    hits = hits.drop_duplicates(['group', 'patient_id', 'key'])
+    winners = [
+        (rules[rule], frame.iloc[position], contexts[context], position)
+        for rule, context, position in zip(hits['rule'], hits['context'], hits['position'])
+    ]
+    
+    now = now or timezone.now()
+    suppressed = _suppressed(winners, now)
+    alerts = [
+        rule.build_alert(row, context, position)
+        for rule, row, context, position in winners
+        if (rule.rule_id(row), row['patient_id']) not in suppressed
+    ]
+    if not alerts:
+        return []
+    
+    with transaction.atomic():
+        Alert.objects.bulk_create(alerts)
+        # bulk_create skips post_save, so the counters are adjusted here
+        adjust_counters(Counter(alert.priority for alert in alerts))
+        transaction.on_commit(lambda: _broadcast(alerts))
+    return alerts
+
+def _suppressed(winners, now):
+    """(rule_id, patient_id) pairs with an open alert or one inside the rule's cooldown"""
+    cooldowns = {rule.rule_id(row): rule.cooldown for rule, row, _, _ in winners}
+    recent = Alert.objects.filter(
+        rule_id__in=list(cooldowns),
+        patient_id__in=list({row['patient_id'] for _, row, _, _ in winners}),
+    ).filter(
+        Q(acknowledged=False) | Q(created_at__gte=now - max(cooldowns.values()))
+    ).values_list('rule_id', 'patient_id', 'acknowledged', 'created_at')
+    
+    return {
+        (rule_id, str(patient_id))
+        for rule_id, patient_id, acknowledged, created_at in recent
+        if not acknowledged or created_at >= now - cooldowns[rule_id]
+    }
+
+def _broadcast(alerts):
+    for alert in alerts:
+        send_patient_event(alert.patient_id, 'new_alert', {'alert': AlertSerializer(alert).data})
\ No newline at end of file
@@ -0,0 +1,55 @@
+import base64
+import json
+import uuid
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from .models import Alert
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(alert):
+    """Opaque cursor pointing just past this alert in inbox order"""
+    raw = json.dumps([alert.priority_rank, alert.created_at.isoformat(), str(alert.pk)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, created_at, pk = json.loads(raw)
+        rank = int(rank)
+        created_at = parse_datetime(created_at)
+        # Alert ids are UUIDs; anything else would fail in the id__lt filter
+        pk = uuid.UUID(str(pk))
+    except (ValueError, TypeError, AttributeError):
+        raise InvalidCursor('Invalid cursor')
+    if created_at is None:
+        raise InvalidCursor('Invalid cursor')
+    return rank, created_at, pk
+
+def inbox_queryset(priorities=None, patient_ids=None):
+    """Unacknowledged alerts, most urgent first then newest (served by alerts_inbox_unack_idx)"""
+    alerts = Alert.objects.filter(acknowledged=False).select_related('patient')
+    if priorities:
+        alerts = alerts.filter(priority__in=priorities)
+    if patient_ids:
+        alerts = alerts.filter(patient_id__in=patient_ids)
+    return alerts.order_by('-priority_rank', '-created_at', '-id')
+
+def inbox_page(alerts, limit=DEFAULT_LIMIT, cursor=None):
+    """One keyset page of an inbox queryset -> (alerts, next cursor or None)"""
+    if cursor:
+        rank, created_at, pk = decode_cursor(cursor)
+        # The <= bound keeps the scan on the index; the OR breaks ties within a rank
+        alerts = alerts.filter(priority_rank__lte=rank).filter(
+            Q(priority_rank__lt=rank)
+            | Q(created_at__lt=created_at)
+            | Q(created_at=created_at, id__lt=pk)
+        )
+    
+    rows = list(alerts[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
\ No newline at end of file
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from alerts.counters import backfill_priority_ranks, recount_counters, unread_counts
+
+class Command(BaseCommand):
+    help = 'Recompute alert priority ranks and the unread counters from the alerts table'
+    
+    def handle(self, *args, **options):
+        backfill_priority_ranks()
+        recount_counters()
+        counts = unread_counts()
+        self.stdout.write(self.style.SUCCESS(
+            'Alert counters recounted: ' + ', '.join(f'{name}={count}' for name, count in counts.items())
+        ))
\ No newline at end of file
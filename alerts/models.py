@@ -17,6 +17,14 @@ class Alert(models.Model):
         ('critical', 'Critical'),
     ]
     
+    # Inbox sort key: higher is more urgent
+    PRIORITY_RANKS = {
+        'low': 0,
+        'medium': 1,
+        'high': 2,
+        'critical': 3,
+    }
+    
     CATEGORIES = [
         ('lab', 'Lab Result'),
         ('vital', 'Vital Signs'),
@@ -31,7 +39,10 @@ class Alert(models.Model):
     title = models.CharField(max_length=200)
     message = models.TextField()
     priority = models.CharField(max_length=20, choices=PRIORITY_LEVELS, default='medium')
+    priority_rank = models.PositiveSmallIntegerField(default=1, editable=False)
     category = models.CharField(max_length=20, choices=CATEGORIES, default='system')
+    # Set when raised by the rule engine (alerts/rules.py); used for dedup and cooldowns
+    rule_id = models.CharField(max_length=100, null=True, blank=True)
     acknowledged = models.BooleanField(default=False)
     acknowledged_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     acknowledged_at = models.DateTimeField(null=True, blank=True)
@@ -43,8 +54,42 @@ class Alert(models.Model):
             models.Index(fields=['patient', '-created_at']),
             models.Index(fields=['acknowledged']),
             models.Index(fields=['priority']),
+            models.Index(fields=['patient', 'rule_id', '-created_at']),
+            # Alert inbox: unacknowledged rows only, in inbox order
+            models.Index(
+                fields=['-priority_rank', '-created_at', '-id'],
+                condition=models.Q(acknowledged=False),
+                name='alerts_inbox_unack_idx'
+            ),
         ]
         ordering = ['-created_at']
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the unread counters saw, so saves can adjust them
+        if 'priority' in field_names and 'acknowledged' in field_names:
+            instance._counted_state = instance.counted_state()
+        return instance
+    
+    def counted_state(self):
+        """(priority, unacknowledged) as reflected in AlertCounter"""
+        return (self.priority, not self.acknowledged)
+    
+    def save(self, *args, **kwargs):
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, 1)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'priority_rank'}
+        super().save(*args, **kwargs)
+
+class AlertCounter(models.Model):
+    """Unacknowledged alerts per priority, maintained incrementally for O(1) badges"""
+    priority = models.CharField(max_length=20, primary_key=True, choices=Alert.PRIORITY_LEVELS)
+    unread = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'alert_counters'
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
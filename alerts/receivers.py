@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from medical_data.signals import observations_recorded
+from .counters import adjust_counters, backfill_priority_ranks, recount_counters, state_deltas
+from .models import Alert, AlertCounter
+
+@receiver(post_save, sender=Alert)
+def update_alert_counters(sender, instance, created, **kwargs):
+    old_state = None if created else getattr(instance, '_counted_state', None)
+    new_state = instance.counted_state()
+    adjust_counters(state_deltas(old_state, new_state))
+    instance._counted_state = new_state
+
+@receiver(post_delete, sender=Alert)
+def release_alert_counters(sender, instance, **kwargs):
+    old_state = getattr(instance, '_counted_state', instance.counted_state())
+    adjust_counters(state_deltas(old_state, None))
+
+@receiver(post_migrate)
+def seed_alert_counters(sender, using='default', **kwargs):
+    if sender.name != 'alerts':
+        return
+    # Nothing to seed while the tables don't exist (fresh database, `migrate alerts zero`)
+    tables = connections[using].introspection.table_names()
+    if Alert._meta.db_table in tables and AlertCounter._meta.db_table in tables:
+        backfill_priority_ranks(using)
+        recount_counters(using=using)
+
+@receiver(observations_recorded)
+def evaluate_alert_rules(sender, instances, **kwargs):
+    if not getattr(settings, 'ALERT_RULES_ENABLED', True):
+        return
+    from .engine import evaluate_observations
+    try:
+        evaluate_observations(sender, instances)
+    except Exception as e:
+        # Rule failures must never fail the write that recorded the observations
+        print(f"Alert rule evaluation failed for {len(instances)} {sender.__name__} rows: {e}")
\ No newline at end of file
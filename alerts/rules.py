@@ -0,0 +1,191 @@
+from datetime import timedelta
+
+# Alert rules evaluated on every recorded observation (see alerts/engine.py).
+# Override with settings.ALERT_RULES.
+#
+# Every rule has an "id", the observation "model", a "kind" and the Alert
+# fields to create ("title", "message", "priority", "type", "category").
+# Kinds:
+#   threshold  "field" is "above" and/or "below" a value (strict)
+#   rate       "field" changed by at least "change" (absolute) or "percent"
+#              within "window"; negative values mean a decline
+#   flag       boolean "field" is set
+# Optional:
+#   where      {field: value} the observation must match (e.g. a lab test name)
+#   per        fields that split the rule into separate alerts (rule_id "<id>:<values>")
+#   group      rules sharing a group raise only their most urgent alert per batch
+#   cooldown   no new alert for the same rule and patient within this time
+#              (an unacknowledged one always suppresses it)
+# Messages are formatted with the observation's fields plus {value},
+# {baseline}, {delta}, {percent} and {window}.
+DEFAULT_RULES = [
+    # Kidney function
+    {
+        'id': 'egfr_kidney_failure',
+        'model': 'KidneyMetrics',
+        'kind': 'threshold',
+        'field': 'egfr',
+        'below': 15,
+        'group': 'egfr',
+        'priority': 'critical',
+        'type': 'critical',
+        'category': 'lab',
+        'title': 'eGFR in Kidney Failure Range',
+        'message': 'Patient eGFR is {value}, below 15 (stage 5)',
+        'cooldown': timedelta(hours=24),
+    },
+    {
+        'id': 'egfr_critical',
+        'model': 'KidneyMetrics',
+        'kind': 'threshold',
+        'field': 'egfr',
+        'below': 30,
+        'group': 'egfr',
+        'priority': 'high',
+        'type': 'critical',
+        'category': 'lab',
+        'title': 'Critical eGFR Level',
+        'message': 'Patient eGFR is {value}, indicating severe kidney dysfunction',
+        'cooldown': timedelta(hours=24),
+    },
+    {
+        'id': 'egfr_rapid_decline',
+        'model': 'KidneyMetrics',
+        'kind': 'rate',
+        'field': 'egfr',
+        'percent': -25,
+        'window': timedelta(days=365),
+        'priority': 'high',
+        'type': 'warning',
+        'category': 'lab',
+        'title': 'Rapid eGFR Decline',
+        'message': 'eGFR fell {percent}% to {value} from {baseline} within {window}',
+        'cooldown': timedelta(days=7),
+    },
+    {
+        'id': 'creatinine_acute_rise',
+        'model': 'KidneyMetrics',
+        'kind': 'rate',
+        'field': 'creatinine',
+        'change': 0.3,
+        'window': timedelta(hours=48),
+        'priority': 'critical',
+        'type': 'critical',
+        'category': 'lab',
+        'title': 'Possible Acute Kidney Injury',
+        'message': 'Creatinine rose {delta} mg/dL to {value} within {window}',
+        'cooldown': timedelta(hours=24),
+    },
+    # Vital signs
+    {
+        'id': 'bp_crisis',
+        'model': 'VitalSigns',
+        'kind': 'threshold',
+        'field': 'systolic_bp',
+        'above': 180,
+        'group': 'bp',
+        'priority': 'critical',
+        'type': 'critical',
+        'category': 'vital',
+        'title': 'Hypertensive Crisis',
+        'message': 'Systolic BP is {value} mmHg',
+        'cooldown': timedelta(hours=6),
+    },
+    {
+        'id': 'bp_diastolic_crisis',
+        'model': 'VitalSigns',
+        'kind': 'threshold',
+        'field': 'diastolic_bp',
+        'above': 120,
+        'group': 'bp',
+        'priority': 'critical',
+        'type': 'critical',
+        'category': 'vital',
+        'title': 'Hypertensive Crisis',
+        'message': 'Diastolic BP is {value} mmHg',
+        'cooldown': timedelta(hours=6),
+    },
+    {
+        'id': 'bp_high',
+        'model': 'VitalSigns',
+        'kind': 'threshold',
+        'field': 'systolic_bp',
+        'above': 160,
+        'group': 'bp',
+        'priority': 'high',
+        'type': 'warning',
+        'category': 'vital',
+        'title': 'High Blood Pressure',
+        'message': 'Systolic BP is {value} mmHg - requires attention',
+        'cooldown': timedelta(hours=12),
+    },
+    {
+        'id': 'heart_rate_abnormal',
+        'model': 'VitalSigns',
+        'kind': 'threshold',
+        'field': 'heart_rate',
+        'above': 120,
+        'below': 45,
+        'priority': 'high',
+        'type': 'warning',
+        'category': 'vital',
+        'title': 'Abnormal Heart Rate',
+        'message': 'Heart rate is {value} bpm',
+        'cooldown': timedelta(hours=6),
+    },
+    {
+        'id': 'fever',
+        'model': 'VitalSigns',
+        'kind': 'threshold',
+        'field': 'temperature',
+        'above': 38.5,
+        'priority': 'medium',
+        'type': 'warning',
+        'category': 'vital',
+        'title': 'Fever',
+        'message': 'Temperature is {value} °C',
+        'cooldown': timedelta(hours=12),
+    },
+    {
+        'id': 'weight_rapid_gain',
+        'model': 'VitalSigns',
+        'kind': 'rate',
+        'field': 'weight',
+        'change': 2,
+        'window': timedelta(hours=72),
+        'priority': 'medium',
+        'type': 'warning',
+        'category': 'vital',
+        'title': 'Rapid Weight Gain',
+        'message': 'Weight rose {delta} kg to {value} within {window}, possible fluid retention',
+        'cooldown': timedelta(days=2),
+    },
+    # Lab results
+    {
+        'id': 'potassium_high',
+        'model': 'LabResult',
+        'kind': 'threshold',
+        'field': 'value',
+        'where': {'test_name': 'Potassium'},
+        'above': 6.0,
+        'priority': 'critical',
+        'type': 'critical',
+        'category': 'lab',
+        'title': 'Hyperkalemia',
+        'message': 'Potassium is {value} {unit}',
+        'cooldown': timedelta(hours=12),
+    },
+    {
+        'id': 'lab_abnormal',
+        'model': 'LabResult',
+        'kind': 'flag',
+        'field': 'is_abnormal',
+        'per': ['test_name'],
+        'priority': 'medium',
+        'type': 'warning',
+        'category': 'lab',
+        'title': 'Abnormal {test_name}',
+        'message': '{test_name} is {value} {unit} (reference range: {reference_range})',
+        'cooldown': timedelta(hours=24),
+    },
+]
\ No newline at end of file
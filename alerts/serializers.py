@@ -5,10 +5,20 @@ class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
         fields = [
-            'id', 'type', 'title', 'message', 'priority', 'category',
+            'id', 'type', 'title', 'message', 'priority', 'category', 'rule_id',
             'acknowledged', 'acknowledged_by', 'acknowledged_at', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'rule_id', 'created_at']
+
+class AlertInboxSerializer(AlertSerializer):
+    patient_id = serializers.UUIDField(read_only=True)
+    patient_name = serializers.SerializerMethodField()
+    
+    class Meta(AlertSerializer.Meta):
+        fields = ['patient_id', 'patient_name', *AlertSerializer.Meta.fields]
+    
+    def get_patient_name(self, obj):
+        return f"{obj.patient.first_name} {obj.patient.last_name}"
 
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,6 +12,15 @@ urlpatterns = [
     path('alerts/', AlertViewSet.as_view({
         'post': 'create'
     }), name='create-alert'),
+    path('alerts/inbox/', AlertViewSet.as_view({
+        'get': 'inbox'
+    }), name='alert-inbox'),
+    path('alerts/counts/', AlertViewSet.as_view({
+        'get': 'counts'
+    }), name='alert-counts'),
+    path('alerts/acknowledge/', AlertViewSet.as_view({
+        'post': 'bulk_acknowledge'
+    }), name='bulk-acknowledge-alerts'),
     path('alerts/<uuid:pk>/acknowledge/', AlertViewSet.as_view({
         'put': 'acknowledge_alert'
     }), name='acknowledge-alert'),
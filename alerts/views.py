@@ -1,11 +1,16 @@
+import uuid
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from patients.models import Patient
+from .bulk import acknowledge_alerts, acknowledge_filters
+from .counters import adjust_counters, unread_counts
+from .inbox import DEFAULT_LIMIT, MAX_LIMIT, InvalidCursor, inbox_page, inbox_queryset
 from .models import Alert, Notification
-from .serializers import AlertSerializer, NotificationSerializer
+from .serializers import AlertInboxSerializer, AlertSerializer, NotificationSerializer
 
 class AlertViewSet(viewsets.ModelViewSet):
     queryset = Alert.objects.all()
@@ -21,20 +26,106 @@ class AlertViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         })
     
+    @action(detail=False, methods=['get'], url_path='inbox')
+    def inbox(self, request):
+        """Unacknowledged alerts across patients, by priority then recency
+        
+        ?priority=critical,high and ?patient_id=<uuid>,... filter; ?limit and
+        ?cursor page through with meta.next_cursor.
+        """
+        params = request.query_params
+        priorities = [value for value in params.get('priority', '').split(',') if value]
+        unknown = set(priorities) - set(Alert.PRIORITY_RANKS)
+        if unknown:
+            return Response({
+                'success': False,
+                'error': {'message': f'Unknown priority: {", ".join(sorted(unknown))}'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            patient_ids = [str(uuid.UUID(value)) for value in params.get('patient_id', '').split(',') if value]
+            limit = min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+            if limit < 1:
+                raise ValueError
+            alerts, next_cursor = inbox_page(
+                inbox_queryset(priorities, patient_ids), limit, params.get('cursor')
+            )
+        except InvalidCursor as e:
+            return Response({
+                'success': False,
+                'error': {'message': str(e)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': {'message': '"limit" must be a positive integer and "patient_id" valid UUIDs'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': AlertInboxSerializer(alerts, many=True).data,
+            'meta': {
+                'limit': limit,
+                'has_more': next_cursor is not None,
+                'next_cursor': next_cursor,
+                'unread': unread_counts()
+            }
+        })
+    
+    @action(detail=False, methods=['get'], url_path='counts')
+    def counts(self, request):
+        return Response({
+            'success': True,
+            'data': unread_counts()
+        })
+    
     @action(detail=True, methods=['put'], url_path='acknowledge')
     def acknowledge_alert(self, request, pk=None):
         alert = get_object_or_404(Alert, pk=pk)
-        alert.acknowledged = True
-        alert.acknowledged_by = request.user
-        alert.acknowledged_at = timezone.now()
-        alert.save()
+        # Conditional UPDATE: of two concurrent acks only one changes the row,
+        # so only that one releases the unread counter
+        with transaction.atomic():
+            acknowledged = Alert.objects.filter(pk=alert.pk, acknowledged=False).update(
+                acknowledged=True, acknowledged_by=request.user, acknowledged_at=timezone.now()
+            )
+            if acknowledged:
+                # update() skips post_save, so the counters are adjusted here
+                adjust_counters({alert.priority: -1})
         
-        serializer = AlertSerializer(alert)
+        serializer = AlertSerializer(Alert.objects.get(pk=alert.pk))
         return Response({
             'success': True,
             'data': serializer.data
         })
     
+    @action(detail=False, methods=['post'], url_path='acknowledge')
+    def bulk_acknowledge(self, request):
+        """Acknowledge many alerts at once
+        
+        Body: {"ids": [...]} and/or filters "patient_id", "category",
+        "priority" (a value or a list). At least one selector is required.
+        """
+        try:
+            filters = acknowledge_filters(request.data)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': {'message': str(e)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not filters:
+            return Response({
+                'success': False,
+                'error': {'message': 'Provide "ids" or at least one of "patient_id", "category", "priority"'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = acknowledge_alerts(Alert.objects.filter(**filters), request.user)
+        return Response({
+            'success': True,
+            'data': result,
+            'meta': {'unread': unread_counts()}
+        })
+    
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
         return Response({
@@ -0,0 +1,5 @@
+try:
+    # Celery is only needed when analysis jobs run with ML_JOB_BACKEND = 'celery'
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
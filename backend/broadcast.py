@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Ward-level group: connections that subscribe with "ward": true get every
+# ward-wide event (e.g. all patients' latest readings)
+GLOBAL_GROUP = 'patient_updates'
+
+# Events that only carry a patient's latest state: a newer one replaces an
+# older one with the same key, both while coalescing and in a slow client's
+# send queue. Everything else is always delivered.
+SUPERSEDED_EVENTS = {'patient_update'}
+
+# Client frame for each event type (the PatientUpdateConsumer handler name)
+RENDERERS = {
+    'patient_update': lambda event: {
+        'type': 'patient-update',
+        'patientId': event['patient_id'],
+        'kind': event.get('kind'),
+        'data': event['data']
+    },
+    'new_alert': lambda event: {
+        'type': 'new-alert',
+        'patientId': event['patient_id'],
+        'alert': event['alert']
+    },
+    'lab_result': lambda event: {
+        'type': 'lab-result',
+        'patientId': event['patient_id'],
+        'result': event['result']
+    },
+    'analysis_complete': lambda event: {
+        'type': 'analysis-complete',
+        'patientId': event['patient_id'],
+        'jobId': event['job_id'],
+        'status': event['status'],
+        'prediction': event.get('prediction'),
+        'error': event.get('error')
+    },
+    'alerts_acknowledged': lambda event: {
+        'type': 'alerts-acknowledged',
+        'patientId': event['patient_id'],
+        'alerts': event['alerts'],
+        'acknowledgedBy': event['acknowledged_by'],
+        'acknowledgedAt': event['acknowledged_at']
+    },
+}
+
+def event_type_for(client_type):
+    """'patient-update' (as clients name it) -> 'patient_update', or None if unknown"""
+    event_type = str(client_type).replace('-', '_')
+    return event_type if event_type in RENDERERS else None
+
+def render(event):
+    return RENDERERS[event['type']](event)
+
+def coalesce_key(event):
+    """Key under which a newer event replaces this one, or None if it must be delivered"""
+    if event['type'] not in SUPERSEDED_EVENTS:
+        return None
+    return f"{event['type']}:{event['patient_id']}:{event.get('kind', '')}"
+
+def encode_frame(events):
+    """One JSON text for a list of events: the event itself when alone, else a batch"""
+    frames = [render(event) for event in events]
+    frame = frames[0] if len(frames) == 1 else {'type': 'batch', 'events': frames}
+    return json.dumps(frame, cls=DjangoJSONEncoder)
+
+class Broadcaster:
+    """Coalesces events per channel group and sends them as pre-serialized frames
+    
+    Events published to a group within `window` seconds are merged: a newer
+    superseding event (see SUPERSEDED_EVENTS) replaces the pending one with
+    the same key. On flush each group gets one group_send message per event
+    type, carrying the frame already encoded as JSON so consumers forward it
+    as-is instead of serializing once per subscriber. With window 0 events are sent
+    immediately.
+    """
+    
+    def __init__(self, window=None):
+        self.window = window
+        self._pending = {}
+        self._sequence = count()
+        self._timer = None
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'coalesced': 0, 'frames': 0, 'failed': 0}
+    
+    def get_window(self):
+        if self.window is not None:
+            return self.window
+        return getattr(settings, 'BROADCAST_WINDOW_MS', 50) / 1000
+    
+    def publish(self, group, event):
+        window = self.get_window()
+        with self._lock:
+            self._stats['published'] += 1
+            pending = self._pending.setdefault(group, OrderedDict())
+            key = coalesce_key(event) or next(self._sequence)
+            if key in pending:
+                # Move to the end so frames keep publish order
+                del pending[key]
+                self._stats['coalesced'] += 1
+            pending[key] = (event, time.time())
+            
+            if window > 0 and self._timer is None:
+                self._timer = threading.Timer(window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        if window <= 0:
+            self.flush()
+    
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        
+        if not pending:
+            return
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        
+        messages = []
+        for group, events in pending.items():
+            # One frame per event type, so consumers can filter whole frames by type
+            # and slow clients can drop latest-state frames once superseded
+            batches = OrderedDict()
+            for event, published_at in events.values():
+                batches.setdefault((event['type'], bool(event.get('ward_wide'))), []).append((event, published_at))
+            for (event_type, ward_wide), batch in batches.items():
+                frame_events = [event for event, _ in batch]
+                keys = [coalesce_key(event) for event in frame_events] if event_type in SUPERSEDED_EVENTS else None
+                messages.append((group, {
+                    'type': 'broadcast.frame',
+                    'group': group,
+                    'event_type': event_type,
+                    'ward_wide': ward_wide,
+                    'text': encode_frame(frame_events),
+                    'keys': keys,
+                    # Oldest event in the frame, for publish-to-deliver latency
+                    'published_at': min(published_at for _, published_at in batch),
+                }))
+        async_to_sync(self._deliver)(channel_layer, messages)
+    
+    async def _deliver(self, channel_layer, messages):
+        for group, message in messages:
+            try:
+                await channel_layer.group_send(group, message)
+                sent = 'frames'
+            except Exception as e:
+                print(f"Failed to broadcast to {group}: {e}")
+                sent = 'failed'
+            with self._lock:
+                self._stats[sent] += 1
+    
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'window_ms': round(self.get_window() * 1000, 3)}
+
+broadcaster = Broadcaster()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict, deque
+from channels.layers import InMemoryChannelLayer
+
+LATENCY_SAMPLES = 1000
+
+class LocalChannelLayer(InMemoryChannelLayer):
+    """In-process channel layer for single-node and test runs (no Redis)
+    
+    Unlike InMemoryChannelLayer it may be published to from any thread:
+    sends from outside the server's event loop (views, worker threads, the
+    broadcaster's flush timer) are handed to that loop, where consumers wait
+    on their queues.
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._loop = None
+    
+    def _remember_loop(self):
+        self._loop = asyncio.get_running_loop()
+    
+    def _other_loop(self):
+        loop = self._loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            return None
+        return loop if loop is not asyncio.get_running_loop() else None
+    
+    async def _on_loop(self, loop, coroutine):
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+    
+    async def receive(self, channel):
+        self._remember_loop()
+        return await super().receive(channel)
+    
+    async def group_add(self, group, channel):
+        self._remember_loop()
+        return await super().group_add(group, channel)
+    
+    async def send(self, channel, message):
+        loop = self._other_loop()
+        if loop is not None:
+            return await self._on_loop(loop, InMemoryChannelLayer.send(self, channel, message))
+        return await super().send(channel, message)
+    
+    async def group_send(self, group, message):
+        loop = self._other_loop()
+        if loop is not None:
+            return await self._on_loop(loop, InMemoryChannelLayer.group_send(self, group, message))
+        return await super().group_send(group, message)
+
+class LatencyStats:
+    """Publish-to-deliver latency per transport over the last LATENCY_SAMPLES frames"""
+    
+    def __init__(self, size=LATENCY_SAMPLES):
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+    
+    def record(self, transport, published_at):
+        if published_at is None:
+            return
+        latency = max(time.time() - published_at, 0.0)
+        with self._lock:
+            self._samples[transport].append(latency)
+            self._counts[transport] += 1
+    
+    def stats(self):
+        with self._lock:
+            result = {}
+            for transport, samples in self._samples.items():
+                ordered = sorted(samples)
+                percentile = lambda p: round(ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000, 3)
+                result[transport] = {
+                    'delivered': self._counts[transport],
+                    'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+                    'p50_ms': percentile(0.5),
+                    'p95_ms': percentile(0.95),
+                    'max_ms': round(ordered[-1] * 1000, 3),
+                }
+            return result
+
+latency = LatencyStats()
\ No newline at end of file
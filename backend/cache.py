@@ -0,0 +1,105 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+
+ALL_PATIENTS = 'all'
+_MISSING = object()
+
+_lock = threading.Lock()
+_counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_invalidations = {'patients': 0}
+
+def _normalize(patient_id):
+    """Canonical str(UUID) so differently formatted ids share a generation"""
+    try:
+        return str(uuid.UUID(str(patient_id)))
+    except ValueError:
+        return None
+
+def _generation_key(scope_id):
+    return f'gen:patient:{scope_id}'
+
+def _new_generation():
+    # Unique, not 1: an evicted generation key must never resurrect old entries
+    return time.time_ns()
+
+def generation(scope_id):
+    """Current generation of a patient (or ALL_PATIENTS); part of every response key"""
+    key = _generation_key(scope_id)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _new_generation(), timeout=None)
+        value = cache.get(key)
+    return value
+
+def invalidate_patients(patient_ids, include_lists=False):
+    """Bump the generation of each patient so their cached responses are never read again"""
+    scope_ids = {_normalize(patient_id) for patient_id in patient_ids} - {None}
+    if include_lists:
+        scope_ids.add(ALL_PATIENTS)
+    
+    for scope_id in scope_ids:
+        key = _generation_key(scope_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), timeout=None)
+    
+    with _lock:
+        _invalidations['patients'] += len(scope_ids)
+
+def cached(scope, build, patient_id=None, params='', timeout=None):
+    """Return build() for this scope/patient/params, from the cache when possible
+    
+    Patient-scoped entries (a patient id, or ALL_PATIENTS for responses
+    spanning every patient) are keyed by that scope's generation, so
+    invalidate_patients() retires them all at once without deleting keys.
+    With patient_id=None the entry only expires by TTL and `params`. `build`
+    must return picklable response data; it is only cached if it returns
+    normally.
+    """
+    if patient_id is None:
+        key = f'resp:{scope}:{params}'
+    else:
+        scope_id = ALL_PATIENTS if patient_id == ALL_PATIENTS else _normalize(patient_id)
+        if scope_id is None:
+            # Not a valid id: let the view produce its 404 without caching
+            return build()
+        key = f'resp:{scope}:{scope_id}:{generation(scope_id)}:{params}'
+    
+    if len(key) > 200:
+        key = f'resp:{scope}:{hashlib.md5(key.encode()).hexdigest()}'
+    
+    data = cache.get(key, _MISSING)
+    with _lock:
+        _counters[scope]['hits' if data is not _MISSING else 'misses'] += 1
+    if data is not _MISSING:
+        return data
+    
+    data = build()
+    cache.set(key, data, timeout if timeout is not None else getattr(settings, 'CACHE_TTL', 300))
+    return data
+
+def stats():
+    with _lock:
+        scopes = {}
+        for scope, counts in _counters.items():
+            lookups = counts['hits'] + counts['misses']
+            scopes[scope] = {
+                **counts,
+                'hit_ratio': round(counts['hits'] / lookups, 4) if lookups else None
+            }
+        hits = sum(counts['hits'] for counts in _counters.values())
+        lookups = hits + sum(counts['misses'] for counts in _counters.values())
+        return {
+            'backend': settings.CACHES['default']['BACKEND'],
+            'hits': hits,
+            'misses': lookups - hits,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'invalidations': _invalidations['patients'],
+            'scopes': scopes,
+        }
@@ -1,37 +1,100 @@
+import asyncio
 import json
+import uuid
+from collections import deque
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
+from patients.models import Patient
+from .broadcast import GLOBAL_GROUP, RENDERERS, coalesce_key, encode_frame, event_type_for
+from .bus import latency
+from .events import patient_group
+
+# Close code for clients too slow to keep up even after dropping superseded frames
+SLOW_CONSUMER_CLOSE_CODE = 4008
+MAX_SUBSCRIPTIONS = 500
+ALL_EVENTS = frozenset(RENDERERS)
+RENDERER_NAMES = {name.replace('_', '-') for name in RENDERERS}
+
+class SendQueue:
+    """Bounded outbox of encoded frames for one connection
+    
+    When full, queued latest-state frames whose every key also appears in a
+    newer frame are dropped: the client would overwrite them anyway. Frames
+    without keys (alerts, lab results, ...) are never dropped; put() returns
+    False once the queue holds twice its size so the caller can disconnect.
+    """
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.frames = deque()
+        self.dropped = 0
+        self._ready = asyncio.Event()
+    
+    def put(self, text, keys=None, published_at=None):
+        if len(self.frames) >= self.maxsize:
+            self.drop_superseded(keys)
+        if len(self.frames) >= self.maxsize * 2:
+            return False
+        self.frames.append((text, frozenset(keys) if keys else None, published_at))
+        self._ready.set()
+        return True
+    
+    def drop_superseded(self, newest_keys=None):
+        newer = set(newest_keys or ())
+        kept = deque()
+        for frame in reversed(self.frames):
+            keys = frame[1]
+            if keys is not None and keys <= newer:
+                self.dropped += 1
+                continue
+            kept.appendleft(frame)
+            newer |= keys or set()
+        self.frames = kept
+    
+    async def get(self):
+        while not self.frames:
+            self._ready.clear()
+            await self._ready.wait()
+        text, _, published_at = self.frames.popleft()
+        return text, published_at
 
 class PatientUpdateConsumer(AsyncWebsocketConsumer):
+    """Live updates for the patients a connection subscribes to
+    
+    Client messages:
+      {"type": "subscribe", "patientIds": [...], "events": ["new-alert", ...]}
+          join each patient's group; "events" optionally limits what is
+          delivered for them ("patientId" for a single patient still works)
+      {"type": "subscribe", "ward": true, "events": [...]}
+          also receive ward-wide events for every patient
+      {"type": "unsubscribe", "patientIds": [...]} or {"type": "unsubscribe", "ward": true}
+          leave those subscriptions (everything when neither is given)
+    Frames are only sent for subscribed patients and event types.
+    """
+    
     async def connect(self):
         self.user = self.scope["user"]
         if self.user.is_anonymous:
             await self.close()
             return
         
-        # Join general updates group
-        self.general_group_name = "patient_updates"
-        await self.channel_layer.group_add(
-            self.general_group_name,
-            self.channel_name
-        )
+        self.outbox = SendQueue(getattr(settings, 'BROADCAST_QUEUE_SIZE', 100))
+        # patient id -> event types to deliver (None = all)
+        self.subscriptions = {}
+        # Ward-level subscription: None when not subscribed, else event types (or ALL_EVENTS)
+        self.ward_events = None
         
         await self.accept()
+        self.sender = asyncio.create_task(self.drain_outbox())
     
     async def disconnect(self, close_code):
-        # Leave general updates group
-        await self.channel_layer.group_discard(
-            self.general_group_name,
-            self.channel_name
-        )
+        if hasattr(self, 'sender'):
+            self.sender.cancel()
         
-        # Leave any patient-specific groups
-        if hasattr(self, 'patient_group_name'):
-            await self.channel_layer.group_discard(
-                self.patient_group_name,
-                self.channel_name
-            )
+        if getattr(self, 'subscriptions', None) is not None:
+            await self.unsubscribe(list(self.subscriptions), ward=True)
     
     async def receive(self, text_data):
         try:
@@ -39,53 +102,150 @@ class PatientUpdateConsumer(AsyncWebsocketConsumer):
             message_type = data.get('type')
             
             if message_type == 'subscribe':
-                patient_id = data.get('patientId')
-                if patient_id:
-                    # Leave previous patient group if any
-                    if hasattr(self, 'patient_group_name'):
-                        await self.channel_layer.group_discard(
-                            self.patient_group_name,
-                            self.channel_name
-                        )
-                    
-                    # Join new patient group
-                    self.patient_group_name = f"patient_{patient_id}"
-                    await self.channel_layer.group_add(
-                        self.patient_group_name,
-                        self.channel_name
-                    )
-                    
-                    await self.send(text_data=json.dumps({
-                        'type': 'subscription_confirmed',
-                        'patientId': patient_id
-                    }))
+                await self.handle_subscribe(data)
+            elif message_type == 'unsubscribe':
+                await self.handle_unsubscribe(data)
             
         except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': 'Invalid JSON format'
-            }))
+            await self.send_error('Invalid JSON format')
     
-    # Handler for patient updates
-    async def patient_update(self, event):
+    async def send_error(self, message):
         await self.send(text_data=json.dumps({
-            'type': 'patient-update',
-            'patientId': event['patient_id'],
-            'data': event['data']
+            'type': 'error',
+            'message': message
         }))
     
-    # Handler for new alerts
-    async def new_alert(self, event):
+    def requested_patients(self, data):
+        if data.get('patientId'):
+            return [data['patientId']]
+        patient_ids = data.get('patientIds') or []
+        return patient_ids if isinstance(patient_ids, list) else None
+    
+    async def handle_subscribe(self, data):
+        patient_ids = self.requested_patients(data)
+        if patient_ids is None:
+            return await self.send_error('"patientIds" must be a list')
+        
+        events = None
+        if data.get('events') is not None:
+            events = {event_type_for(name) for name in data['events']} if isinstance(data['events'], list) else {None}
+            if None in events:
+                return await self.send_error(f'"events" must be a list of: {", ".join(sorted(RENDERER_NAMES))}')
+            events = frozenset(events)
+        
+        patient_ids, unknown = await self.existing_patients(patient_ids)
+        if len(set(self.subscriptions) | set(patient_ids)) > MAX_SUBSCRIPTIONS:
+            return await self.send_error(f'At most {MAX_SUBSCRIPTIONS} patients per connection')
+        
+        for patient_id in patient_ids:
+            if patient_id not in self.subscriptions:
+                await self.channel_layer.group_add(patient_group(patient_id), self.channel_name)
+            self.subscriptions[patient_id] = events
+        
+        if data.get('ward'):
+            if self.ward_events is None:
+                await self.channel_layer.group_add(GLOBAL_GROUP, self.channel_name)
+            self.ward_events = events if events is not None else ALL_EVENTS
+        
+        confirmation = {
+            'type': 'subscription_confirmed',
+            'patientIds': patient_ids,
+            'events': sorted(name.replace('_', '-') for name in events) if events is not None else None,
+            'ward': self.ward_events is not None,
+            'subscriptions': len(self.subscriptions)
+        }
+        if data.get('patientId') and patient_ids:
+            confirmation['patientId'] = data['patientId']
+        if unknown:
+            confirmation['unknownPatientIds'] = unknown
+        await self.send(text_data=json.dumps(confirmation))
+    
+    async def handle_unsubscribe(self, data):
+        patient_ids = self.requested_patients(data)
+        if patient_ids is None:
+            return await self.send_error('"patientIds" must be a list')
+        everything = not patient_ids and not data.get('ward')
+        if everything:
+            patient_ids = list(self.subscriptions)
+        
+        removed = await self.unsubscribe(
+            [str(patient_id) for patient_id in patient_ids],
+            ward=everything or bool(data.get('ward'))
+        )
         await self.send(text_data=json.dumps({
-            'type': 'new-alert',
-            'patientId': event['patient_id'],
-            'alert': event['alert']
+            'type': 'unsubscription_confirmed',
+            'patientIds': removed,
+            'ward': self.ward_events is not None,
+            'subscriptions': len(self.subscriptions)
         }))
     
-    # Handler for lab results
-    async def lab_result(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'lab-result',
-            'patientId': event['patient_id'],
-            'result': event['result']
-        }))
\ No newline at end of file
+    async def unsubscribe(self, patient_ids, ward=False):
+        removed = []
+        for patient_id in patient_ids:
+            if self.subscriptions.pop(patient_id, False) is not False:
+                await self.channel_layer.group_discard(patient_group(patient_id), self.channel_name)
+                removed.append(patient_id)
+        if ward and self.ward_events is not None:
+            await self.channel_layer.group_discard(GLOBAL_GROUP, self.channel_name)
+            self.ward_events = None
+        return removed
+    
+    @database_sync_to_async
+    def existing_patients(self, patient_ids):
+        """Canonical ids of patients that exist (one query), and the rejected inputs"""
+        canonical = {}
+        for patient_id in patient_ids:
+            try:
+                canonical[str(uuid.UUID(str(patient_id)))] = patient_id
+            except ValueError:
+                pass
+        found = {
+            str(patient_id) for patient_id in
+            Patient.objects.filter(id__in=list(canonical)).values_list('id', flat=True)
+        }
+        unknown = [patient_id for patient_id in patient_ids if str(patient_id) not in canonical or
+                   str(uuid.UUID(str(patient_id))) not in found]
+        return sorted(found), unknown
+    
+    def wants(self, patient_id, event_type, group=None, ward_wide=False):
+        """Whether this connection should receive an event"""
+        if group == GLOBAL_GROUP:
+            return self.ward_events is not None and event_type in self.ward_events
+        if ward_wide and self.ward_events is not None and event_type in self.ward_events:
+            # Already delivered through the ward group
+            return False
+        if patient_id not in self.subscriptions:
+            return False
+        events = self.subscriptions[patient_id]
+        return events is None or event_type in events
+    
+    async def enqueue(self, text, keys=None, published_at=None):
+        if not self.outbox.put(text, keys, published_at):
+            print(f"Closing slow WebSocket client {self.channel_name}: {len(self.outbox.frames)} frames queued")
+            await self.close(code=SLOW_CONSUMER_CLOSE_CODE)
+    
+    async def drain_outbox(self):
+        while True:
+            text, published_at = await self.outbox.get()
+            await self.send(text_data=text)
+            latency.record('websocket', published_at)
+    
+    # Frames from the broadcaster, already encoded once for every subscriber;
+    # each holds one event type for one group, so filters apply to whole frames
+    async def broadcast_frame(self, event):
+        group = event.get('group')
+        patient_id = group[len('patient_'):] if group and group != GLOBAL_GROUP else None
+        if self.wants(patient_id, event['event_type'], group, event.get('ward_wide', False)):
+            await self.enqueue(event['text'], event.get('keys'), event.get('published_at'))
+    
+    # Events sent to the group directly (not through the broadcaster)
+    async def send_event(self, event):
+        ward = self.ward_events is not None and event['type'] in self.ward_events
+        if ward or self.wants(event.get('patient_id'), event['type']):
+            await self.enqueue(encode_frame([event]), [coalesce_key(event)] if coalesce_key(event) else None)
+    
+    patient_update = send_event
+    new_alert = send_event
+    lab_result = send_event
+    analysis_complete = send_event
+    alerts_acknowledged = send_event
\ No newline at end of file
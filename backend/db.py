@@ -0,0 +1,85 @@
+import os
+from importlib.util import find_spec
+
+# Applied to every new SQLite connection by the 'tuned' profile
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers no longer block the writer (and vice versa)
+    'synchronous': 'NORMAL',  # fsync at checkpoints only; safe with WAL
+    'busy_timeout': int(os.environ.get('DB_SQLITE_BUSY_TIMEOUT', 5000)),  # ms to wait for the write lock
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # KiB
+    'temp_store': 'MEMORY',
+}
+
+def _flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+def sqlite_init_command(pragmas=None):
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items())
+
+def has_psycopg_pool():
+    """Whether Django's PostgreSQL pool can be used: psycopg 3 and psycopg_pool are installed"""
+    # Availability probe only; Django imports both itself
+    return find_spec('psycopg') is not None and find_spec('psycopg_pool') is not None
+
+def database_config(base_dir):
+    """DATABASES for the configured engine and profile
+
+    DB_ENGINE: 'sqlite' (default, file at SQLITE_PATH) or 'postgres' (DB_NAME etc.).
+    DB_PROFILE: 'tuned' (default) adds persistent connections, SQLite WAL
+    pragmas with IMMEDIATE write transactions, and a PostgreSQL connection
+    pool when DB_POOL is set and psycopg 3 / psycopg_pool are installed;
+    'basic' is Django's plain defaults.
+    """
+    engine = os.environ.get('DB_ENGINE', 'sqlite')
+    tuned = os.environ.get('DB_PROFILE', 'tuned') == 'tuned'
+
+    if engine in ('postgres', 'postgresql'):
+        config = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'ckd_digital_twin'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
+        if not tuned:
+            return {'default': config}
+
+        config['CONN_HEALTH_CHECKS'] = True
+        pool = _flag('DB_POOL', 'false')
+        if pool and not has_psycopg_pool():
+            print("WARNING: DB_POOL is set but psycopg 3 / psycopg_pool are not installed "
+                  "(pip install 'psycopg[binary,pool]'); using persistent connections without a pool")
+            pool = False
+        if pool:
+            # Django's pool replaces persistent connections (CONN_MAX_AGE must be 0)
+            config['CONN_MAX_AGE'] = 0
+            config['OPTIONS'] = {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                }
+            }
+        else:
+            config['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+        return {'default': config}
+
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # Not DB_NAME: that names the PostgreSQL database (e.g. ckd_dashboard in .env.example)
+        # Relative paths are resolved against the project, not the working directory
+        'NAME': base_dir / os.environ.get('SQLITE_PATH', 'db.sqlite3'),
+    }
+    if tuned:
+        config['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+        config['OPTIONS'] = {
+            'init_command': sqlite_init_command(),
+            # Take the write lock at BEGIN so concurrent read-then-write
+            # transactions wait on busy_timeout instead of failing with
+            # "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        }
+    return {'default': config}
@@ -0,0 +1,26 @@
+from .broadcast import GLOBAL_GROUP, broadcaster
+
+def patient_group(patient_id):
+    """Channel group that PatientUpdateConsumer joins on subscribe"""
+    return f"patient_{patient_id}"
+
+def send_patient_event(patient_id, event_type, payload, ward_wide=False):
+    """Push an event to everyone subscribed to a patient
+    
+    `event_type` names the consumer handler (e.g. 'analysis_complete'). Events
+    go through the coalescing broadcaster, so they reach clients after at most
+    BROADCAST_WINDOW_MS. `ward_wide` also sends it to the ward-level group
+    for dashboards subscribed to every patient. Safe to call from synchronous code such as
+    views and worker threads; delivery failures are logged, never raised.
+    """
+    event = {
+        'type': event_type,
+        'patient_id': str(patient_id),
+        **payload
+    }
+    if ward_wide:
+        # Marked so ward subscribers skip the patient-group copy
+        event['ward_wide'] = True
+        broadcaster.publish(GLOBAL_GROUP, event)
+    broadcaster.publish(patient_group(patient_id), event)
+    return True
\ No newline at end of file
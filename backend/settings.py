@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+from backend.db import database_config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -88,12 +89,8 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# Engine and profile come from DB_ENGINE / DB_PROFILE, see backend/db.py
+DATABASES = database_config(BASE_DIR)
 
 
 # Password validation
@@ -181,28 +178,93 @@ CORS_ALLOW_METHODS = [
 
 # Channels Configuration
 ASGI_APPLICATION = 'backend.asgi.application'
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],
+# Event bus behind Channels and Socket.IO: 'memory' (in-process, single node, no
+# Redis needed) or 'redis' (required when running several ASGI processes)
+EVENT_BUS_BACKEND = os.environ.get('EVENT_BUS_BACKEND', 'memory')
+if EVENT_BUS_BACKEND == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                "hosts": [os.environ.get('EVENT_BUS_REDIS_URL', 'redis://127.0.0.1:6379/0')],
+            },
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'backend.bus.LocalChannelLayer',
+        },
+    }
 
 
 
 # Cache Configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+# 'file' (shared by the workers of one host), 'redis' (shared across hosts) or 'locmem'.
+# Invalidation generations live in the cache, so locmem is only correct with a single
+# worker process: other workers would keep serving stale responses until CACHE_TTL.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_CACHE_URL', 'redis://localhost:6379/1'),
+        }
     }
-}
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('FILE_CACHE_DIR', str(BASE_DIR / '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+# Seconds a cached API response may be served; writes invalidate earlier
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+
+# WebSocket broadcasting
+# Events per channel group are coalesced for this long and sent as one frame (0 = immediately)
+BROADCAST_WINDOW_MS = float(os.environ.get('BROADCAST_WINDOW_MS', 50))
+# Frames queued per connection before superseded patient updates are dropped
+BROADCAST_QUEUE_SIZE = int(os.environ.get('BROADCAST_QUEUE_SIZE', 100))
 
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 
+# ML Model Configuration
+# Seconds between checks of ML/models_and_scalers for changed artifacts
+ML_MODEL_RELOAD_INTERVAL = float(os.environ.get('ML_MODEL_RELOAD_INTERVAL', 5))
+# Bundle to serve (version or absolute path); empty follows ML/models_and_scalers/bundles/CURRENT
+ML_MODEL_BUNDLE = os.environ.get('ML_MODEL_BUNDLE', '')
+# Patients per feature matrix / bulk_create when batch scoring
+ML_BATCH_CHUNK_SIZE = int(os.environ.get('ML_BATCH_CHUNK_SIZE', 500))
+# 'compiled' flattens the tree ensemble into NumPy arrays; 'sklearn' calls the estimator directly
+ML_INFERENCE_BACKEND = os.environ.get('ML_INFERENCE_BACKEND', 'compiled')
+# 'mmap' loads a bundle's engine/ arrays with np.load(mmap_mode='r'); 'pickle' always unpickles the sklearn model
+ML_MODEL_FORMAT = os.environ.get('ML_MODEL_FORMAT', 'mmap')
+# Largest matrix scored by the compiled engine while the sklearn model is loaded
+ML_COMPILED_MAX_BATCH = int(os.environ.get('ML_COMPILED_MAX_BATCH', 256))
+# Per-worker cache of recent predictions, keyed by model version and feature fingerprint
+ML_PREDICTION_CACHE_SIZE = int(os.environ.get('ML_PREDICTION_CACHE_SIZE', 10000))
+ML_PREDICTION_CACHE_TTL = int(os.environ.get('ML_PREDICTION_CACHE_TTL', 900))  # seconds
+# Where async analysis jobs run: 'thread' (in-process pool), 'celery' or 'sync'
+ML_JOB_BACKEND = os.environ.get('ML_JOB_BACKEND', 'thread')
+ML_JOB_WORKERS = int(os.environ.get('ML_JOB_WORKERS', 2))
+# Seconds after which a 'thread' job still queued/running is marked failed (its process likely exited)
+ML_JOB_STALE_AFTER = int(os.environ.get('ML_JOB_STALE_AFTER', 3600))
+
+# Alert Rules
+# Evaluate the alert rules (alerts/rules.py, or ALERT_RULES when set) on every recorded observation
+ALERT_RULES_ENABLED = os.environ.get('ALERT_RULES_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
 # API Documentation
 SPECTACULAR_SETTINGS = {
     'TITLE': 'CKD Digital Twin API',
@@ -1,5 +1,20 @@
+import asyncio
+import json
+import uuid
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
 import socketio
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
 from django.conf import settings
+from django.contrib import auth as django_auth
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from patients.models import Patient
+from .broadcast import GLOBAL_GROUP
+from .bus import latency
+from .events import patient_group
 
 # Create Socket.IO server
 sio = socketio.AsyncServer(
@@ -7,21 +22,176 @@ sio = socketio.AsyncServer(
     async_mode='asgi'
 )
 
+class ChannelLayerBridge:
+    """Delivers the event bus (channel layer) to Socket.IO rooms
+    
+    Socket.IO rooms are named like the channel groups. The bridge joins a
+    group while its room has members on this node and emits each broadcaster
+    frame to the room, so Socket.IO and WebSocket clients get the same events
+    from one publish. Ward members are skipped for ward-wide events arriving
+    through a patient room. Group membership expires after the layer's
+    group_expiry, so occupied groups are re-added well before that.
+    """
+    
+    def __init__(self, server):
+        self.server = server
+        self.layer = None
+        self.channel_name = None
+        self.groups = set()
+        self.task = None
+        self.refresh_task = None
+    
+    async def start(self):
+        if self.task is not None:
+            return
+        self.layer = get_channel_layer()
+        if self.layer is None:
+            return
+        self.channel_name = await self.layer.new_channel('socketio.')
+        self.task = asyncio.create_task(self.run())
+        self.refresh_task = asyncio.create_task(self.refresh())
+    
+    async def join(self, group):
+        await self.start()
+        if self.layer is not None:
+            # Also for tracked groups: re-adding restarts the membership's expiry
+            await self.layer.group_add(group, self.channel_name)
+            self.groups.add(group)
+    
+    async def refresh(self):
+        interval = getattr(self.layer, 'group_expiry', 86400) / 2
+        while True:
+            await asyncio.sleep(interval)
+            for group in list(self.groups):
+                try:
+                    if self.members(group):
+                        await self.layer.group_add(group, self.channel_name)
+                    else:
+                        await self.layer.group_discard(group, self.channel_name)
+                        self.groups.discard(group)
+                except Exception as e:
+                    print(f"Socket.IO bridge failed to refresh {group}: {e}")
+    
+    def members(self, room):
+        return [sid for sid, _ in self.server.manager.get_participants('/', room)]
+    
+    async def run(self):
+        while True:
+            message = await self.layer.receive(self.channel_name)
+            if message.get('type') != 'broadcast.frame':
+                continue
+            try:
+                await self.deliver(message)
+            except Exception as e:
+                print(f"Socket.IO bridge failed to deliver to {message.get('group')}: {e}")
+    
+    async def deliver(self, message):
+        group = message['group']
+        if not self.members(group):
+            # Room emptied since the last frame: stop receiving its group
+            await self.layer.group_discard(group, self.channel_name)
+            self.groups.discard(group)
+            return
+        
+        skip = None
+        if message.get('ward_wide') and group != GLOBAL_GROUP:
+            skip = self.members(GLOBAL_GROUP) or None
+        frame = json.loads(message['text'])
+        await self.server.emit(frame['type'], frame, room=group, skip_sid=skip)
+        latency.record('socketio', message.get('published_at'))
+
+bridge = ChannelLayerBridge(sio)
+
+def _token(environ, auth):
+    if isinstance(auth, dict) and auth.get('token'):
+        return str(auth['token'])
+    header = environ.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) == 2 and header[0].lower() == 'bearer':
+        return header[1]
+    return None
+
+@database_sync_to_async
+def authenticate(environ, auth):
+    """User for a Socket.IO handshake: a JWT access token (auth={"token": ...} or a
+    Bearer header) as for the REST API, else the Django session cookie as for /ws/"""
+    token = _token(environ, auth)
+    if token:
+        jwt = JWTAuthentication()
+        try:
+            return jwt.get_user(jwt.get_validated_token(token))
+        except (AuthenticationFailed, InvalidToken, TokenError):
+            return None
+    
+    cookies = SimpleCookie()
+    try:
+        cookies.load(environ.get('HTTP_COOKIE', ''))
+    except Exception:
+        return None
+    if settings.SESSION_COOKIE_NAME not in cookies:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(cookies[settings.SESSION_COOKIE_NAME].value)
+    user = django_auth.get_user(SimpleNamespace(session=session))
+    return user if user.is_authenticated else None
+
+@database_sync_to_async
+def visible_rooms(user_id, rooms):
+    """The requested rooms this user may join: active users see every existing
+    patient and the ward, matching the REST API and PatientUpdateConsumer"""
+    if not django_auth.get_user_model().objects.filter(pk=user_id, is_active=True).exists():
+        return []
+    patient_ids = [room[len('patient_'):] for room in rooms if room != GLOBAL_GROUP]
+    found = {
+        patient_group(patient_id) for patient_id in
+        Patient.objects.filter(id__in=patient_ids).values_list('id', flat=True)
+    }
+    return [room for room in rooms if room == GLOBAL_GROUP or room in found]
+
 @sio.event
 async def connect(sid, environ, auth):
+    user = await authenticate(environ, auth)
+    if user is None:
+        print(f'Client {sid} rejected: not authenticated')
+        return False
+    await sio.save_session(sid, {'user_id': user.pk})
     print(f'Client {sid} connected')
+    await bridge.start()
     await sio.emit('connected', {'status': 'Connected to CKD Dashboard'}, room=sid)
 
 @sio.event
 async def disconnect(sid):
     print(f'Client {sid} disconnected')
 
+def _rooms(data):
+    patient_ids = [data['patientId']] if data.get('patientId') else data.get('patientIds') or []
+    rooms = []
+    for patient_id in patient_ids:
+        try:
+            rooms.append(patient_group(uuid.UUID(str(patient_id))))
+        except ValueError:
+            pass
+    if data.get('ward'):
+        rooms.append(GLOBAL_GROUP)
+    return rooms
+
 @sio.event
 async def subscribe(sid, data):
-    patient_id = data.get('patientId')
-    if patient_id:
-        await sio.enter_room(sid, f'patient_{patient_id}')
-        await sio.emit('subscription_confirmed', {'patientId': patient_id}, room=sid)
+    session = await sio.get_session(sid)
+    rooms = await visible_rooms(session.get('user_id'), _rooms(data or {}))
+    for room in rooms:
+        await sio.enter_room(sid, room)
+        await bridge.join(room)
+    if rooms:
+        await sio.emit('subscription_confirmed', {
+            'patientId': (data or {}).get('patientId'),
+            'rooms': rooms
+        }, room=sid)
+
+@sio.event
+async def unsubscribe(sid, data):
+    rooms = _rooms(data or {}) or [room for room in sio.rooms(sid) if room != sid]
+    for room in rooms:
+        await sio.leave_room(sid, room)
+    await sio.emit('unsubscription_confirmed', {'rooms': rooms}, room=sid)
 
 # Socket.IO ASGI application
 socketio_app = socketio.ASGIApp(sio)
\ No newline at end of file
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from .views import cache_stats, event_stats
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -32,6 +33,9 @@ urlpatterns = [
     path('api/ml/', include('ml_predictions.urls')),
     path('api/', include('alerts.urls')),
     
+    path('api/cache/stats/', cache_stats, name='cache-stats'),
+    path('api/events/stats/', event_stats, name='event-stats'),
+    
     # 3D Model endpoints
     path('api/models/', include('backend.model_urls')),
 ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .broadcast import broadcaster
+from .bus import latency
+from .cache import stats
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cache_stats(request):
+    """Get hit/miss counters of the API response cache in this worker"""
+    return Response({
+        'success': True,
+        'data': stats()
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def event_stats(request):
+    """Get event bus counters and publish-to-deliver latency per transport in this worker"""
+    return Response({
+        'success': True,
+        'data': {
+            'backend': settings.EVENT_BUS_BACKEND,
+            'broadcaster': broadcaster.stats(),
+            'latency': latency.stats()
+        }
+    })
\ No newline at end of file
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class MedicalDataConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'medical_data'
\ No newline at end of file
+    name = 'medical_data'
+    
+    def ready(self):
+        from . import receivers  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,195 @@
+from datetime import datetime, time, timezone as dt_timezone
+import numpy as np
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import status
+from rest_framework.response import Response
+
+MAX_POINTS = 5000
+MODES = ('buckets', 'lttb')
+
+# Numeric columns charted per model
+SERIES_FIELDS = {
+    'KidneyMetrics': ['egfr', 'creatinine', 'proteinuria', 'systolic_bp', 'diastolic_bp'],
+    'VitalSigns': ['systolic_bp', 'diastolic_bp', 'heart_rate', 'temperature', 'weight'],
+}
+
+def load_series(queryset, time_field, fields, start=None, end=None):
+    """Fetch only the time and value columns -> (datetimes, epoch seconds, {field: float array})
+    
+    Rows come back oldest first; NULLs become NaN.
+    """
+    if start is not None:
+        queryset = queryset.filter(**{f'{time_field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{time_field}__lte': end})
+    rows = list(queryset.order_by(time_field).values_list(time_field, *fields))
+    
+    if not rows:
+        return [], np.empty(0), {field: np.empty(0) for field in fields}
+    
+    columns = list(zip(*rows))
+    timestamps = list(columns[0])
+    seconds = np.fromiter((ts.timestamp() for ts in timestamps), dtype=np.float64, count=len(timestamps))
+    values = {field: np.array(column, dtype=np.float64) for field, column in zip(fields, columns[1:])}
+    return timestamps, seconds, values
+
+def bucket_aggregate(seconds, values, max_points, start=None, end=None):
+    """Min/mean/max per equal-width time bucket, computed with reduceat over sorted rows
+    
+    Returns (bucket start seconds, rows per bucket, {field: {'min', 'mean', 'max'}},
+    bucket width); empty buckets are omitted.
+    """
+    start = seconds[0] if start is None else start
+    end = seconds[-1] if end is None else end
+    width = max(end - start, 1.0) / max_points
+    
+    bucket = np.minimum(((seconds - start) // width).astype(np.int64), max_points - 1)
+    starts = np.flatnonzero(np.r_[True, np.diff(bucket) != 0])
+    bucket_start = start + bucket[starts] * width
+    counts = np.diff(np.r_[starts, len(seconds)])
+    
+    aggregates = {}
+    for field, y in values.items():
+        valid = ~np.isnan(y)
+        n_valid = np.add.reduceat(valid, starts)
+        sums = np.add.reduceat(np.where(valid, y, 0.0), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n_valid > 0, sums / n_valid, np.nan)
+        aggregates[field] = {
+            # fmin/fmax skip NaN unless the whole bucket is NaN
+            'min': np.fmin.reduceat(y, starts),
+            'mean': mean,
+            'max': np.fmax.reduceat(y, starts),
+        }
+    return bucket_start, counts, aggregates, width
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the series shape"""
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        # Too few points for a middle bucket: keep the endpoints
+        return np.array([0, n - 1][:threshold], dtype=np.int64)
+    
+    # Bucket i spans [edges[i], edges[i + 1]); first and last points are always kept
+    every = (n - 2) / (threshold - 2)
+    edges = np.floor(np.arange(threshold - 1) * every).astype(np.int64) + 1
+    bounds = np.r_[edges, n]
+    
+    # Average point of every bucket (and of the final single-point bucket)
+    sizes = np.diff(bounds)
+    avg_x = np.add.reduceat(x, bounds[:-1]) / sizes
+    avg_y = np.add.reduceat(y, bounds[:-1]) / sizes
+    
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = a = 0
+    for i in range(threshold - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+def _isoformat(seconds):
+    return datetime.fromtimestamp(float(seconds), tz=dt_timezone.utc).isoformat()
+
+def _floats(array):
+    """NaN -> None so the series serializes as JSON null"""
+    return [None if np.isnan(value) else round(float(value), 4) for value in array]
+
+def _parse_bound(value, end_of_day=False):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def _error(message):
+    return Response({
+        'success': False,
+        'error': {'message': message}
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+def downsampled_response(request, queryset, time_field, fields):
+    """Chart-sized series for ?from=&to=&max_points=[&mode=buckets|lttb][&fields=a,b]
+    
+    'buckets' (default) returns min/mean/max per equal-width time bucket;
+    'lttb' returns up to max_points original readings per field chosen to keep
+    the curve's shape. Series are columnar: one list per attribute.
+    """
+    params = request.query_params
+    try:
+        max_points = int(params.get('max_points'))
+        if max_points < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return _error('"max_points" must be a positive integer')
+    max_points = min(max_points, MAX_POINTS)
+    
+    mode = params.get('mode', 'buckets')
+    if mode not in MODES:
+        return _error(f'"mode" must be one of: {", ".join(MODES)}')
+    
+    if params.get('fields'):
+        requested = [field.strip() for field in params['fields'].split(',') if field.strip()]
+        unknown = [field for field in requested if field not in fields]
+        if unknown:
+            return _error(f'Unknown fields: {", ".join(unknown)}')
+        fields = requested
+    
+    try:
+        start = _parse_bound(params.get('from'))
+        end = _parse_bound(params.get('to'), end_of_day=True)
+    except ValueError:
+        return _error('"from" and "to" must be ISO dates or datetimes')
+    
+    timestamps, seconds, values = load_series(queryset, time_field, fields, start, end)
+    data = {
+        'mode': mode,
+        'from': start,
+        'to': end,
+        'raw_points': len(timestamps),
+        'max_points': max_points,
+        'series': {},
+    }
+    
+    if not timestamps:
+        return Response({'success': True, 'data': data})
+    
+    if mode == 'buckets':
+        bucket_start, counts, aggregates, width = bucket_aggregate(
+            seconds, values, max_points,
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+        )
+        data['bucket_seconds'] = round(width, 3)
+        data['timestamps'] = [_isoformat(value) for value in bucket_start]
+        data['counts'] = counts.tolist()
+        data['series'] = {
+            field: {name: _floats(array) for name, array in stats.items()}
+            for field, stats in aggregates.items()
+        }
+    else:
+        # Relative seconds keep the triangle areas well conditioned
+        x = seconds - seconds[0]
+        for field, y in values.items():
+            present = np.flatnonzero(~np.isnan(y))
+            keep = present[lttb(x[present], y[present], max_points)]
+            data['series'][field] = {
+                'timestamps': [timestamps[index].isoformat() for index in keep],
+                'values': _floats(y[keep]),
+            }
+    
+    return Response({'success': True, 'data': data})
@@ -0,0 +1,227 @@
+from collections import defaultdict
+from decimal import Decimal
+import uuid
+import numpy as np
+import pandas as pd
+from django.db import models, transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
+from django.utils import timezone
+from patients.models import Patient
+from .models import KidneyMetrics, LabResult, VitalSigns
+from .signals import observations_recorded
+
+MAX_OBSERVATIONS = 10000
+INSERT_BATCH_SIZE = 1000
+
+# Observation "type" -> model
+INGEST_MODELS = {
+    'kidney_metrics': KidneyMetrics,
+    'lab_result': LabResult,
+    'vital_signs': VitalSigns,
+}
+
+# Time fields filled with the current time when omitted (as the single POST does)
+DEFAULT_NOW = {
+    KidneyMetrics: 'timestamp',
+}
+
+UUID_PATTERN = r'[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}'
+BOOLEAN_VALUES = {True: True, 'true': True, 'True': True, '1': True, False: False, 'false': False, 'False': False, '0': False}
+
+def input_fields(model):
+    """Model fields accepted in an ingested observation"""
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+        and field.name != 'patient'
+        and not getattr(field, 'auto_now_add', False)
+        and not getattr(field, 'auto_now', False)
+    ]
+
+class ColumnValidator:
+    """Validates one model's observations column by column with pandas
+    
+    Every check is a vectorized mask over the whole column; only rows that
+    fail are visited to record their messages.
+    """
+    
+    def __init__(self, model, frame):
+        self.model = model
+        self.frame = frame
+        self.errors = defaultdict(dict)  # row position -> {field: message}
+        self.columns = {}
+    
+    def fail(self, mask, field, message):
+        for position in np.flatnonzero(np.asarray(mask, dtype=bool)):
+            self.errors[position].setdefault(field, message)
+    
+    def column(self, name):
+        if name in self.frame:
+            return self.frame[name]
+        return pd.Series([None] * len(self.frame), index=self.frame.index, dtype=object)
+    
+    def validate(self):
+        for field in input_fields(self.model):
+            self.validate_field(field)
+        return self.columns, self.errors
+    
+    def validate_field(self, field):
+        column = self.column(field.name)
+        missing = column.isna().to_numpy()
+        
+        if DEFAULT_NOW.get(self.model) == field.name:
+            column = column.where(~missing, timezone.now().isoformat())
+            missing = np.zeros(len(column), dtype=bool)
+        elif not field.null and not field.has_default():
+            self.fail(missing, field.name, 'This field is required.')
+        
+        if isinstance(field, (models.DecimalField, models.IntegerField, models.FloatField)):
+            values = self.validate_number(field, column, missing)
+        elif isinstance(field, models.DateTimeField):
+            values = pd.to_datetime(column, errors='coerce', utc=True, format='ISO8601')
+            self.fail(~missing & values.isna().to_numpy(), field.name, 'Datetime has wrong format.')
+            values = [None if pd.isna(value) else value.to_pydatetime() for value in values]
+        elif isinstance(field, models.BooleanField):
+            values = column.map(_to_bool)
+            self.fail(~missing & values.isna().to_numpy(), field.name, 'Must be a valid boolean.')
+            values = values.tolist()
+        else:
+            values = column.where(~missing, None).astype(object)
+            self.fail(~missing & ~values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool),
+                      field.name, 'Not a valid string.')
+            text = values.astype(str)
+            if field.max_length:
+                self.fail(~missing & (text.str.len() > field.max_length).to_numpy(), field.name,
+                          f'Ensure this field has no more than {field.max_length} characters.')
+            values = values.tolist()
+        
+        if field.choices:
+            allowed = {choice for choice, _ in field.flatchoices}
+            invalid = np.array([value is not None and value not in allowed for value in values])
+            self.fail(~missing & invalid, field.name, 'Not a valid choice.')
+        
+        # Omitted optional fields fall back to the model default in the constructor
+        self.columns[field.name] = [
+            value if not is_missing else models.NOT_PROVIDED
+            for value, is_missing in zip(values, missing)
+        ]
+    
+    def validate_number(self, field, column, missing):
+        numbers = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        invalid = ~missing & ~np.isfinite(numbers)
+        self.fail(invalid, field.name, 'A valid number is required.')
+        present = ~missing & ~invalid
+        numbers = np.where(present, numbers, np.nan)
+        
+        if isinstance(field, models.IntegerField):
+            self.fail(present & (np.mod(numbers, 1) != 0), field.name, 'A valid integer is required.')
+            # PostgreSQL's column ranges, so a batch accepted on SQLite is valid on every backend
+            low, high = BaseDatabaseOperations.integer_field_ranges[field.get_internal_type()]
+            self.fail(present & (numbers < low), field.name, f'Ensure this value is greater than or equal to {low}.')
+            self.fail(present & (numbers > high), field.name, f'Ensure this value is less than or equal to {high}.')
+            return [None if np.isnan(value) or not low <= value <= high else int(value) for value in numbers]
+        
+        if isinstance(field, models.DecimalField):
+            # Rounded to the column's scale first, as the database would store it:
+            # 999.999 becomes 1000.00 and no longer fits decimal(5, 2)
+            values = [
+                None if np.isnan(value) else Decimal(f'{value:.{field.decimal_places}f}')
+                for value in numbers
+            ]
+            whole_digits = field.max_digits - field.decimal_places
+            limit = Decimal(10) ** whole_digits
+            self.fail([value is not None and abs(value) >= limit for value in values], field.name,
+                      f'Ensure that there are no more than {whole_digits} digits before the decimal point.')
+            return values
+        
+        return [None if np.isnan(value) else float(value) for value in numbers]
+
+def _to_bool(value):
+    try:
+        return BOOLEAN_VALUES.get(value)
+    except TypeError:
+        return None
+
+def _build_instances(model, columns, positions, patient_ids):
+    names = list(columns)
+    instances = []
+    for position in positions:
+        values = {
+            name: columns[name][position] for name in names
+            if columns[name][position] is not models.NOT_PROVIDED
+        }
+        instances.append(model(patient_id=patient_ids[position], **values))
+    return instances
+
+def ingest_observations(observations):
+    """Validate and insert a mixed list of observations
+    
+    Each item is a dict with "type" (see INGEST_MODELS), "patient_id" and the
+    model's fields. Patients are resolved with one query, each model is
+    validated as a whole column set and inserted with bulk_create inside one
+    transaction. Invalid rows are reported by their index in `observations`
+    and skipped; valid rows are still saved. Returns the summary dict.
+    """
+    errors = {}
+    frame = pd.DataFrame.from_records(observations) if observations else pd.DataFrame()
+    frame['index'] = np.arange(len(frame))
+    for column in ('type', 'patient_id'):
+        if column not in frame:
+            frame[column] = None
+    
+    unknown_type = ~frame['type'].isin(list(INGEST_MODELS))
+    for index in frame.loc[unknown_type, 'index']:
+        errors[index] = {'type': f'Must be one of: {", ".join(INGEST_MODELS)}.'}
+    
+    # One query resolves every referenced patient
+    patient_text = frame['patient_id'].astype(str)
+    canonical = {
+        value: str(uuid.UUID(value))
+        for value in patient_text[patient_text.str.fullmatch(UUID_PATTERN)].unique()
+    }
+    frame['patient_id'] = patient_text.map(canonical)
+    known = {
+        str(patient_id) for patient_id in
+        Patient.objects.filter(id__in=list(set(canonical.values()))).values_list('id', flat=True)
+    }
+    patient_found = frame['patient_id'].isin(known)
+    
+    pending = defaultdict(list)
+    for type_name, model in INGEST_MODELS.items():
+        rows = frame[frame['type'] == type_name].reset_index(drop=True)
+        if rows.empty:
+            continue
+        
+        columns, row_errors = ColumnValidator(model, rows).validate()
+        found = patient_found[frame['type'] == type_name].to_numpy()
+        for position in np.flatnonzero(~found):
+            row_errors[position]['patient_id'] = 'Patient not found.'
+        
+        for position, messages in row_errors.items():
+            errors[int(rows.at[position, 'index'])] = messages
+        
+        valid = [position for position in range(len(rows)) if position not in row_errors]
+        pending[model] = _build_instances(model, columns, valid, rows['patient_id'].tolist())
+    
+    created = {}
+    with transaction.atomic():
+        for model, instances in pending.items():
+            created[model] = model.objects.bulk_create(instances, batch_size=INSERT_BATCH_SIZE)
+    
+    # The rows are committed: a failing receiver is logged rather than failing the request
+    for model, instances in created.items():
+        if instances:
+            for receiver, response in observations_recorded.send_robust(sender=model, instances=instances):
+                if isinstance(response, Exception):
+                    print(f"observations_recorded receiver {receiver.__qualname__} failed: {response}")
+    
+    names = {model: type_name for type_name, model in INGEST_MODELS.items()}
+    return {
+        'received': len(frame),
+        'created': {names[model]: len(instances) for model, instances in created.items()},
+        'failed': len(errors),
+        'errors': [
+            {'index': int(index), 'messages': messages}
+            for index, messages in sorted(errors.items())
+        ],
+    }
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+from backend.db import sqlite_init_command
+
+# Default-settings connection vs the 'tuned' profile (see backend/db.py)
+PROFILES = {
+    'basic': {'init_command': '', 'begin': 'BEGIN'},
+    'tuned': {'init_command': sqlite_init_command(), 'begin': 'BEGIN IMMEDIATE'},
+}
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent observation writes on SQLite for the basic and tuned DB profiles'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers (monitors)')
+        parser.add_argument('--writes', type=int, default=300, help='Write transactions per writer')
+        parser.add_argument('--profile', choices=['basic', 'tuned', 'both'], default='both')
+        parser.add_argument('--connect-repeat', type=int, default=200,
+                            help='Connections to open when timing connect cost on the default database')
+    
+    def handle(self, *args, **options):
+        profiles = ['basic', 'tuned'] if options['profile'] == 'both' else [options['profile']]
+        
+        self.stdout.write(f'{options["threads"]} writers x {options["writes"]} transactions '
+                          '(read latest reading, insert one row)')
+        for name in profiles:
+            result = self.run_profile(name, options['threads'], options['writes'])
+            self.stdout.write(
+                f'  {name:6s} {result["rows_per_second"]:9.1f} rows/s  '
+                f'p50 {result["p50_ms"]:7.2f} ms  p99 {result["p99_ms"]:8.2f} ms  '
+                f'locked errors {result["locked"]}'
+            )
+        
+        self.time_connections(options['connect_repeat'])
+    
+    def run_profile(self, name, threads, writes):
+        profile = PROFILES[name]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            setup = sqlite3.connect(path)
+            setup.executescript(
+                'CREATE TABLE vital_signs (id TEXT PRIMARY KEY, patient_id TEXT, timestamp REAL, '
+                'systolic_bp INTEGER, diastolic_bp INTEGER);'
+                'CREATE INDEX vital_signs_patient ON vital_signs (patient_id, timestamp DESC);'
+            )
+            setup.close()
+            
+            latencies = []
+            locked = [0]
+            lock = threading.Lock()
+            
+            def writer():
+                # isolation_level=None: transactions are issued explicitly, like Django does
+                conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+                for command in filter(None, (c.strip() for c in profile['init_command'].split(';'))):
+                    conn.execute(command)
+                patient_id = str(uuid.uuid4())
+                own = []
+                for _ in range(writes):
+                    start = time.perf_counter()
+                    try:
+                        conn.execute(profile['begin'])
+                        conn.execute(
+                            'SELECT systolic_bp FROM vital_signs WHERE patient_id = ? ORDER BY timestamp DESC LIMIT 1',
+                            (patient_id,)
+                        ).fetchone()
+                        conn.execute(
+                            'INSERT INTO vital_signs VALUES (?, ?, ?, ?, ?)',
+                            (str(uuid.uuid4()), patient_id, time.time(), 120, 80)
+                        )
+                        conn.execute('COMMIT')
+                        own.append(time.perf_counter() - start)
+                    except sqlite3.OperationalError as e:
+                        if conn.in_transaction:
+                            conn.execute('ROLLBACK')
+                        if 'locked' not in str(e):
+                            raise
+                        with lock:
+                            locked[0] += 1
+                conn.close()
+                with lock:
+                    latencies.extend(own)
+            
+            workers = [threading.Thread(target=writer) for _ in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+        
+        latencies = np.array(latencies or [0.0]) * 1000
+        return {
+            'rows_per_second': len(latencies) / elapsed,
+            'p50_ms': float(np.median(latencies)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'locked': locked[0],
+        }
+    
+    def time_connections(self, repeat):
+        """Per-request connect cost that CONN_MAX_AGE / pooling removes, on the configured database"""
+        connection.close()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            connection.ensure_connection()
+            connection.close()
+        fresh = (time.perf_counter() - start) / repeat
+        
+        connection.ensure_connection()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        reused = (time.perf_counter() - start) / repeat
+        
+        self.stdout.write(f'Default database ({connection.vendor}), {repeat} iterations:')
+        self.stdout.write(f'  new connection per request: {fresh * 1000:7.3f} ms')
+        self.stdout.write(f'  persistent connection:      {reused * 1000:7.3f} ms per query')
\ No newline at end of file
@@ -0,0 +1,110 @@
+import base64
+import json
+import uuid
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_CHUNK_SIZE = 500
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(timestamp, pk):
+    """Opaque cursor pointing just past the row with this (timestamp, id)"""
+    raw = json.dumps([timestamp.isoformat(), str(pk)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, pk = json.loads(raw)
+        timestamp = parse_datetime(timestamp)
+        # Observation ids are UUIDs; anything else would fail in the id__lt filter
+        pk = uuid.UUID(str(pk))
+    except (ValueError, TypeError, AttributeError):
+        raise InvalidCursor('Invalid cursor')
+    if timestamp is None:
+        raise InvalidCursor('Invalid cursor')
+    return timestamp, pk
+
+def _error(message):
+    return Response({
+        'success': False,
+        'error': {'message': message}
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+def wants_stream(request):
+    # Not ?format=: DRF reserves it for renderer selection
+    return request.query_params.get('stream', '').lower() in ('1', 'true', 'ndjson')
+
+def history_response(request, queryset, serializer_class, time_field):
+    """Respond with a patient's observation history, newest first
+    
+    - ?stream=true streams every row as one JSON line (application/x-ndjson),
+      read with .iterator() so memory stays flat.
+    - ?limit=N and/or ?cursor=... return one keyset page ordered by
+      (time_field, id) descending, with meta.next_cursor for the next page.
+    - Without either, the full list is returned as before.
+    """
+    queryset = queryset.order_by(f'-{time_field}', '-id')
+    
+    if wants_stream(request):
+        return stream_ndjson(queryset, serializer_class)
+    
+    cursor = request.query_params.get('cursor')
+    limit = request.query_params.get('limit')
+    if cursor is None and limit is None:
+        return Response({
+            'success': True,
+            'data': serializer_class(queryset, many=True).data
+        })
+    
+    try:
+        limit = min(int(limit), MAX_LIMIT) if limit is not None else DEFAULT_LIMIT
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return _error('"limit" must be a positive integer')
+    
+    if cursor:
+        try:
+            timestamp, pk = decode_cursor(cursor)
+        except InvalidCursor as e:
+            return _error(str(e))
+        # The <= bound lets the (patient, -time_field) index do the range scan;
+        # the OR only breaks ties between rows sharing a timestamp
+        queryset = queryset.filter(**{f'{time_field}__lte': timestamp}).filter(
+            Q(**{f'{time_field}__lt': timestamp}) | Q(id__lt=pk)
+        )
+    
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_field), last.pk)
+    
+    return Response({
+        'success': True,
+        'data': serializer_class(rows, many=True).data,
+        'meta': {
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }
+    })
+
+def stream_ndjson(queryset, serializer_class):
+    """Stream a queryset as newline-delimited JSON without loading it all"""
+    def rows():
+        for instance in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            yield json.dumps(serializer_class(instance).data, cls=DjangoJSONEncoder) + '\n'
+    
+    return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from backend.cache import invalidate_patients
+from backend.events import send_patient_event
+from .models import KidneyMetrics, LabResult, VitalSigns
+from .serializers import KidneyMetricsSerializer, LabResultSerializer, VitalSignsSerializer
+from .signals import observations_recorded
+
+@receiver([post_save, post_delete], sender=KidneyMetrics)
+@receiver([post_save, post_delete], sender=LabResult)
+@receiver([post_save, post_delete], sender=VitalSigns)
+def invalidate_observation_cache(sender, instance, **kwargs):
+    invalidate_patients([instance.patient_id])
+
+@receiver(observations_recorded)
+def invalidate_recorded_observations_cache(sender, instances, **kwargs):
+    """bulk_create sends no post_save, so bulk writes are covered here"""
+    invalidate_patients({instance.patient_id for instance in instances})
+
+# Latest-state readings pushed as 'patient_update' events (kind -> serializer)
+LIVE_READINGS = {
+    KidneyMetrics: ('kidney_metrics', KidneyMetricsSerializer),
+    VitalSigns: ('vital_signs', VitalSignsSerializer),
+}
+
+@receiver(observations_recorded)
+def broadcast_recorded_observations(sender, instances, **kwargs):
+    """Push new readings to subscribers; the broadcaster coalesces bursts"""
+    if sender is LabResult:
+        for result in instances:
+            send_patient_event(result.patient_id, 'lab_result', {'result': LabResultSerializer(result).data})
+        return
+    
+    if sender not in LIVE_READINGS:
+        return
+    kind, serializer_class = LIVE_READINGS[sender]
+    # Only each patient's newest reading in the batch matters to a live view
+    latest = {}
+    for instance in sorted(instances, key=lambda instance: instance.timestamp):
+        latest[instance.patient_id] = instance
+    for patient_id, instance in latest.items():
+        send_patient_event(patient_id, 'patient_update', {
+            'kind': kind,
+            'data': serializer_class(instance).data
+        }, ward_wide=True)
\ No newline at end of file
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after KidneyMetrics, LabResult or VitalSigns rows have been written, for
+# single saves and bulk inserts alike. `sender` is the model class and
+# `instances` the list of saved rows.
+observations_recorded = Signal()
@@ -0,0 +1,52 @@
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from patients.models import Patient
+from .ingest import ingest_observations
+from .models import KidneyMetrics, LabResult, VitalSigns
+from .signals import observations_recorded
+
+class IngestValidationTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Test', last_name='Patient', date_of_birth=date(1960, 1, 1), gender='female'
+        )
+    
+    def metrics(self, **values):
+        return {'type': 'kidney_metrics', 'patient_id': str(self.patient.pk),
+                'egfr': 45.5, 'creatinine': 1.4, 'stage': 3, **values}
+    
+    def messages(self, summary):
+        return {error['index']: error['messages'] for error in summary['errors']}
+    
+    def test_decimal_digits_checked_after_rounding(self):
+        summary = ingest_observations([self.metrics(egfr=999.999), self.metrics(egfr=999.994)])
+        self.assertEqual(list(self.messages(summary)), [0])
+        self.assertIn('egfr', self.messages(summary)[0])
+        self.assertEqual(list(KidneyMetrics.objects.values_list('egfr', flat=True)), [Decimal('999.99')])
+    
+    def test_non_string_text_rejected(self):
+        summary = ingest_observations([{
+            'type': 'lab_result', 'patient_id': str(self.patient.pk), 'test_name': {'name': 'Creatinine'},
+            'value': 1.2, 'unit': 'mg/dL', 'test_date': '2024-01-01T00:00:00Z'
+        }])
+        self.assertEqual(self.messages(summary), {0: {'test_name': 'Not a valid string.'}})
+        self.assertFalse(LabResult.objects.exists())
+    
+    def test_integer_range_checked(self):
+        vitals = {'type': 'vital_signs', 'patient_id': str(self.patient.pk),
+                  'timestamp': '2024-01-01T00:00:00Z', 'systolic_bp': 130, 'diastolic_bp': 85}
+        summary = ingest_observations([{**vitals, 'heart_rate': 1e12}, {**vitals, 'heart_rate': 72}])
+        self.assertEqual(list(self.messages(summary)), [0])
+        self.assertIn('heart_rate', self.messages(summary)[0])
+        self.assertEqual(VitalSigns.objects.get().heart_rate, 72)
+    
+    def test_failing_receiver_does_not_fail_committed_batch(self):
+        def broken(sender, instances, **kwargs):
+            raise RuntimeError('receiver failed')
+        observations_recorded.connect(broken)
+        self.addCleanup(observations_recorded.disconnect, broken)
+        
+        summary = ingest_observations([self.metrics()])
+        self.assertEqual(summary['created'], {'kidney_metrics': 1})
+        self.assertEqual(KidneyMetrics.objects.count(), 1)
\ No newline at end of file
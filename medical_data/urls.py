@@ -25,5 +25,8 @@ urlpatterns = [
         'get': 'vital_signs',
         'post': 'vital_signs'
     }), name='patient-vitals'),
+    path('observations/bulk/', MedicalDataViewSet.as_view({
+        'post': 'bulk_ingest'
+    }), name='observations-bulk'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -3,11 +3,16 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from patients.models import Patient
+from backend.cache import cached
 from .models import KidneyMetrics, LabResult, Medication, VitalSigns
 from .serializers import (
     KidneyMetricsSerializer, LabResultSerializer, 
     MedicationSerializer, VitalSignsSerializer
 )
+from .signals import observations_recorded
+from .pagination import history_response
+from .downsampling import SERIES_FIELDS, downsampled_response
+from .ingest import MAX_OBSERVATIONS, ingest_observations
 
 class MedicalDataViewSet(viewsets.ViewSet):
     
@@ -16,17 +21,21 @@ class MedicalDataViewSet(viewsets.ViewSet):
         patient = get_object_or_404(Patient, pk=pk)
         
         if request.method == 'GET':
-            metrics = KidneyMetrics.objects.filter(patient=patient).order_by('-timestamp')[:1]
-            serializer = KidneyMetricsSerializer(metrics, many=True)
+            def latest_metrics():
+                metrics = KidneyMetrics.objects.filter(patient=patient).order_by('-timestamp')[:1]
+                serializer = KidneyMetricsSerializer(metrics, many=True)
+                return serializer.data[0] if serializer.data else None
+            
             return Response({
                 'success': True,
-                'data': serializer.data[0] if serializer.data else None
+                'data': cached('latest_metrics', latest_metrics, patient_id=patient.pk)
             })
         
         elif request.method == 'POST':
             serializer = KidneyMetricsSerializer(data=request.data)
             if serializer.is_valid():
                 serializer.save(patient=patient)
+                observations_recorded.send(sender=KidneyMetrics, instances=[serializer.instance])
                 return Response({
                     'success': True,
                     'data': serializer.data
@@ -39,29 +48,24 @@ class MedicalDataViewSet(viewsets.ViewSet):
     @action(detail=True, methods=['get'], url_path='metrics/history')
     def metrics_history(self, request, pk=None):
         patient = get_object_or_404(Patient, pk=pk)
-        metrics = KidneyMetrics.objects.filter(patient=patient).order_by('-timestamp')
-        serializer = KidneyMetricsSerializer(metrics, many=True)
-        return Response({
-            'success': True,
-            'data': serializer.data
-        })
+        metrics = KidneyMetrics.objects.filter(patient=patient)
+        if 'max_points' in request.query_params:
+            return downsampled_response(request, metrics, 'timestamp', SERIES_FIELDS['KidneyMetrics'])
+        return history_response(request, metrics, KidneyMetricsSerializer, 'timestamp')
     
     @action(detail=True, methods=['get', 'post'], url_path='lab-results')
     def lab_results(self, request, pk=None):
         patient = get_object_or_404(Patient, pk=pk)
         
         if request.method == 'GET':
-            results = LabResult.objects.filter(patient=patient).order_by('-test_date')
-            serializer = LabResultSerializer(results, many=True)
-            return Response({
-                'success': True,
-                'data': serializer.data
-            })
+            results = LabResult.objects.filter(patient=patient)
+            return history_response(request, results, LabResultSerializer, 'test_date')
         
         elif request.method == 'POST':
             serializer = LabResultSerializer(data=request.data)
             if serializer.is_valid():
                 serializer.save(patient=patient)
+                observations_recorded.send(sender=LabResult, instances=[serializer.instance])
                 return Response({
                     'success': True,
                     'data': serializer.data
@@ -101,17 +105,16 @@ class MedicalDataViewSet(viewsets.ViewSet):
         patient = get_object_or_404(Patient, pk=pk)
         
         if request.method == 'GET':
-            vitals = VitalSigns.objects.filter(patient=patient).order_by('-timestamp')
-            serializer = VitalSignsSerializer(vitals, many=True)
-            return Response({
-                'success': True,
-                'data': serializer.data
-            })
+            vitals = VitalSigns.objects.filter(patient=patient)
+            if 'max_points' in request.query_params:
+                return downsampled_response(request, vitals, 'timestamp', SERIES_FIELDS['VitalSigns'])
+            return history_response(request, vitals, VitalSignsSerializer, 'timestamp')
         
         elif request.method == 'POST':
             serializer = VitalSignsSerializer(data=request.data)
             if serializer.is_valid():
                 serializer.save(patient=patient)
+                observations_recorded.send(sender=VitalSigns, instances=[serializer.instance])
                 return Response({
                     'success': True,
                     'data': serializer.data
@@ -121,6 +124,33 @@ class MedicalDataViewSet(viewsets.ViewSet):
                 'error': {'message': 'Invalid data', 'details': serializer.errors}
             }, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='observations/bulk')
+    def bulk_ingest(self, request):
+        """Insert many kidney metrics, lab results and vitals across patients in one request"""
+        observations = request.data.get('observations') if isinstance(request.data, dict) else request.data
+        if not isinstance(observations, list) or not observations:
+            return Response({
+                'success': False,
+                'error': {'message': 'Provide a non-empty "observations" list'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(observations) > MAX_OBSERVATIONS:
+            return Response({
+                'success': False,
+                'error': {'message': f'At most {MAX_OBSERVATIONS} observations per request'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(observation, dict) for observation in observations):
+            return Response({
+                'success': False,
+                'error': {'message': 'Every observation must be an object'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = ingest_observations(observations)
+        created = sum(summary['created'].values())
+        return Response({
+            'success': created > 0,
+            'data': summary
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
 class MedicationViewSet(viewsets.ModelViewSet):
     queryset = Medication.objects.all()
     serializer_class = MedicationSerializer
@@ -0,0 +1,31 @@
+from .batch import build_prediction
+from .features import load_snapshot
+from .model_registry import get_ml_service
+from .models import MLPrediction
+from .prediction_cache import prediction_cache
+
+def analyze_patient(patient, ml_service=None):
+    """Run (or reuse) the ML analysis of one patient
+    
+    Returns (prediction, created). When the patient's features and the model
+    are unchanged since a recent analysis, the existing MLPrediction row is
+    returned and nothing is recomputed or inserted.
+    """
+    ml_service = ml_service or get_ml_service()
+    snapshot = load_snapshot(patient)
+    features = ml_service.extract_patient_features(patient, snapshot=snapshot)
+    
+    key = prediction_cache.make_key(patient.id, ml_service.model_version, features)
+    prediction_id = prediction_cache.get(key)
+    if prediction_id is not None:
+        prediction = MLPrediction.objects.filter(id=prediction_id).first()
+        if prediction is not None:
+            return prediction, False
+        prediction_cache.discard(key)
+    
+    prediction_result = ml_service.predict_ckd_risk(patient, snapshot=snapshot)
+    prediction = build_prediction(patient, prediction_result)
+    prediction.save()
+    
+    prediction_cache.set(key, prediction.id)
+    return prediction, True
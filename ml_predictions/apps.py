@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class MlPredictionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'ml_predictions'
\ No newline at end of file
+    name = 'ml_predictions'
+    
+    def ready(self):
+        from . import receivers  # noqa: F401
\ No newline at end of file
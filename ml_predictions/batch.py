@@ -0,0 +1,90 @@
+import time
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from backend.cache import invalidate_patients
+from medical_data.models import KidneyMetrics
+from patients.models import Patient
+from .models import MLPrediction
+from .model_registry import get_ml_service
+
+def patients_with_kidney_metrics():
+    """Patients that have at least one KidneyMetrics reading"""
+    return Patient.objects.filter(
+        Exists(KidneyMetrics.objects.filter(patient=OuterRef('pk')))
+    ).order_by('pk')
+
+def build_prediction(patient, prediction_result):
+    """Build an unsaved MLPrediction from an MLService result"""
+    return MLPrediction(
+        patient=patient,
+        prediction_result=prediction_result['result'],
+        confidence=prediction_result['confidence'],
+        predicted_stage=prediction_result['stage'],
+        risk_level=prediction_result['risk_level'],
+        input_data=prediction_result['input_metrics'],
+        recommendations=prediction_result['recommendations'],
+        model_version=prediction_result['model_version']
+    )
+
+def _chunked(patients, chunk_size):
+    if hasattr(patients, 'iterator'):
+        patients = patients.iterator(chunk_size=chunk_size)
+    chunk = []
+    for patient in patients:
+        chunk.append(patient)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def score_patients(patients, chunk_size=None, ml_service=None, progress=None, on_chunk=None):
+    """Score patients chunk by chunk and bulk insert their predictions
+    
+    Each chunk is turned into one feature matrix, scored with a single
+    scaler.transform/predict_proba call and written with one bulk_create.
+    `progress` is called with the running summary after every chunk and
+    `on_chunk` with the chunk's saved predictions and (patient, error) pairs.
+    """
+    chunk_size = chunk_size or getattr(settings, 'ML_BATCH_CHUNK_SIZE', 500)
+    ml_service = ml_service or get_ml_service()
+    
+    summary = {
+        'scored': 0,
+        'failed': 0,
+        'errors': [],
+        'chunks': 0,
+        'chunk_size': chunk_size,
+        'model_version': ml_service.model_version,
+    }
+    start = time.perf_counter()
+    
+    for chunk in _chunked(patients, chunk_size):
+        results, errors = ml_service.predict_batch(chunk)
+        
+        predictions = MLPrediction.objects.bulk_create(
+            [build_prediction(patient, result) for patient, result in results],
+            batch_size=chunk_size
+        )
+        # bulk_create skips post_save, so retire cached latest predictions here
+        invalidate_patients([prediction.patient_id for prediction in predictions])
+        
+        summary['chunks'] += 1
+        summary['scored'] += len(results)
+        summary['failed'] += len(errors)
+        summary['errors'].extend(
+            {'patient_id': str(patient.id), 'message': message} for patient, message in errors
+        )
+        
+        if on_chunk:
+            on_chunk(predictions, errors)
+        if progress:
+            progress(_with_rate(summary, start))
+    
+    return _with_rate(summary, start)
+
+def _with_rate(summary, start):
+    elapsed = time.perf_counter() - start
+    summary['seconds'] = round(elapsed, 3)
+    summary['rows_per_second'] = round(summary['scored'] / elapsed, 1) if elapsed > 0 else None
+    return summary
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import joblib
+from django.conf import settings
+from django.utils import timezone
+from .features import SERVED_FEATURES
+from .tree_engine import ENGINE_DIR, CompiledGradientBoosting
+
+# Versioned model bundles: ML/models_and_scalers/bundles/<version>/ holds the
+# artifacts MLService loads, their memory-mappable engine/ export,
+# model_summary.json and manifest.json. The version
+# is derived from the artifacts' content hash, so retraining on the same data
+# with the same parameters reproduces the same version. bundles/CURRENT names
+# the bundle to serve; without it the flat legacy files in
+# ML/models_and_scalers are used.
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / 'ML' / 'models_and_scalers'
+BUNDLES_DIR = MODELS_DIR / 'bundles'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+MODEL_FILES = ('best_ckd_model.pkl', 'feature_scaler.pkl', 'selected_features.pkl')
+BUNDLE_FILES = MODEL_FILES + ('model_summary.json',)
+
+class BundleError(Exception):
+    pass
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def content_hash(file_hashes):
+    """Hash over {file name: sha256} (names included, order independent)"""
+    digest = hashlib.sha256()
+    for name in sorted(file_hashes):
+        digest.update(f'{name}:{file_hashes[name]}\n'.encode())
+    return digest.hexdigest()
+
+def read_manifest(bundle_dir):
+    """manifest.json of a bundle directory, or None if it is not a bundle"""
+    path = Path(bundle_dir) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def verify_bundle(bundle_dir, manifest=None):
+    """Check every artifact against the manifest hashes; returns the manifest"""
+    bundle_dir = Path(bundle_dir)
+    manifest = manifest or read_manifest(bundle_dir)
+    if manifest is None:
+        raise BundleError(f'{bundle_dir} has no {MANIFEST_FILE}')
+    
+    for name, expected in manifest['files'].items():
+        try:
+            actual = file_hash(bundle_dir / name)
+        except OSError:
+            raise BundleError(f'{bundle_dir.name}: {name} is missing')
+        if actual != expected:
+            raise BundleError(f'{bundle_dir.name}: {name} does not match the manifest')
+    if content_hash(manifest['files']) != manifest['content_hash']:
+        raise BundleError(f'{bundle_dir.name}: manifest content hash is inconsistent')
+    return manifest
+
+def check_servable(artifacts_dir):
+    """Refuse artifacts selecting features MLService cannot build (they would be scored as 0.0)"""
+    selected = joblib.load(Path(artifacts_dir) / 'selected_features.pkl')
+    unknown = [feature for feature in selected if feature not in SERVED_FEATURES]
+    if unknown:
+        raise BundleError(f"{Path(artifacts_dir).name}: selects features the service cannot build: {', '.join(unknown)}")
+
+def current_bundle(bundles_dir=None):
+    """Directory of the bundle to serve: settings.ML_MODEL_BUNDLE (a version or path) or bundles/CURRENT"""
+    bundles_dir = Path(bundles_dir) if bundles_dir else BUNDLES_DIR
+    selected = getattr(settings, 'ML_MODEL_BUNDLE', None)
+    if selected:
+        path = Path(selected)
+        return path if path.is_absolute() else bundles_dir / selected
+    
+    try:
+        version = (bundles_dir / CURRENT_FILE).read_text().strip()
+    except OSError:
+        return None
+    return bundles_dir / version if version else None
+
+def export_engine(artifacts_dir):
+    """Compile the pickled model + scaler into memory-mappable arrays under artifacts_dir/engine"""
+    artifacts_dir = Path(artifacts_dir)
+    model = joblib.load(artifacts_dir / 'best_ckd_model.pkl')
+    scaler = joblib.load(artifacts_dir / 'feature_scaler.pkl')
+    selected_features = joblib.load(artifacts_dir / 'selected_features.pkl')
+    engine = CompiledGradientBoosting.from_sklearn(model, scaler)
+    engine.save(artifacts_dir / ENGINE_DIR, selected_features=list(selected_features))
+    return artifacts_dir / ENGINE_DIR
+
+def _artifact_names(bundle_dir):
+    """Every file of a bundle except its manifest, as paths relative to the bundle"""
+    return sorted(
+        path.relative_to(bundle_dir).as_posix() for path in bundle_dir.rglob('*')
+        if path.is_file() and path.name != MANIFEST_FILE
+    )
+
+def write_bundle(artifacts_dir, metrics=None, training=None, bundles_dir=None, activate=True):
+    """Copy the artifacts of a training run into a new bundle and write its manifest
+    
+    The bundle is assembled in a temporary directory (including the
+    memory-mappable engine export) and renamed into place, and CURRENT is
+    replaced atomically, so a reloading MLService never sees a partial
+    bundle. Returns the manifest.
+    """
+    artifacts_dir = Path(artifacts_dir)
+    bundles_dir = Path(bundles_dir) if bundles_dir else BUNDLES_DIR
+    missing = [name for name in BUNDLE_FILES if not (artifacts_dir / name).exists()]
+    if missing:
+        raise BundleError(f"Training run is missing: {', '.join(missing)}")
+    check_servable(artifacts_dir)
+    
+    bundles_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=bundles_dir))
+    try:
+        for name in BUNDLE_FILES:
+            shutil.copy2(artifacts_dir / name, staging / name)
+        export_engine(staging)
+        
+        files = {name: file_hash(staging / name) for name in _artifact_names(staging)}
+        digest = content_hash(files)
+        manifest = {
+            'version': digest[:12],
+            'content_hash': digest,
+            'created_at': timezone.now().isoformat(),
+            'files': files,
+            'metrics': metrics or {},
+            'training': training or {},
+        }
+        
+        bundle_dir = bundles_dir / manifest['version']
+        if bundle_dir.exists():
+            # Same artifacts as an existing bundle: keep its manifest (and creation time)
+            manifest = read_manifest(bundle_dir)
+            shutil.rmtree(staging)
+        else:
+            with open(staging / MANIFEST_FILE, 'w') as f:
+                json.dump(manifest, f, indent=2, default=str)
+            os.replace(staging, bundle_dir)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    
+    if activate:
+        activate_bundle(manifest['version'], bundles_dir)
+    return manifest
+
+def activate_bundle(version, bundles_dir=None):
+    """Point CURRENT at a bundle (atomic rename)"""
+    bundles_dir = Path(bundles_dir) if bundles_dir else BUNDLES_DIR
+    verify_bundle(bundles_dir / version)
+    check_servable(bundles_dir / version)
+    pointer = bundles_dir / f'.{CURRENT_FILE}.{os.getpid()}'
+    pointer.write_text(version + '\n')
+    os.replace(pointer, bundles_dir / CURRENT_FILE)
+
+def list_bundles(bundles_dir=None):
+    """Manifests of every bundle, newest first"""
+    bundles_dir = Path(bundles_dir) if bundles_dir else BUNDLES_DIR
+    if not bundles_dir.exists():
+        return []
+    manifests = [read_manifest(path) for path in bundles_dir.iterdir() if path.is_dir() and not path.name.startswith('.')]
+    return sorted(filter(None, manifests), key=lambda manifest: manifest['created_at'], reverse=True)
\ No newline at end of file
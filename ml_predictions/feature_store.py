@@ -0,0 +1,86 @@
+from collections import defaultdict
+from datetime import datetime
+from django.db import transaction
+from django.utils import timezone
+from patients.models import Patient
+from .features import FEATURE_FIELDS, load_snapshots, merge_observed, observation_features
+from .models import PatientFeatureVector
+
+VECTOR_FIELDS = list(FEATURE_FIELDS.values()) + ['observed_at', 'updated_at']
+
+def _apply(vector, observed):
+    """Apply {feature: (value, timestamp)} to a vector, skipping values older than the stored ones"""
+    changed = False
+    for feature, (value, timestamp) in observed.items():
+        stored_at = vector.observed_at.get(feature)
+        if stored_at and datetime.fromisoformat(stored_at) > timestamp:
+            continue
+        setattr(vector, FEATURE_FIELDS[feature], value)
+        vector.observed_at[feature] = timestamp.isoformat()
+        changed = True
+    return changed
+
+def _build_vector(snapshot):
+    vector = PatientFeatureVector(patient=snapshot.patient, observed_at={})
+    _apply(vector, {
+        feature: observation for feature, observation in snapshot.observed_features().items()
+        if feature in FEATURE_FIELDS
+    })
+    vector.updated_at = timezone.now()
+    return vector
+
+def refresh_feature_vectors(patients, batch_size=500):
+    """Rebuild feature vectors from the latest raw observations
+    
+    `patients` may be Patient instances, a queryset or primary keys. Vectors are
+    upserted in batches, each costing a constant number of queries.
+    Returns {patient_id: vector}.
+    """
+    patient_ids = [getattr(patient, 'pk', patient) for patient in patients]
+    vectors = {}
+    
+    for start in range(0, len(patient_ids), batch_size):
+        batch = Patient.objects.filter(pk__in=patient_ids[start:start + batch_size])
+        built = [_build_vector(snapshot) for snapshot in load_snapshots(batch, with_feature_vectors=False)]
+        PatientFeatureVector.objects.bulk_create(
+            built,
+            update_conflicts=True,
+            unique_fields=['patient'],
+            update_fields=VECTOR_FIELDS,
+        )
+        vectors.update((vector.patient_id, vector) for vector in built)
+    
+    return vectors
+
+def record_observations(instances):
+    """Fold newly written observations into their patients' feature vectors
+    
+    Only features carried by the new rows are touched, and only if the rows are
+    at least as recent as the stored values. Patients without a vector yet get
+    one built from their full latest observations.
+    """
+    observed_by_patient = defaultdict(dict)
+    for instance in instances:
+        values, timestamp = observation_features(instance)
+        if values and timestamp is not None:
+            merge_observed(observed_by_patient[instance.patient_id], values, timestamp)
+    
+    if not observed_by_patient:
+        return
+    
+    with transaction.atomic():
+        vectors = PatientFeatureVector.objects.select_for_update().in_bulk(list(observed_by_patient))
+        
+        missing = [patient_id for patient_id in observed_by_patient if patient_id not in vectors]
+        if missing:
+            # New rows are already saved, so a full refresh includes them
+            refresh_feature_vectors(missing)
+        
+        changed = []
+        for patient_id, vector in vectors.items():
+            if _apply(vector, observed_by_patient[patient_id]):
+                vector.updated_at = timezone.now()
+                changed.append(vector)
+        
+        if changed:
+            PatientFeatureVector.objects.bulk_update(changed, VECTOR_FIELDS)
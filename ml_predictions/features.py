@@ -0,0 +1,227 @@
+from datetime import date
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from medical_data.models import KidneyMetrics, LabResult, VitalSigns
+from patients.models import Patient, MedicalHistory
+from .models import PatientFeatureVector
+
+# Model features stored on PatientFeatureVector (model feature -> field name)
+FEATURE_FIELDS = {
+    'BMI': 'bmi',
+    'DietQuality': 'diet_quality',
+    'FamilyHistoryKidneyDisease': 'family_history_kidney_disease',
+    'SystolicBP': 'systolic_bp',
+    'FastingBloodSugar': 'fasting_blood_sugar',
+    'HbA1c': 'hba1c',
+    'SerumCreatinine': 'serum_creatinine',
+    'BUNLevels': 'bun_levels',
+    'GFR': 'gfr',
+    'ProteinInUrine': 'protein_in_urine',
+    'HemoglobinLevels': 'hemoglobin_levels',
+    'CholesterolHDL': 'cholesterol_hdl',
+    'Edema': 'edema',
+    'MuscleCramps': 'muscle_cramps',
+    'Itching': 'itching',
+}
+
+# Every feature MLService can build for a patient; models may only select these
+SERVED_FEATURES = (*FEATURE_FIELDS, 'Age', 'DiastolicBP')
+
+# Values used for features that have never been observed
+FEATURE_DEFAULTS = {
+    'BMI': 25.0,
+    'SystolicBP': 120.0,
+    'HemoglobinLevels': 12.0,
+    'BUNLevels': 20.0,
+}
+
+# Lab tests that feed model features (LabResult.test_name -> model feature)
+LAB_FEATURES = {
+    'Hemoglobin': 'HemoglobinLevels',
+    'BUN': 'BUNLevels',
+    'HbA1c': 'HbA1c',
+    'Glucose': 'FastingBloodSugar',
+    'Fasting Blood Sugar': 'FastingBloodSugar',
+    'HDL Cholesterol': 'CholesterolHDL',
+    'Serum Creatinine': 'SerumCreatinine',
+}
+
+def observation_features(instance):
+    """Model features carried by one KidneyMetrics, VitalSigns or LabResult row
+    
+    Returns ({feature: value}, observation timestamp).
+    """
+    values = {}
+    
+    if isinstance(instance, KidneyMetrics):
+        values['GFR'] = float(instance.egfr)
+        values['SerumCreatinine'] = float(instance.creatinine)
+        if instance.proteinuria is not None:
+            values['ProteinInUrine'] = float(instance.proteinuria)
+        if instance.systolic_bp is not None:
+            values['SystolicBP'] = float(instance.systolic_bp)
+        return values, _aware(instance.timestamp)
+    
+    if isinstance(instance, VitalSigns):
+        values['SystolicBP'] = float(instance.systolic_bp)
+        if instance.weight and instance.height:
+            # weight in kg, height in cm
+            values['BMI'] = round(float(instance.weight) / (float(instance.height) / 100) ** 2, 2)
+        return values, _aware(instance.timestamp)
+    
+    if isinstance(instance, LabResult):
+        feature = LAB_FEATURES.get(instance.test_name)
+        if feature:
+            values[feature] = float(instance.value)
+        return values, _aware(instance.test_date)
+    
+    return values, None
+
+def _aware(timestamp):
+    if timestamp is not None and timezone.is_naive(timestamp):
+        return timezone.make_aware(timestamp)
+    return timestamp
+
+def merge_observed(observed, values, timestamp):
+    """Merge {feature: value} observed at `timestamp` into {feature: (value, timestamp)}, newest wins"""
+    for feature, value in values.items():
+        current = observed.get(feature)
+        if current is None or timestamp >= current[1]:
+            observed[feature] = (value, timestamp)
+    return observed
+
+class PatientSnapshot:
+    """Latest observations of one patient.
+    
+    Built once per prediction (or once per batch for many patients) and read by
+    feature extraction, staging, recommendations and the input summary, so none
+    of them have to query the database again.
+    """
+    
+    def __init__(self, patient, kidney_metrics=None, vitals=None, labs=None,
+                 medical_history=None, feature_vector=None):
+        self.patient = patient
+        self.kidney_metrics = kidney_metrics
+        self.vitals = vitals
+        self.labs = labs or {}
+        self.medical_history = medical_history
+        self.feature_vector = feature_vector
+    
+    @property
+    def age(self):
+        return date.today().year - self.patient.date_of_birth.year
+    
+    @property
+    def systolic_bp(self):
+        if self.vitals:
+            return self.vitals.systolic_bp
+        return self.kidney_metrics.systolic_bp or 120
+    
+    @property
+    def diastolic_bp(self):
+        if self.vitals:
+            return self.vitals.diastolic_bp
+        return self.kidney_metrics.diastolic_bp or 80
+    
+    def lab_value(self, test_name, default=None):
+        lab = self.labs.get(test_name)
+        return float(lab.value) if lab else default
+    
+    def observed_features(self):
+        """Newest value of each model feature in the raw observations -> {feature: (value, timestamp)}"""
+        observed = {}
+        for instance in [self.kidney_metrics, self.vitals, *self.labs.values()]:
+            if instance is not None:
+                values, timestamp = observation_features(instance)
+                merge_observed(observed, values, timestamp)
+        
+        if self.medical_history is not None:
+            has_history = any('kidney' in condition.lower() for condition in self.medical_history.family_history)
+            merge_observed(observed, {'FamilyHistoryKidneyDisease': float(has_history)}, self.medical_history.updated_at)
+        
+        return observed
+    
+    def feature_values(self):
+        """Model feature values, read from the stored feature vector when there is one"""
+        if self.feature_vector is not None:
+            values = {
+                feature: getattr(self.feature_vector, field)
+                for feature, field in FEATURE_FIELDS.items()
+            }
+        else:
+            values = {feature: value for feature, (value, _) in self.observed_features().items()}
+        
+        for feature, default in FEATURE_DEFAULTS.items():
+            if values.get(feature) is None:
+                values[feature] = default
+        return values
+
+def _latest_id(model, order_field):
+    return Subquery(
+        model.objects.filter(patient=OuterRef('pk')).order_by(f'-{order_field}').values('id')[:1]
+    )
+
+def _latest_labs(patient_ids, test_names):
+    """Latest LabResult per (patient, test_name) for the given patients"""
+    labs = LabResult.objects.filter(patient_id__in=patient_ids, test_name__in=test_names)
+    
+    if connection.features.can_distinct_on_fields:
+        # PostgreSQL: DISTINCT ON picks the newest row per group using the (patient, -test_date) index
+        return labs.order_by('patient_id', 'test_name', '-test_date').distinct('patient_id', 'test_name')
+    
+    newest = LabResult.objects.filter(
+        patient_id=OuterRef('patient_id'), test_name=OuterRef('test_name')
+    ).order_by('-test_date').values('id')[:1]
+    return labs.filter(id=Subquery(newest))
+
+def load_snapshots(patients, with_feature_vectors=True):
+    """Build snapshots for many patients with a constant number of queries
+    
+    `patients` may be Patient instances or a queryset. One query resolves the
+    latest KidneyMetrics/VitalSigns ids per patient, then one query each loads
+    those rows, the latest lab results, medical histories and stored feature
+    vectors. Snapshots are returned in input order.
+    """
+    patients = list(patients)
+    if not patients:
+        return []
+    patient_ids = [patient.pk for patient in patients]
+    
+    latest = Patient.objects.filter(pk__in=patient_ids).annotate(
+        latest_metrics_id=_latest_id(KidneyMetrics, 'timestamp'),
+        latest_vitals_id=_latest_id(VitalSigns, 'timestamp'),
+    ).values_list('pk', 'latest_metrics_id', 'latest_vitals_id')
+    latest = {pk: (metrics_id, vitals_id) for pk, metrics_id, vitals_id in latest}
+    
+    metrics = KidneyMetrics.objects.in_bulk([ids[0] for ids in latest.values() if ids[0]])
+    vitals = VitalSigns.objects.in_bulk([ids[1] for ids in latest.values() if ids[1]])
+    
+    labs = {}
+    for lab in _latest_labs(patient_ids, list(LAB_FEATURES)):
+        labs.setdefault(lab.patient_id, {})[lab.test_name] = lab
+    
+    histories = {
+        history.patient_id: history
+        for history in MedicalHistory.objects.filter(patient_id__in=patient_ids)
+    }
+    vectors = {}
+    if with_feature_vectors:
+        vectors = PatientFeatureVector.objects.in_bulk(patient_ids)
+    
+    snapshots = []
+    for patient in patients:
+        metrics_id, vitals_id = latest.get(patient.pk, (None, None))
+        snapshots.append(PatientSnapshot(
+            patient,
+            kidney_metrics=metrics.get(metrics_id),
+            vitals=vitals.get(vitals_id),
+            labs=labs.get(patient.pk),
+            medical_history=histories.get(patient.pk),
+            feature_vector=vectors.get(patient.pk),
+        ))
+    return snapshots
+
+def load_snapshot(patient):
+    """Build the snapshot of a single patient"""
+    return load_snapshots([patient])[0]
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import threading
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from backend.events import send_patient_event
+from patients.models import Patient
+from .analysis import analyze_patient
+from .batch import score_patients
+from .models import AnalysisJob
+from .serializers import MLPredictionSerializer
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Per-process worker pool used by the 'thread' backend"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Jobs left behind by an earlier process will never run here
+            fail_stale_jobs()
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ML_JOB_WORKERS', 2),
+                thread_name_prefix='analysis-job'
+            )
+        return _executor
+
+def fail_stale_jobs(job_ids=None):
+    """Mark 'thread' jobs queued or running for longer than ML_JOB_STALE_AFTER as failed
+    
+    Their pool lives in the process that enqueued them, so jobs in flight
+    when it exits would otherwise stay queued/running forever. Returns the
+    number of jobs marked.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'ML_JOB_STALE_AFTER', 3600))
+    jobs = AnalysisJob.objects.filter(backend='thread').filter(
+        Q(status='queued', created_at__lt=cutoff) | Q(status='running', started_at__lt=cutoff)
+    )
+    if job_ids is not None:
+        jobs = jobs.filter(id__in=job_ids)
+    return jobs.update(status='failed', error='Job did not finish (worker process exited)', finished_at=now)
+
+def job_backend():
+    return getattr(settings, 'ML_JOB_BACKEND', 'thread')
+
+def enqueue_analysis(patient_ids, requested_by=None, chunk_size=None):
+    """Create analysis jobs for the given patients and hand them to the job backend
+    
+    A single patient becomes one job; larger sets are split into jobs of
+    `chunk_size` patients that are scored as one batch each. Jobs are
+    dispatched once the surrounding transaction commits. Returns the jobs.
+    """
+    patient_ids = [str(patient_id) for patient_id in patient_ids]
+    chunk_size = chunk_size or getattr(settings, 'ML_BATCH_CHUNK_SIZE', 500)
+    backend = job_backend()
+    
+    jobs = AnalysisJob.objects.bulk_create([
+        AnalysisJob(
+            patient_ids=patient_ids[start:start + chunk_size],
+            backend=backend,
+            requested_by=requested_by if requested_by and requested_by.is_authenticated else None
+        )
+        for start in range(0, len(patient_ids), chunk_size)
+    ])
+    
+    job_ids = [str(job.id) for job in jobs]
+    transaction.on_commit(lambda: _dispatch(job_ids, backend))
+    return jobs
+
+def _dispatch(job_ids, backend):
+    if backend == 'celery':
+        from .tasks import run_analysis_job_task
+        for job_id in job_ids:
+            run_analysis_job_task.delay(job_id)
+    elif backend == 'sync':
+        for job_id in job_ids:
+            run_analysis_job(job_id)
+    else:
+        executor = _get_executor()
+        for job_id in job_ids:
+            executor.submit(_run_in_thread, job_id)
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_analysis_job(job_id)
+    finally:
+        # Worker threads hold their own connection; don't leak it between jobs
+        connection.close()
+
+def run_analysis_job(job_id):
+    """Run one queued job and push its outcome to each patient's channel group"""
+    claimed = AnalysisJob.objects.filter(id=job_id, status='queued').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        # Already picked up by another worker (e.g. a redelivered Celery task)
+        return None
+    job = AnalysisJob.objects.get(id=job_id)
+    
+    try:
+        if len(job.patient_ids) == 1:
+            _run_single(job)
+        else:
+            _run_batch(job)
+        job.status = 'succeeded'
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        for patient_id in job.patient_ids:
+            _notify(job, patient_id, error=job.error)
+    
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'prediction', 'summary', 'error', 'finished_at'])
+    return job
+
+def _run_single(job):
+    patient = Patient.objects.get(id=job.patient_ids[0])
+    prediction, created = analyze_patient(patient)
+    job.prediction = prediction
+    job.summary = {'scored': 1, 'failed': 0, 'errors': [], 'cached': not created}
+    _notify(job, patient.id, prediction=prediction)
+
+def _run_batch(job):
+    patients = Patient.objects.filter(id__in=job.patient_ids).order_by('pk')
+    
+    def notify_chunk(predictions, errors):
+        for prediction in predictions:
+            _notify(job, prediction.patient_id, prediction=prediction)
+        for patient, message in errors:
+            _notify(job, patient.id, error=message)
+    
+    job.summary = score_patients(patients, chunk_size=len(job.patient_ids), on_chunk=notify_chunk)
+
+def _notify(job, patient_id, prediction=None, error=None):
+    send_patient_event(patient_id, 'analysis_complete', {
+        'job_id': str(job.id),
+        'status': 'failed' if error else 'succeeded',
+        'prediction': MLPredictionSerializer(prediction).data if prediction else None,
+        'error': error,
+    })
@@ -0,0 +1,69 @@
+import time
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from ml_predictions.ml_service import MLService
+from ml_predictions.tree_engine import CompiledGradientBoosting
+
+class Command(BaseCommand):
+    help = 'Verify the compiled tree engine against sklearn and benchmark inference latency'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', type=str, help='CKD dataset CSV to draw the held-out rows from')
+        parser.add_argument('--rows', type=int, default=5000, help='Number of held-out rows')
+        parser.add_argument('--repeat', type=int, default=2000, help='Single-row calls to time')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for row sampling')
+    
+    def handle(self, *args, **options):
+        # The sklearn objects are the reference, so load the pickles
+        ml_service = MLService(model_format='pickle')
+        if ml_service.model is None or ml_service.scaler is None:
+            raise CommandError('Trained model artifacts not found')
+        
+        model, scaler = ml_service.model, ml_service.scaler
+        engine = CompiledGradientBoosting.from_sklearn(model, scaler)
+        X = self.held_out_rows(ml_service, options)
+        
+        # Correctness
+        check = engine.verify(model, X, scaler)
+        self.stdout.write(f'Verified {check["rows"]} rows: identical={check["identical"]}, max |diff|={check["max_abs_diff"]:.3e}')
+        if not check['identical']:
+            raise CommandError('Compiled engine does not match sklearn predictions')
+        
+        # Single-row latency
+        row = X[:1]
+        compiled_us = self.time_calls(lambda: engine.predict_proba(row), options['repeat'])
+        sklearn_us = self.time_calls(lambda: model.predict_proba(scaler.transform(row)), options['repeat'])
+        self.stdout.write('Single row latency (median / p99):')
+        self.stdout.write(f'  compiled: {np.median(compiled_us):8.1f} / {np.percentile(compiled_us, 99):8.1f} µs')
+        self.stdout.write(f'  sklearn:  {np.median(sklearn_us):8.1f} / {np.percentile(sklearn_us, 99):8.1f} µs')
+        
+        # Batch throughput
+        self.stdout.write(f'Batch throughput ({len(X)} rows):')
+        for name, predict in [('compiled', lambda: engine.predict_proba(X)),
+                              ('sklearn', lambda: model.predict_proba(scaler.transform(X)))]:
+            seconds = min(self.time_calls(predict, 5)) / 1e6
+            self.stdout.write(f'  {name}: {len(X) / seconds:,.0f} rows/s')
+    
+    def held_out_rows(self, ml_service, options):
+        rng = np.random.default_rng(options['seed'])
+        
+        if options['csv']:
+            try:
+                df = pd.read_csv(options['csv'])
+            except FileNotFoundError:
+                raise CommandError(f'Dataset not found: {options["csv"]}')
+            X = df[ml_service.selected_features].to_numpy(dtype=np.float64)
+            return X[rng.permutation(len(X))[:options['rows']]]
+        
+        # No dataset: sample around the training distribution stored in the scaler
+        scaler = ml_service.scaler
+        return rng.normal(scaler.mean_, scaler.scale_, size=(options['rows'], len(scaler.mean_)))
+    
+    def time_calls(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1e6)
+        return timings
\ No newline at end of file
@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import joblib
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from ml_predictions.bundles import MODEL_FILES, MODELS_DIR, current_bundle, export_engine
+from ml_predictions.tree_engine import ENGINE_DIR, ENGINE_META, CompiledGradientBoosting
+
+class Command(BaseCommand):
+    help = 'Compare model load time: joblib.load of the pickles vs the memory-mapped engine arrays'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--models-dir', type=str, help='Bundle or artifacts directory (default: the served one)')
+        parser.add_argument('--repeat', type=int, default=50, help='Loads to time per format')
+        parser.add_argument('--rows', type=int, default=1000, help='Random rows used to check the mapped engine')
+    
+    def handle(self, *args, **options):
+        models_dir = Path(options['models_dir']) if options['models_dir'] else (current_bundle() or MODELS_DIR)
+        if not all((models_dir / name).exists() for name in MODEL_FILES):
+            raise CommandError(f'Trained model artifacts not found in {models_dir}')
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            if not (models_dir / ENGINE_DIR / ENGINE_META).exists():
+                # Legacy artifacts: export the engine into a scratch copy
+                for name in MODEL_FILES:
+                    shutil.copy2(models_dir / name, Path(tmp) / name)
+                export_engine(tmp)
+                engine_dir = Path(tmp) / ENGINE_DIR
+            else:
+                engine_dir = models_dir / ENGINE_DIR
+            
+            self.verify_engine(models_dir, engine_dir, options['rows'])
+            
+            pickle_ms = self.time_loads(lambda: self.load_pickles(models_dir), options['repeat'])
+            mmap_ms = self.time_loads(lambda: CompiledGradientBoosting.load(engine_dir), options['repeat'])
+            engine_bytes = sum(path.stat().st_size for path in engine_dir.iterdir())
+        
+        pickle_bytes = sum((models_dir / name).stat().st_size for name in MODEL_FILES)
+        self.stdout.write(f'Load time from {models_dir} (median / min):')
+        self.stdout.write(f'  joblib.load + compile: {np.median(pickle_ms):8.2f} / {min(pickle_ms):8.2f} ms  ({pickle_bytes / 1024:.0f} KB)')
+        self.stdout.write(f'  mmap engine:           {np.median(mmap_ms):8.2f} / {min(mmap_ms):8.2f} ms  ({engine_bytes / 1024:.0f} KB)')
+        self.stdout.write(self.style.SUCCESS(f'Memory-mapped load is {np.median(pickle_ms) / np.median(mmap_ms):.1f}x faster'))
+    
+    def load_pickles(self, models_dir):
+        """What MLService does with ML_MODEL_FORMAT='pickle'"""
+        model = joblib.load(models_dir / 'best_ckd_model.pkl')
+        scaler = joblib.load(models_dir / 'feature_scaler.pkl')
+        joblib.load(models_dir / 'selected_features.pkl')
+        return CompiledGradientBoosting.from_sklearn(model, scaler)
+    
+    def verify_engine(self, models_dir, engine_dir, rows):
+        model = joblib.load(models_dir / 'best_ckd_model.pkl')
+        scaler = joblib.load(models_dir / 'feature_scaler.pkl')
+        engine, meta = CompiledGradientBoosting.load(engine_dir)
+        
+        # Rows spread around the training distribution
+        rng = np.random.default_rng(42)
+        X = scaler.mean_ + rng.standard_normal((rows, len(meta['selected_features']))) * scaler.scale_
+        check = engine.verify(model, X, scaler)
+        self.stdout.write(f'Verified {check["rows"]} rows: identical={check["identical"]}, max |diff|={check["max_abs_diff"]:.3e}')
+        if not check['identical']:
+            raise CommandError('Memory-mapped engine does not match sklearn predictions')
+    
+    def time_loads(self, load, repeat):
+        times = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            load()
+            times.append((time.perf_counter() - start) * 1000)
+        return times
\ No newline at end of file
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from patients.models import Patient
+from backend.cache import invalidate_patients
+from ml_predictions.trends import refresh_trends
+
+class Command(BaseCommand):
+    help = 'Recompute eGFR, creatinine and blood pressure trends (and KidneyMetrics progression) from full history'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--patient-id', action='append', default=[], help='Recompute a specific patient (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Patients fitted per batch')
+    
+    def handle(self, *args, **options):
+        patients = Patient.objects.order_by('pk')
+        if options['patient_id']:
+            patients = patients.filter(id__in=options['patient_id'])
+        patient_ids = list(patients.values_list('id', flat=True))
+        
+        start = time.perf_counter()
+        written = refresh_trends(patient_ids, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        
+        # Latest kidney metrics carry the new progression fields
+        invalidate_patients(patient_ids)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {written} trends for {len(patient_ids)} patients in {elapsed:.2f}s'
+        ))
\ No newline at end of file
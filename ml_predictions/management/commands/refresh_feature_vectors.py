@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from patients.models import Patient
+from ml_predictions.feature_store import refresh_feature_vectors
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-patient ML feature vectors from raw observations'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--patient-id', action='append', default=[], help='Rebuild a specific patient (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Patients per upsert batch')
+    
+    def handle(self, *args, **options):
+        patients = Patient.objects.order_by('pk')
+        if options['patient_id']:
+            patients = patients.filter(id__in=options['patient_id'])
+        patient_ids = list(patients.values_list('id', flat=True))
+        
+        start = time.perf_counter()
+        vectors = refresh_feature_vectors(patient_ids, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(vectors)} feature vectors in {elapsed:.2f}s'))
\ No newline at end of file
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from patients.models import Patient
+from ml_predictions.batch import score_patients, patients_with_kidney_metrics
+
+class Command(BaseCommand):
+    help = 'Batch score patients with the ML model and store the predictions'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Score all patients with kidney metrics')
+        parser.add_argument('--patient-id', action='append', default=[], help='Score a specific patient (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=settings.ML_BATCH_CHUNK_SIZE, help='Patients per model call and bulk insert')
+    
+    def handle(self, *args, **options):
+        if not options['all'] and not options['patient_id']:
+            raise CommandError('Use --all or at least one --patient-id')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+        
+        if options['all']:
+            patients = patients_with_kidney_metrics()
+        else:
+            patients = Patient.objects.filter(id__in=options['patient_id']).order_by('pk')
+        
+        self.stdout.write(f'Scoring patients in chunks of {options["chunk_size"]}...')
+        
+        def report(summary):
+            self.stdout.write(
+                f'  chunk {summary["chunks"]}: {summary["scored"]} scored, '
+                f'{summary["failed"]} failed ({summary["rows_per_second"]} rows/s)'
+            )
+        
+        summary = score_patients(patients, chunk_size=options['chunk_size'], progress=report)
+        
+        for error in summary['errors']:
+            self.stdout.write(self.style.WARNING(f'  ✗ {error["patient_id"]}: {error["message"]}'))
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {summary["scored"]} patients in {summary["seconds"]}s '
+            f'({summary["rows_per_second"]} rows/s, model {summary["model_version"]})'
+        ))
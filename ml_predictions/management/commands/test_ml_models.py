@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from patients.models import Patient
-from ml_predictions.ml_service import MLService
+from ml_predictions.model_registry import get_ml_service
 from ml_predictions.models import MLPrediction
 
 class Command(BaseCommand):
@@ -14,7 +14,7 @@ class Command(BaseCommand):
         self.stdout.write('Testing PCA-optimized ML models...')
         
         # Initialize ML service
-        ml_service = MLService()
+        ml_service = get_ml_service()
         
         if options['patient_id']:
             # Test specific patient
@@ -2,34 +2,62 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
+import threading
 from django.conf import settings
 from pathlib import Path
+from .bundles import MODELS_DIR, current_bundle, read_manifest, verify_bundle
+from .features import load_snapshot, load_snapshots
+from .tree_engine import ENGINE_DIR, ENGINE_META, CompiledGradientBoosting
+
+# Version reported for the un-versioned artifacts in ML/models_and_scalers
+LEGACY_MODEL_VERSION = "2.0.0-PCA"
 
 class MLService:
-    def __init__(self):
+    def __init__(self, models_dir=None, model_format=None):
         self.model = None
         self.scaler = None
         self.selected_features = None
-        self.model_version = "2.0.0-PCA"
+        self.engine = None
+        self.manifest = None
+        self._sklearn_lock = threading.Lock()
+        self._sklearn_unavailable = False
+        self.model_version = LEGACY_MODEL_VERSION
+        # 'mmap' serves the bundle's engine/ arrays without unpickling; 'pickle' loads the sklearn objects
+        self.model_format = model_format or getattr(settings, 'ML_MODEL_FORMAT', 'mmap')
+        # The active bundle (see bundles.py), else the legacy flat artifacts
+        self.models_dir = Path(models_dir) if models_dir else (current_bundle() or MODELS_DIR)
         self.load_model()
     
     def load_model(self):
         """Load the trained PCA-optimized ML model"""
         try:
-            # Path to saved models
-            base_dir = Path(__file__).resolve().parent.parent
-            models_dir = base_dir / 'ML' / 'models_and_scalers'
+            models_dir = self.models_dir
             
             # Load trained model components
             model_path = models_dir / 'best_ckd_model.pkl'
             scaler_path = models_dir / 'feature_scaler.pkl'
             features_path = models_dir / 'selected_features.pkl'
             
-            if all(path.exists() for path in [model_path, scaler_path, features_path]):
+            manifest = read_manifest(models_dir)
+            if manifest is not None:
+                # Versioned bundle: refuse artifacts that don't match their manifest
+                verify_bundle(models_dir, manifest)
+            
+            if self._use_mapped_engine():
+                # Arrays are memory-mapped: no pickle, pages shared with the other workers
+                self.engine, meta = CompiledGradientBoosting.load(models_dir / ENGINE_DIR)
+                self.selected_features = meta['selected_features']
+                self.manifest = manifest
+                self.model_version = manifest['version'] if manifest else LEGACY_MODEL_VERSION
+                print(f"Loaded model {self.model_version} with {len(self.selected_features)} features (memory-mapped)")
+            elif all(path.exists() for path in [model_path, scaler_path, features_path]):
                 self.model = joblib.load(model_path)
                 self.scaler = joblib.load(scaler_path)
                 self.selected_features = joblib.load(features_path)
-                print(f"Loaded PCA-optimized model with {len(self.selected_features)} features")
+                self.manifest = manifest
+                self.model_version = manifest['version'] if manifest else LEGACY_MODEL_VERSION
+                self._compile_engine()
+                print(f"Loaded model {self.model_version} with {len(self.selected_features)} features")
             else:
                 print("Trained models not found, using fallback")
                 self._create_fallback_model()
@@ -38,120 +66,199 @@ class MLService:
             print(f"Error loading ML model: {e}")
             self._create_fallback_model()
     
+    @property
+    def using_fallback(self):
+        """True when neither the sklearn model nor the compiled engine is loaded"""
+        return self.model is None and self.engine is None
+    
+    def _use_mapped_engine(self):
+        if self.model_format != 'mmap' or getattr(settings, 'ML_INFERENCE_BACKEND', 'compiled') != 'compiled':
+            return False
+        return (self.models_dir / ENGINE_DIR / ENGINE_META).exists()
+    
+    def _compile_engine(self):
+        """Compile the tree ensemble into NumPy arrays for fast inference"""
+        self.engine = None
+        if getattr(settings, 'ML_INFERENCE_BACKEND', 'compiled') != 'compiled':
+            return
+        try:
+            self.engine = CompiledGradientBoosting.from_sklearn(self.model, self.scaler)
+        except Exception as e:
+            print(f"Compiled inference unavailable, using sklearn: {e}")
+    
     def _create_fallback_model(self):
         """Create fallback rule-based system if models not available"""
         self.model = None
         self.scaler = None
+        self.engine = None
         self.selected_features = ['Age', 'GFR', 'SerumCreatinine', 'SystolicBP', 'ProteinInUrine']
         print("Using rule-based fallback system")
     
-    def extract_patient_features(self, patient):
+    def extract_patient_features(self, patient, snapshot=None):
         """Extract features from patient data matching the trained model"""
-        from medical_data.models import KidneyMetrics, VitalSigns, LabResult
-        from datetime import date
-        
-        # Get latest data
-        latest_metrics = KidneyMetrics.objects.filter(patient=patient).order_by('-timestamp').first()
-        latest_vitals = VitalSigns.objects.filter(patient=patient).order_by('-timestamp').first()
+        if snapshot is None:
+            snapshot = load_snapshot(patient)
+        return self.features_from_snapshot(snapshot).reshape(1, -1)
+    
+    def features_from_snapshot(self, snapshot):
+        """Build the 1-D feature row for a patient snapshot without touching the database"""
+        latest_metrics = snapshot.kidney_metrics
+        latest_vitals = snapshot.vitals
         
         if not latest_metrics:
             raise ValueError("No kidney metrics found for patient")
         
         # Calculate age
-        age = date.today().year - patient.date_of_birth.year
-        
-        # Feature mapping (map model features to available data)
-        feature_map = {
-            'Age': age,
-            'GFR': float(latest_metrics.egfr),
-            'SerumCreatinine': float(latest_metrics.creatinine),
-            'SystolicBP': latest_vitals.systolic_bp if latest_vitals else latest_metrics.systolic_bp or 120,
-            'DiastolicBP': latest_vitals.diastolic_bp if latest_vitals else latest_metrics.diastolic_bp or 80,
-            'ProteinInUrine': float(latest_metrics.proteinuria) if latest_metrics.proteinuria else 0,
-            'BMI': 25.0,  # Default if not available
-            'HemoglobinLevels': 12.0,  # Default if not available
-            'BUNLevels': 20.0,  # Default if not available
-        }
+        age = snapshot.age
         
-        # Get lab results for additional features
-        recent_labs = LabResult.objects.filter(patient=patient).order_by('-test_date')[:10]
-        for lab in recent_labs:
-            if lab.test_name == 'Hemoglobin' and 'HemoglobinLevels' in feature_map:
-                feature_map['HemoglobinLevels'] = float(lab.value)
-            elif lab.test_name == 'BUN' and 'BUNLevels' in feature_map:
-                feature_map['BUNLevels'] = float(lab.value)
+        # Feature mapping (stored feature vector, or latest observations if not built yet)
+        feature_map = snapshot.feature_values()
+        feature_map['Age'] = age
+        feature_map['DiastolicBP'] = snapshot.diastolic_bp
         
         # Extract only selected features in correct order
         if self.selected_features:
             features = []
             for feature_name in self.selected_features:
-                if feature_name in feature_map:
-                    features.append(feature_map[feature_name])
-                else:
-                    # Use reasonable defaults for missing features
-                    features.append(0.0)
-            return np.array(features).reshape(1, -1)
+                value = feature_map.get(feature_name)
+                # Use reasonable defaults for missing features
+                features.append(float(value) if value is not None else 0.0)
+            return np.array(features)
         else:
             # Fallback to basic features
             return np.array([
                 age, float(latest_metrics.egfr), float(latest_metrics.creatinine),
                 latest_vitals.systolic_bp if latest_vitals else 120,
                 float(latest_metrics.proteinuria) if latest_metrics.proteinuria else 0
-            ]).reshape(1, -1)
+            ])
     
-    def predict_ckd_risk(self, patient):
+    def predict_ckd_risk(self, patient, snapshot=None):
         """Predict CKD risk using trained PCA-optimized model"""
         try:
+            if snapshot is None:
+                snapshot = load_snapshot(patient)
+            
             # Extract features
-            features = self.extract_patient_features(patient)
+            features = self.extract_patient_features(patient, snapshot=snapshot)
             
-            if self.model is not None and self.scaler is not None:
-                # Use trained model
-                features_scaled = self.scaler.transform(features)
-                prediction_proba = self.model.predict_proba(features_scaled)[0]
-                prediction = self.model.predict(features_scaled)[0]
-                confidence = np.max(prediction_proba) * 100
-                
-                # Convert binary prediction to meaningful result
-                if prediction == 1:
-                    result = "CKD Positive"
-                    risk_level = self._get_risk_level_from_confidence(confidence)
-                else:
-                    result = "CKD Negative"
-                    risk_level = "low"
-                
-            else:
-                # Fallback to rule-based system
-                latest_metrics = patient.kidney_metrics.order_by('-timestamp').first()
-                egfr = float(latest_metrics.egfr)
-                
-                if egfr < 30:
-                    prediction, result, risk_level, confidence = 1, "CKD Stage 4-5", "critical", 90.0
-                elif egfr < 60:
-                    prediction, result, risk_level, confidence = 1, "CKD Stage 3", "high", 85.0
-                elif egfr < 90:
-                    prediction, result, risk_level, confidence = 1, "CKD Stage 2", "medium", 75.0
-                else:
-                    prediction, result, risk_level, confidence = 0, "Normal Kidney Function", "low", 80.0
+            return self._build_results([snapshot], features)[0]
             
+        except Exception as e:
+            raise Exception(f"Prediction failed: {str(e)}")
+    
+    def predict_batch(self, patients):
+        """Predict CKD risk for many patients with a single model call
+        
+        Latest observations for all patients are loaded with a constant number of
+        queries. Returns (results, errors): results is a list of (patient, result)
+        pairs, errors a list of (patient, message) pairs for patients that could
+        not be scored.
+        """
+        scored = []
+        rows = []
+        errors = []
+        
+        for snapshot in load_snapshots(patients):
+            try:
+                rows.append(self.features_from_snapshot(snapshot))
+                scored.append(snapshot)
+            except Exception as e:
+                errors.append((snapshot.patient, str(e)))
+        
+        if not scored:
+            return [], errors
+        
+        results = self._build_results(scored, np.vstack(rows))
+        return [(snapshot.patient, result) for snapshot, result in zip(scored, results)], errors
+    
+    def _build_results(self, snapshots, features):
+        """Score a 2-D feature matrix and build the prediction result for each row"""
+        results = []
+        for snapshot, (prediction, result, risk_level, confidence) in zip(snapshots, self._classify(snapshots, features)):
             # Generate recommendations
-            recommendations = self._generate_recommendations(prediction, patient)
+            recommendations = self._generate_recommendations(prediction, snapshot)
             
             # Get input metrics for display
-            input_metrics = self._get_input_metrics_summary(patient)
+            input_metrics = self._get_input_metrics_summary(snapshot)
             
-            return {
+            results.append({
                 'result': result,
-                'confidence': round(confidence, 2),
-                'stage': self._get_stage_from_prediction(prediction, patient),
+                'confidence': round(float(confidence), 2),
+                'stage': self._get_stage_from_prediction(prediction, snapshot),
                 'risk_level': risk_level,
                 'input_metrics': input_metrics,
                 'recommendations': recommendations,
                 'model_version': self.model_version
-            }
+            })
+        return results
+    
+    def predict_proba(self, features):
+        """Class probabilities for a 2-D matrix of unscaled features -> (probabilities, classes)
+        
+        Request-sized inputs go through the compiled tree engine. sklearn's C
+        traversal is faster on large matrices, so it takes over above
+        ML_COMPILED_MAX_BATCH rows; with the memory-mapped engine the pickled
+        model is loaded on the first such batch.
+        """
+        max_batch = getattr(settings, 'ML_COMPILED_MAX_BATCH', 256)
+        if self.engine is not None and len(features) <= max_batch:
+            return self.engine.predict_proba(features), self.engine.classes
+        
+        if self.model is None:
+            self._load_sklearn_model()
+        if self.model is None:
+            return self.engine.predict_proba(features), self.engine.classes
+        
+        features_scaled = self.scaler.transform(features)
+        return self.model.predict_proba(features_scaled), self.model.classes_
+    
+    def _load_sklearn_model(self):
+        """Unpickle model + scaler for batch scoring (memory-mapped mode starts without them)"""
+        with self._sklearn_lock:
+            if self.model is not None or self._sklearn_unavailable:
+                return
+            try:
+                # Files were checked against the manifest when the bundle was loaded
+                model = joblib.load(self.models_dir / 'best_ckd_model.pkl')
+                self.scaler = joblib.load(self.models_dir / 'feature_scaler.pkl')
+                # Published last: other threads switch to sklearn once model is set
+                self.model = model
+            except Exception as e:
+                print(f"sklearn model unavailable, batch scoring stays on the compiled engine: {e}")
+                self._sklearn_unavailable = True
+    
+    def _classify(self, snapshots, features):
+        """Return (prediction, result, risk_level, confidence) for every feature row"""
+        outcomes = []
+        
+        if self.engine is not None or (self.model is not None and self.scaler is not None):
+            # Use trained model - one predict_proba call for the whole matrix
+            probabilities, classes = self.predict_proba(features)
+            predictions = classes[np.argmax(probabilities, axis=1)]
+            confidences = np.max(probabilities, axis=1) * 100
             
-        except Exception as e:
-            raise Exception(f"Prediction failed: {str(e)}")
+            for prediction, confidence in zip(predictions, confidences):
+                # Convert binary prediction to meaningful result
+                if prediction == 1:
+                    outcomes.append((1, "CKD Positive", self._get_risk_level_from_confidence(confidence), confidence))
+                else:
+                    outcomes.append((0, "CKD Negative", "low", confidence))
+            
+        else:
+            # Fallback to rule-based system
+            for snapshot in snapshots:
+                egfr = float(snapshot.kidney_metrics.egfr)
+                
+                if egfr < 30:
+                    outcomes.append((1, "CKD Stage 4-5", "critical", 90.0))
+                elif egfr < 60:
+                    outcomes.append((1, "CKD Stage 3", "high", 85.0))
+                elif egfr < 90:
+                    outcomes.append((1, "CKD Stage 2", "medium", 75.0))
+                else:
+                    outcomes.append((0, "Normal Kidney Function", "low", 80.0))
+        
+        return outcomes
     
     def _get_risk_level_from_confidence(self, confidence):
         """Determine risk level based on model confidence"""
@@ -164,13 +271,13 @@ class MLService:
         else:
             return 'low'
     
-    def _get_stage_from_prediction(self, prediction, patient):
+    def _get_stage_from_prediction(self, prediction, snapshot):
         """Get CKD stage from prediction and patient data"""
         if prediction == 0:
             return 1  # Normal/Stage 1
         
         # Use eGFR to determine stage for positive predictions
-        latest_metrics = patient.kidney_metrics.order_by('-timestamp').first()
+        latest_metrics = snapshot.kidney_metrics
         if latest_metrics:
             egfr = float(latest_metrics.egfr)
             if egfr >= 90:
@@ -185,21 +292,16 @@ class MLService:
                 return 5
         return 3  # Default
     
-    def _get_input_metrics_summary(self, patient):
+    def _get_input_metrics_summary(self, snapshot):
         """Get summary of input metrics used for prediction"""
-        from datetime import date
-        
-        latest_metrics = patient.kidney_metrics.order_by('-timestamp').first()
-        latest_vitals = patient.vital_signs.order_by('-timestamp').first()
-        
-        age = date.today().year - patient.date_of_birth.year
+        latest_metrics = snapshot.kidney_metrics
         
         return {
-            'age': age,
-            'bloodPressure': f"{latest_vitals.systolic_bp if latest_vitals else latest_metrics.systolic_bp or 120}/{latest_vitals.diastolic_bp if latest_vitals else latest_metrics.diastolic_bp or 80}",
+            'age': snapshot.age,
+            'bloodPressure': f"{snapshot.systolic_bp}/{snapshot.diastolic_bp}",
             'serumCreatinine': float(latest_metrics.creatinine) if latest_metrics else 0,
-            'bloodUrea': 0,  # Would need lab results
-            'hemoglobin': 0,  # Would need lab results
+            'bloodUrea': snapshot.lab_value('BUN', 0),
+            'hemoglobin': snapshot.lab_value('Hemoglobin', 0),
             'eGFR': float(latest_metrics.egfr) if latest_metrics else 0
         }
     
@@ -214,11 +316,11 @@ class MLService:
         else:
             return 'low'
     
-    def _generate_recommendations(self, prediction, patient):
+    def _generate_recommendations(self, prediction, snapshot):
         """Generate recommendations based on prediction and patient data"""
         recommendations = []
         
-        latest_metrics = patient.kidney_metrics.order_by('-timestamp').first()
+        latest_metrics = snapshot.kidney_metrics
         if not latest_metrics:
             return ["Insufficient data for recommendations"]
         
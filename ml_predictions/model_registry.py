@@ -0,0 +1,169 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+from .bundles import MANIFEST_FILE, MODEL_FILES, current_bundle, read_manifest
+from .ml_service import MLService, MODELS_DIR
+from .prediction_cache import prediction_cache
+
+class ModelRegistry:
+    """Process-wide holder of the loaded MLService.
+    
+    Artifacts are loaded once per worker and the same service is shared by
+    every request thread. When the artifacts change (or bundles/CURRENT points
+    at another bundle) the registry builds a new service and swaps the
+    reference in one assignment, so in-flight predictions keep using the
+    service they started with.
+    """
+    
+    def __init__(self, models_dir=None, check_interval=None):
+        # Explicit directory, or None to follow the active bundle
+        self.models_dir = Path(models_dir) if models_dir else None
+        if check_interval is None:
+            check_interval = getattr(settings, 'ML_MODEL_RELOAD_INTERVAL', 5.0)
+        self.check_interval = check_interval
+        
+        self._lock = threading.Lock()
+        self._service = None
+        self._stat_signature = None
+        self._content_hash = None
+        self._last_check = 0.0
+        
+        # Counters
+        self.loads = 0
+        self.swaps = 0
+        self.failed_reloads = 0
+        self.last_load_seconds = None
+        self.total_load_seconds = 0.0
+        self.loaded_at = None
+    
+    def get_service(self):
+        """Return the shared MLService, reloading it if the artifacts changed"""
+        service = self._service
+        if service is not None and not self._check_due():
+            return service
+        
+        with self._lock:
+            if self._service is None or self._check_due():
+                self._last_check = time.monotonic()
+                self._refresh()
+            return self._service
+    
+    def reload(self):
+        """Force a reload of the artifacts regardless of file changes"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            self._load(self._read_stat_signature(), self._read_content_hash())
+            return self._service
+    
+    def stats(self):
+        """Load-time and swap counters for monitoring"""
+        service = self._service
+        return {
+            'loaded': service is not None,
+            'model_version': service.model_version if service else None,
+            'using_fallback': service.using_fallback if service else None,
+            'models_dir': str(service.models_dir if service else self.artifacts_dir()),
+            'bundle': service.manifest['version'] if service and service.manifest else None,
+            'content_hash': self._content_hash,
+            'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+            'loads': self.loads,
+            'swaps': self.swaps,
+            'failed_reloads': self.failed_reloads,
+            'last_load_ms': round(self.last_load_seconds * 1000, 2) if self.last_load_seconds is not None else None,
+            'total_load_ms': round(self.total_load_seconds * 1000, 2),
+            'check_interval_seconds': self.check_interval,
+        }
+    
+    def artifacts_dir(self):
+        """Directory the next load reads from"""
+        return self.models_dir or current_bundle() or MODELS_DIR
+    
+    def _check_due(self):
+        return time.monotonic() - self._last_check >= self.check_interval
+    
+    def _refresh(self):
+        stat_signature = self._read_stat_signature()
+        if self._service is not None and stat_signature == self._stat_signature:
+            return
+        
+        # mtime/size changed - only reload if the content actually differs
+        content_hash = self._read_content_hash()
+        if self._service is not None and content_hash == self._content_hash:
+            self._stat_signature = stat_signature
+            return
+        
+        self._load(stat_signature, content_hash)
+    
+    def _load(self, stat_signature, content_hash):
+        start = time.perf_counter()
+        service = MLService(models_dir=self.artifacts_dir())
+        elapsed = time.perf_counter() - start
+        
+        self.loads += 1
+        self.last_load_seconds = elapsed
+        self.total_load_seconds += elapsed
+        
+        if self._service is not None and not self._service.using_fallback and service.using_fallback:
+            # Artifacts are missing or half-written; keep serving the current model
+            # and retry on the next check.
+            self.failed_reloads += 1
+            return
+        
+        if self._service is not None:
+            self.swaps += 1
+            # Cached predictions were made by the outgoing model
+            prediction_cache.clear()
+        self._service = service
+        self._stat_signature = stat_signature
+        self._content_hash = content_hash
+        self.loaded_at = timezone.now()
+    
+    def _read_stat_signature(self):
+        models_dir = self.artifacts_dir()
+        signature = [str(models_dir)]
+        for name in MODEL_FILES + (MANIFEST_FILE,):
+            path = models_dir / name
+            try:
+                stat = path.stat()
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((name, None, None))
+        return tuple(signature)
+    
+    def _read_content_hash(self):
+        models_dir = self.artifacts_dir()
+        manifest = read_manifest(models_dir)
+        if manifest is not None:
+            # Bundles carry their content hash; MLService verifies the files on load
+            return manifest['content_hash']
+        
+        digest = hashlib.sha256()
+        for name in MODEL_FILES:
+            path = models_dir / name
+            digest.update(name.encode())
+            try:
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(block)
+            except OSError:
+                digest.update(b'<missing>')
+        return digest.hexdigest()
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Return the process-wide model registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+def get_ml_service():
+    """Return the shared MLService for this worker"""
+    return get_registry().get_service()
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.contrib.auth.models import User
 from patients.models import Patient
 
 class MLPrediction(models.Model):
@@ -68,4 +69,58 @@ class TrendAnalysis(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        db_table = 'trend_analyses'
\ No newline at end of file
+        db_table = 'trend_analyses'
+
+class PatientFeatureVector(models.Model):
+    """Latest value of every model feature for a patient, kept current on write"""
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, primary_key=True, related_name='feature_vector')
+    
+    bmi = models.FloatField(null=True, blank=True)
+    diet_quality = models.FloatField(null=True, blank=True)
+    family_history_kidney_disease = models.FloatField(null=True, blank=True)
+    systolic_bp = models.FloatField(null=True, blank=True)
+    fasting_blood_sugar = models.FloatField(null=True, blank=True)
+    hba1c = models.FloatField(null=True, blank=True)
+    serum_creatinine = models.FloatField(null=True, blank=True)
+    bun_levels = models.FloatField(null=True, blank=True)
+    gfr = models.FloatField(null=True, blank=True)
+    protein_in_urine = models.FloatField(null=True, blank=True)
+    hemoglobin_levels = models.FloatField(null=True, blank=True)
+    cholesterol_hdl = models.FloatField(null=True, blank=True)
+    edema = models.FloatField(null=True, blank=True)
+    muscle_cramps = models.FloatField(null=True, blank=True)
+    itching = models.FloatField(null=True, blank=True)
+    
+    observed_at = models.JSONField(default=dict)  # Model feature -> ISO timestamp of its observation
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'patient_feature_vectors'
+
+class AnalysisJob(models.Model):
+    """Queued ML analysis of one or more patients, run outside the request"""
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    patient_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUSES, default='queued')
+    backend = models.CharField(max_length=20)
+    prediction = models.ForeignKey(MLPrediction, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    summary = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'ml_analysis_jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        ordering = ['-created_at']
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+import numpy as np
+from django.conf import settings
+
+def fingerprint(features):
+    """Stable hash of an extracted feature vector"""
+    return hashlib.sha1(np.ascontiguousarray(features, dtype=np.float64).tobytes()).hexdigest()
+
+class PredictionCache:
+    """In-process LRU of recent predictions with a TTL.
+    
+    Keys are (patient_id, model_version, feature fingerprint) and values the id
+    of the MLPrediction row produced for them, so a repeated analysis of
+    unchanged data can return that row instead of inserting a duplicate.
+    """
+    
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or getattr(settings, 'ML_PREDICTION_CACHE_SIZE', 10000)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'ML_PREDICTION_CACHE_TTL', 900)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._patient_keys = defaultdict(set)
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def make_key(self, patient_id, model_version, features):
+        return (str(patient_id), model_version, fingerprint(features))
+    
+    def get(self, key):
+        """Return the cached prediction id for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def set(self, key, prediction_id):
+        with self._lock:
+            self._entries[key] = (prediction_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._patient_keys[key[0]].add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def discard(self, key):
+        """Drop a key whose prediction row no longer exists"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def invalidate_patients(self, patient_ids):
+        """Drop every cached prediction of the given patients"""
+        with self._lock:
+            for patient_id in patient_ids:
+                for key in self._patient_keys.pop(str(patient_id), ()):
+                    if self._entries.pop(key, None) is not None:
+                        self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._patient_keys.clear()
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+    
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._patient_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._patient_keys[key[0]]
+
+prediction_cache = PredictionCache()
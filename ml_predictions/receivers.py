@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from backend.cache import invalidate_patients
+from medical_data.signals import observations_recorded
+from .feature_store import record_observations
+from .models import MLPrediction
+from .prediction_cache import prediction_cache
+from .trends import record_trend_observations
+
+@receiver(observations_recorded)
+def update_feature_vectors(sender, instances, **kwargs):
+    """Keep PatientFeatureVector rows current as observations are written"""
+    record_observations(instances)
+
+@receiver(observations_recorded)
+def update_trends(sender, instances, **kwargs):
+    """Fold new eGFR, creatinine and blood pressure readings into the patients' trends"""
+    record_trend_observations(instances)
+
+@receiver(observations_recorded)
+def invalidate_cached_predictions(sender, instances, **kwargs):
+    """New observations make the patients' cached predictions stale"""
+    prediction_cache.invalidate_patients({instance.patient_id for instance in instances})
+
+@receiver([post_save, post_delete], sender=MLPrediction)
+def invalidate_prediction_cache(sender, instance, **kwargs):
+    invalidate_patients([instance.patient_id])
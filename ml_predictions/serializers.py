@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import MLPrediction, RiskFactor, TrendAnalysis
+from .models import AnalysisJob, MLPrediction, RiskFactor, TrendAnalysis
 
 class MLPredictionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -27,4 +27,15 @@ class TrendAnalysisSerializer(serializers.ModelSerializer):
             'id', 'trend_type', 'trend_data', 'slope', 'r_squared',
             'prediction_horizon_days', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    prediction = MLPredictionSerializer(read_only=True)
+    
+    class Meta:
+        model = AnalysisJob
+        fields = [
+            'id', 'status', 'backend', 'patient_ids', 'prediction', 'summary',
+            'error', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
\ No newline at end of file
@@ -0,0 +1,8 @@
+from celery import shared_task
+from .jobs import run_analysis_job
+
+@shared_task(name='ml_predictions.run_analysis_job', acks_late=True)
+def run_analysis_job_task(job_id):
+    """Celery entry point for queued analysis jobs (ML_JOB_BACKEND = 'celery')"""
+    job = run_analysis_job(job_id)
+    return job.status if job else None
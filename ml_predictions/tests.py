@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from medical_data.models import KidneyMetrics
+from medical_data.signals import observations_recorded
+from patients.models import Patient
+from .jobs import fail_stale_jobs
+from .models import AnalysisJob, TrendAnalysis
+from .trends import PROGRESSION_FIELDS, refresh_trends
+
+class TrendIncrementalTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Test', last_name='Patient', date_of_birth=date(1960, 1, 1), gender='female'
+        )
+        self.now = timezone.now()
+    
+    def record(self, days_ago, egfr):
+        metrics = KidneyMetrics.objects.create(
+            patient=self.patient, timestamp=self.now - timedelta(days=days_ago),
+            egfr=egfr, creatinine=1.5, stage=3
+        )
+        observations_recorded.send(sender=KidneyMetrics, instances=[metrics])
+        return metrics
+    
+    def assertSameFit(self, first, second):
+        # Sums accumulate in a different order, so the slope may differ in the last digit
+        self.assertAlmostEqual(float(first[0]), float(second[0]), places=3)
+        self.assertEqual(first[1:], second[1:])
+    
+    def snapshot(self):
+        trend = TrendAnalysis.objects.get(patient=self.patient, trend_type='egfr')
+        latest = KidneyMetrics.objects.filter(patient=self.patient).order_by('-timestamp').values(*PROGRESSION_FIELDS)[0]
+        return trend.slope, trend.r_squared, latest
+    
+    def test_backfilled_reading_matches_full_recompute(self):
+        for days_ago, egfr in [(60, 45.2), (30, 44.8), (0, 44.9)]:
+            self.record(days_ago, egfr)
+        before = self.snapshot()
+        
+        # Much older, much higher reading: the slope turns steeply negative
+        self.record(1000, 62.0)
+        incremental = self.snapshot()
+        self.assertNotEqual(before, incremental)
+        self.assertEqual(incremental[2]['trend'], 'declining')
+        
+        refresh_trends([self.patient.pk])
+        self.assertSameFit(incremental, self.snapshot())
+    
+    def test_new_reading_matches_full_recompute(self):
+        for days_ago, egfr in [(400, 58.0), (200, 52.5), (100, 50.1)]:
+            self.record(days_ago, egfr)
+        metrics = self.record(0, 47.3)
+        incremental = self.snapshot()
+        self.assertEqual(metrics.trend, incremental[2]['trend'])
+        
+        refresh_trends([self.patient.pk])
+        self.assertSameFit(incremental, self.snapshot())
+
+@override_settings(ML_JOB_STALE_AFTER=600)
+class StaleJobTests(TestCase):
+    def job(self, status, minutes_ago, backend='thread'):
+        job = AnalysisJob.objects.create(backend=backend, status=status)
+        moment = timezone.now() - timedelta(minutes=minutes_ago)
+        AnalysisJob.objects.filter(pk=job.pk).update(created_at=moment, started_at=moment if status == 'running' else None)
+        return job
+    
+    def test_only_old_unfinished_thread_jobs_fail(self):
+        stale = [self.job('queued', 30), self.job('running', 30)]
+        kept = [self.job('running', 1), self.job('succeeded', 30), self.job('running', 30, backend='celery')]
+        
+        self.assertEqual(fail_stale_jobs(), 2)
+        self.assertEqual(
+            {job.pk for job in AnalysisJob.objects.filter(status='failed')}, {job.pk for job in stale}
+        )
+        self.assertEqual(
+            [AnalysisJob.objects.get(pk=job.pk).status for job in kept], ['running', 'succeeded', 'running']
+        )
\ No newline at end of file
@@ -0,0 +1,50 @@
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import sklearn
+from .bundles import write_bundle
+from .features import SERVED_FEATURES
+
+ML_DIR = Path(__file__).resolve().parent.parent / 'ML'
+DEFAULT_CSV = ML_DIR / 'Chronic_Kidney_Dsease_data.csv'
+
+def _selection_module():
+    # ML/ is a script directory, not a package; put it on sys.path so the
+    # cross-validation workers can unpickle its functions as well
+    if str(ML_DIR) not in sys.path:
+        sys.path.insert(0, str(ML_DIR))
+    import pca_feature_selection
+    return pca_feature_selection
+
+def train_bundle(csv_path=DEFAULT_CSV, counts=None, cv=5, n_jobs=-1, bundles_dir=None, activate=True):
+    """Train scaler, feature selection and Gradient Boosting model into a new bundle
+    
+    Only features the service can build for a patient are candidates.
+    Returns (manifest, training seconds).
+    """
+    selection = _selection_module()
+    counts = tuple(counts or selection.DEFAULT_COUNTS)
+    
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as output_dir:
+        summary = selection.run_selection_pipeline(csv_path, output_dir, counts=counts, cv=cv, n_jobs=n_jobs,
+                                                   features=SERVED_FEATURES)
+        seconds = time.perf_counter() - start
+        
+        training = {
+            'csv': str(csv_path),
+            'dataset_hash': summary['dataset_hash'],
+            'feature_set': summary['best_feature_set'],
+            'n_features': summary['n_features'],
+            'counts': list(counts),
+            'cv': cv,
+            'n_jobs': n_jobs,
+            'seconds': round(seconds, 2),
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__,
+        }
+        manifest = write_bundle(output_dir, metrics=summary['performance'], training=training,
+                                bundles_dir=bundles_dir, activate=activate)
+    return manifest, seconds
\ No newline at end of file
@@ -0,0 +1,190 @@
+import json
+import os
+from pathlib import Path
+import numpy as np
+from scipy.special import expit
+
+TREE_LEAF = -1
+
+# On-disk layout written by save(): one raw .npy per array plus engine.json
+# for the scalars, so load() can memory-map the arrays instead of unpickling
+ENGINE_DIR = 'engine'
+ENGINE_META = 'engine.json'
+ENGINE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes', 'scaler_mean', 'scaler_scale')
+
+class CompiledGradientBoosting:
+    """Binary gradient boosting classifier flattened into contiguous NumPy arrays.
+    
+    All trees are concatenated into one node table (feature index, threshold,
+    left/right child, leaf value) so rows and batches are scored with a few
+    vectorized traversal steps instead of sklearn's per-call validation. The
+    arithmetic mirrors sklearn exactly - float32 feature comparisons, trees
+    accumulated in order, expit on the raw score - so probabilities are
+    bit-for-bit identical to GradientBoostingClassifier.predict_proba.
+    The fitted StandardScaler is folded in, so callers pass unscaled features.
+    """
+    
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 init_raw, learning_rate, classes, scaler_mean=None, scaler_scale=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.init_raw = float(init_raw)
+        self.learning_rate = float(learning_rate)
+        self.classes = classes
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.n_trees = len(roots)
+    
+    @classmethod
+    def from_sklearn(cls, model, scaler=None):
+        """Compile a fitted binary GradientBoostingClassifier (and optional StandardScaler)"""
+        if getattr(model, 'n_trees_per_iteration_', 1) != 1 or len(model.classes_) != 2:
+            raise ValueError('Only binary gradient boosting classifiers can be compiled')
+        
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == TREE_LEAF
+            node_ids = np.arange(offset, offset + n_nodes)
+            
+            # Leaves point at themselves so every tree can be walked for max_depth steps
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+        
+        # The init estimator's raw prediction is constant (prior log-odds)
+        init_raw = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0, 0]
+        
+        scaler_mean = scaler_scale = None
+        if scaler is not None:
+            scaler_mean = getattr(scaler, 'mean_', None)
+            scaler_scale = getattr(scaler, 'scale_', None)
+            scaler_mean = None if scaler_mean is None else np.ascontiguousarray(scaler_mean, dtype=np.float64)
+            scaler_scale = None if scaler_scale is None else np.ascontiguousarray(scaler_scale, dtype=np.float64)
+        
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            init_raw=init_raw,
+            learning_rate=model.learning_rate,
+            classes=np.asarray(model.classes_),
+            scaler_mean=scaler_mean,
+            scaler_scale=scaler_scale,
+        )
+    
+    def save(self, directory, **meta):
+        """Write the engine as .npy arrays + engine.json (extra meta, e.g. selected_features, is stored too)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = []
+        for name in ENGINE_ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(directory / f'{name}.npy', np.ascontiguousarray(array), allow_pickle=False)
+                arrays.append(name)
+        
+        meta.update({
+            'arrays': arrays,
+            'max_depth': int(self.max_depth),
+            'init_raw': self.init_raw,
+            'learning_rate': self.learning_rate,
+        })
+        tmp_path = directory / f'.{ENGINE_META}.{os.getpid()}'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, directory / ENGINE_META)
+    
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved engine -> (engine, meta)
+        
+        With mmap the arrays are read-only views of the files, so every worker
+        shares the same page-cache pages and nothing is unpickled.
+        """
+        directory = Path(directory)
+        with open(directory / ENGINE_META) as f:
+            meta = json.load(f)
+        
+        arrays = dict.fromkeys(ENGINE_ARRAYS)
+        for name in meta['arrays']:
+            array = np.load(directory / f'{name}.npy', mmap_mode='r' if mmap else None, allow_pickle=False)
+            # Plain ndarray view over the mapping; skips np.memmap's per-operation wrapping
+            arrays[name] = np.asarray(array)
+        
+        engine = cls(max_depth=meta['max_depth'], init_raw=meta['init_raw'],
+                     learning_rate=meta['learning_rate'], **arrays)
+        return engine, meta
+    
+    def _prepare(self, X):
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if self.scaler_mean is not None:
+            X -= self.scaler_mean
+        if self.scaler_scale is not None:
+            X /= self.scaler_scale
+        # Trees compare float32 features against float64 thresholds, like sklearn.
+        # Widening back to float64 is exact and keeps the comparisons in one dtype.
+        return X.astype(np.float32).astype(np.float64)
+    
+    def _leaf_values(self, X):
+        """Leaf value reached in every tree for every row -> (n_rows, n_trees)"""
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = flat_X.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+            nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+        return self.value.take(nodes)
+    
+    def decision_function(self, X):
+        """Raw log-odds of the positive class"""
+        leaf_values = self._leaf_values(self._prepare(X))
+        
+        # sklearn adds learning_rate * leaf value tree by tree. A row-wise cumsum
+        # is a sequential left-to-right sum, so the rounding matches exactly.
+        stages = np.empty((leaf_values.shape[0], self.n_trees + 1), dtype=np.float64)
+        stages[:, 0] = self.init_raw
+        np.multiply(leaf_values, self.learning_rate, out=stages[:, 1:])
+        return np.cumsum(stages, axis=1)[:, -1]
+    
+    def predict_proba(self, X):
+        """Class probabilities, same layout as sklearn's predict_proba"""
+        raw = self.decision_function(X)
+        proba = np.empty((raw.shape[0], 2), dtype=np.float64)
+        proba[:, 1] = expit(raw)
+        proba[:, 0] = 1 - proba[:, 1]
+        return proba
+    
+    def predict(self, X):
+        """Predicted class labels"""
+        return self.classes[(self.decision_function(X) >= 0).astype(int)]
+    
+    def verify(self, model, X, scaler=None):
+        """Compare against sklearn on X; returns a summary with bit-identity and max difference"""
+        X = np.asarray(X, dtype=np.float64)
+        expected = model.predict_proba(scaler.transform(X) if scaler is not None else X)
+        actual = self.predict_proba(X)
+        return {
+            'rows': int(X.shape[0]),
+            'identical': bool(np.array_equal(expected, actual)),
+            'max_abs_diff': float(np.max(np.abs(expected - actual))) if X.shape[0] else 0.0,
+        }
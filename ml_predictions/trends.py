@@ -0,0 +1,267 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+import numpy as np
+from django.db import transaction
+from medical_data.models import KidneyMetrics, VitalSigns
+from .models import TrendAnalysis
+
+# Per-patient least-squares trends (value = intercept + slope * days).
+#
+# TrendAnalysis.trend_data keeps the fit's sufficient statistics (n, sums of t,
+# y, t*t, t*y, y*y with t in days since the patient's first reading), so a new
+# reading is folded in by adding its terms - no history is re-read. Fits for
+# many patients are computed at once: readings are grouped with np.bincount
+# and every slope / r^2 comes out of the same few array operations.
+
+# trend_type -> (model, value field)
+SERIES = {
+    'egfr': (KidneyMetrics, 'egfr'),
+    'creatinine': (KidneyMetrics, 'creatinine'),
+    'blood_pressure': (VitalSigns, 'systolic_bp'),
+}
+STAT_KEYS = ('n', 'sum_t', 'sum_y', 'sum_tt', 'sum_ty', 'sum_yy')
+TREND_FIELDS = ['trend_data', 'slope', 'r_squared', 'prediction_horizon_days']
+PROGRESSION_FIELDS = ['trend', 'rate_of_change', 'predicted_stage', 'time_to_next_stage']
+
+DAYS_PER_YEAR = 365.25
+HORIZON_DAYS = 365
+# eGFR change per year (mL/min/1.73m²) beyond which the trend counts as improving/declining
+TREND_THRESHOLD = 1.0
+STAGE_LIMITS = [90, 60, 30, 15]
+MAX_DAYS_TO_NEXT_STAGE = 3650
+SECONDS_PER_DAY = 86400.0
+
+def grouped_sums(groups, t, y, n_groups):
+    """Sufficient statistics per group -> (n_groups, len(STAT_KEYS))"""
+    terms = (np.ones_like(t), t, y, t * t, t * y, y * y)
+    return np.column_stack([np.bincount(groups, weights=term, minlength=n_groups) for term in terms])
+
+def fit(stats):
+    """Least-squares slope (per day), intercept and r^2 for every row of statistics"""
+    n, sum_t, sum_y, sum_tt, sum_ty, sum_yy = stats.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx = sum_tt - sum_t * sum_t / n
+        sxy = sum_ty - sum_t * sum_y / n
+        syy = sum_yy - sum_y * sum_y / n
+        # Fewer than two distinct days leaves the slope undefined; report flat
+        defined = (n >= 2) & (sxx > 1e-9)
+        slope = np.where(defined, sxy / sxx, 0.0)
+        intercept = np.where(n > 0, (sum_y - slope * sum_t) / n, 0.0)
+        r_squared = np.where(defined & (syy > 1e-12), sxy * sxy / (sxx * syy), 0.0)
+    return slope, intercept, np.clip(r_squared, 0, 1)
+
+def egfr_stage(egfr):
+    return 5 - np.digitize(egfr, STAGE_LIMITS[::-1])
+
+def progression(egfr, slope_per_day):
+    """KidneyMetrics progression fields from the latest eGFR and its fitted slope"""
+    rate = slope_per_day * DAYS_PER_YEAR
+    stage = int(egfr_stage(egfr))
+    if rate > TREND_THRESHOLD:
+        trend = 'improving'
+    elif rate < -TREND_THRESHOLD:
+        trend = 'declining'
+    else:
+        trend = 'stable'
+    
+    time_to_next_stage = None
+    if slope_per_day < 0 and stage < 5:
+        days = (egfr - STAGE_LIMITS[stage - 1]) / -slope_per_day
+        time_to_next_stage = int(min(days, MAX_DAYS_TO_NEXT_STAGE))
+    
+    return {
+        'trend': trend,
+        'rate_of_change': round(float(np.clip(rate, -999.99, 999.99)), 2),
+        'predicted_stage': int(egfr_stage(egfr + slope_per_day * HORIZON_DAYS)),
+        'time_to_next_stage': time_to_next_stage,
+    }
+
+def _epoch(timestamp):
+    return timestamp.timestamp()
+
+def _from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+def _trend_data(stats, t0, last_at, last_value, last_pk, slope, intercept):
+    data = dict(zip(STAT_KEYS, (float(value) for value in stats)))
+    data.update({
+        't0': _from_epoch(t0).isoformat(),
+        'last_at': _from_epoch(last_at).isoformat(),
+        'last_value': float(last_value),
+        # Row holding the latest reading; its progression fields follow every refit
+        'last_pk': str(last_pk),
+        'intercept': float(intercept),
+        'forecast': float(last_value + slope * HORIZON_DAYS),
+    })
+    return data
+
+def _apply_fit(trend, data, slope, r_squared):
+    trend.trend_data = data
+    trend.slope = round(float(np.clip(slope * DAYS_PER_YEAR, -9999.9999, 9999.9999)), 4)
+    trend.r_squared = round(float(r_squared), 3)
+    trend.prediction_horizon_days = HORIZON_DAYS
+
+def _load_series(patient_ids, trend_type):
+    """All readings of a series for the patients -> (patient ids, row ids, epoch seconds, values)"""
+    model, field = SERIES[trend_type]
+    rows = list(
+        model.objects.filter(patient_id__in=patient_ids, **{f'{field}__isnull': False})
+        .values_list('patient_id', 'pk', 'timestamp', field)
+    )
+    if not rows:
+        return [], [], np.empty(0), np.empty(0)
+    patients, pks, timestamps, values = zip(*rows)
+    return list(patients), list(pks), np.array([_epoch(ts) for ts in timestamps]), np.array(values, dtype=np.float64)
+
+def _latest_rows(groups, seconds):
+    """Index of the latest reading of every group (groups numbered 0..n-1, all present)"""
+    order = np.lexsort((seconds, groups))
+    return order[np.r_[np.flatnonzero(np.diff(groups[order])), len(order) - 1]]
+
+def _latest_metrics_pk(patient_id):
+    """Latest KidneyMetrics row of a patient (trend_data written before last_pk was stored)"""
+    return KidneyMetrics.objects.filter(patient_id=patient_id).order_by('-timestamp').values_list('pk', flat=True).first()
+
+def _fit_series(patient_ids, trend_type):
+    """Fit one series over the full history -> {patient_id: (TrendAnalysis, latest row pk, slope per day)}"""
+    patients, pks, seconds, values = _load_series(patient_ids, trend_type)
+    if not patients:
+        return {}
+    
+    keys, groups = np.unique(np.array(patients, dtype=object).astype(str), return_inverse=True)
+    n_groups = len(keys)
+    t0 = np.full(n_groups, np.inf)
+    np.minimum.at(t0, groups, seconds)
+    stats = grouped_sums(groups, (seconds - t0[groups]) / SECONDS_PER_DAY, values, n_groups)
+    slope, intercept, r_squared = fit(stats)
+    
+    last = _latest_rows(groups, seconds)
+    
+    fitted = {}
+    for i, row in enumerate(last):
+        patient_id = patients[row]
+        trend = TrendAnalysis(patient_id=patient_id, trend_type=trend_type)
+        data = _trend_data(stats[i], t0[i], seconds[row], values[row], pks[row], slope[i], intercept[i])
+        _apply_fit(trend, data, slope[i], r_squared[i])
+        fitted[patient_id] = (trend, pks[row], slope[i])
+    return fitted
+
+def _refresh_batch(patient_ids):
+    """Replace the patients' trends with full-history fits -> updated latest KidneyMetrics (pk + progression only)"""
+    trends = []
+    latest_metrics = []
+    for trend_type in SERIES:
+        fitted = _fit_series(patient_ids, trend_type)
+        trends.extend(trend for trend, _, _ in fitted.values())
+        if trend_type == 'egfr':
+            latest_metrics.extend(
+                KidneyMetrics(pk=pk, **progression(trend.trend_data['last_value'], slope))
+                for trend, pk, slope in fitted.values()
+            )
+    
+    with transaction.atomic():
+        TrendAnalysis.objects.filter(patient_id__in=patient_ids, trend_type__in=list(SERIES)).delete()
+        TrendAnalysis.objects.bulk_create(trends)
+        KidneyMetrics.objects.bulk_update(latest_metrics, PROGRESSION_FIELDS, batch_size=500)
+    return trends, latest_metrics
+
+def refresh_trends(patients, batch_size=1000):
+    """Recompute every trend of the patients from their full history
+    
+    `patients` may be Patient instances, a queryset or primary keys. Existing
+    TrendAnalysis rows are replaced and the latest KidneyMetrics row of each
+    patient gets its progression fields. Returns the number of trends written.
+    """
+    patient_ids = [getattr(patient, 'pk', patient) for patient in patients]
+    written = 0
+    for start in range(0, len(patient_ids), batch_size):
+        trends, _ = _refresh_batch(patient_ids[start:start + batch_size])
+        written += len(trends)
+    return written
+
+def record_trend_observations(instances):
+    """Fold newly written readings into the stored trend statistics
+    
+    Only the new readings are read; each trend's sums get their terms added
+    and the fit is recomputed from the sums. Patients without a stored trend
+    for a series yet get all their trends rebuilt from full history. Whenever
+    the eGFR fit changes - backfilled readings included - the patient's latest
+    KidneyMetrics row gets its progression fields rewritten.
+    """
+    readings = defaultdict(list)
+    for instance in instances:
+        for trend_type, (model, field) in SERIES.items():
+            value = getattr(instance, field, None)
+            if isinstance(instance, model) and value is not None:
+                readings[trend_type].append((instance.patient_id, _epoch(instance.timestamp), float(value), instance))
+    
+    if not readings:
+        return
+    
+    patient_ids = {patient_id for rows in readings.values() for patient_id, _, _, _ in rows}
+    with transaction.atomic():
+        stored = {}
+        for trend in (TrendAnalysis.objects.select_for_update()
+                      .filter(patient_id__in=patient_ids, trend_type__in=list(readings))
+                      .order_by('created_at')):
+            stored[(trend.patient_id, trend.trend_type)] = trend
+        
+        missing = {
+            patient_id for trend_type, rows in readings.items() for patient_id, _, _, _ in rows
+            if (patient_id, trend_type) not in stored
+        }
+        if missing:
+            # New rows are already saved, so a full refresh includes them
+            _, refreshed = _refresh_batch(list(missing))
+            # Keep the caller's instances in step with the rows just updated
+            refreshed = {metrics.pk: metrics for metrics in refreshed}
+            for instance in instances:
+                if isinstance(instance, KidneyMetrics) and instance.pk in refreshed:
+                    for field in PROGRESSION_FIELDS:
+                        setattr(instance, field, getattr(refreshed[instance.pk], field))
+        
+        changed = []
+        latest_metrics = []
+        for trend_type, rows in readings.items():
+            rows = [row for row in rows if row[0] not in missing]
+            if not rows:
+                continue
+            
+            trends = [stored[(patient_id, trend_type)] for patient_id in dict.fromkeys(row[0] for row in rows)]
+            index = {trend.patient_id: i for i, trend in enumerate(trends)}
+            groups = np.array([index[row[0]] for row in rows])
+            seconds = np.array([row[1] for row in rows])
+            values = np.array([row[2] for row in rows])
+            
+            t0 = np.array([_epoch(datetime.fromisoformat(trend.trend_data['t0'])) for trend in trends])
+            previous = np.array([[trend.trend_data[key] for key in STAT_KEYS] for trend in trends])
+            stats = previous + grouped_sums(groups, (seconds - t0[groups]) / SECONDS_PER_DAY, values, len(trends))
+            slope, intercept, r_squared = fit(stats)
+            latest = _latest_rows(groups, seconds)
+            
+            for i, trend in enumerate(trends):
+                data = trend.trend_data
+                last_at = _epoch(datetime.fromisoformat(data['last_at']))
+                last_value = data['last_value']
+                last_pk = data.get('last_pk')
+                newest = None
+                # Backfilled readings still count towards the fit, but don't replace the latest reading
+                row = latest[i]
+                if seconds[row] >= last_at:
+                    newest = rows[row][3]
+                    last_at, last_value, last_pk = seconds[row], values[row], newest.pk
+                elif trend_type == 'egfr':
+                    last_pk = last_pk or _latest_metrics_pk(trend.patient_id)
+                    newest = KidneyMetrics(pk=last_pk) if last_pk else None
+                
+                _apply_fit(trend, _trend_data(stats[i], t0[i], last_at, last_value, last_pk, slope[i], intercept[i]), slope[i], r_squared[i])
+                changed.append(trend)
+                if trend_type == 'egfr' and newest is not None:
+                    for field, value in progression(last_value, slope[i]).items():
+                        setattr(newest, field, value)
+                    latest_metrics.append(newest)
+        
+        if changed:
+            TrendAnalysis.objects.bulk_update(changed, TREND_FIELDS)
+        if latest_metrics:
+            KidneyMetrics.objects.bulk_update(latest_metrics, PROGRESSION_FIELDS)
\ No newline at end of file
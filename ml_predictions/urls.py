@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [
     path('model/metrics/', views.get_model_metrics, name='model-metrics'),
+    path('model/status/', views.get_model_status, name='model-status'),
+    path('predictions/batch/', views.batch_analyze_patients, name='batch-analyze-patients'),
+    path('jobs/<uuid:job_id>/', views.get_analysis_job, name='analysis-job'),
     path('patients/<uuid:patient_id>/predictions/history/', views.get_patient_prediction_history, name='patient-prediction-history'),
     path('patients/<uuid:patient_id>/analyze/', views.analyze_patient, name='analyze-patient'),
     path('patients/<uuid:patient_id>/prediction/', views.get_patient_prediction, name='patient-prediction'),
@@ -4,62 +4,42 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from patients.models import Patient
-from .models import MLPrediction
-from .ml_service import MLService
-from .serializers import MLPredictionSerializer
+from backend.cache import cached
+from .models import AnalysisJob, MLPrediction
+from .model_registry import get_ml_service, get_registry
+from .batch import score_patients, patients_with_kidney_metrics
+from .analysis import analyze_patient as run_analysis
+from .prediction_cache import prediction_cache
+from .jobs import enqueue_analysis, fail_stale_jobs
+from .serializers import AnalysisJobSerializer, MLPredictionSerializer
 import json
 import os
 from pathlib import Path
 
+def _wants_async(request):
+    """True when the caller asked for a queued job (?async=true or {"async": true})"""
+    value = request.query_params.get('async', request.data.get('async', False))
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_model_metrics(request):
     """Get ML model performance metrics"""
     try:
-        # Load model summary from saved file
-        base_dir = Path(__file__).resolve().parent.parent
-        model_summary_path = base_dir / 'ML' / 'models_and_scalers' / 'model_summary.json'
+        # Load the summary saved next to the artifacts of the served model
+        ml_service = get_ml_service()
+        model_summary_path = Path(ml_service.models_dir) / 'model_summary.json'
         
-        if model_summary_path.exists():
-            with open(model_summary_path, 'r') as f:
-                model_data = json.load(f)
-            
-            return Response({
-                'success': True,
-                'data': {
-                    'model_name': model_data.get('best_model'),
-                    'feature_selection': model_data.get('best_feature_set'),
-                    'n_features': model_data.get('n_features'),
-                    'selected_features': model_data.get('selected_features'),
-                    'performance': {
-                        'accuracy': round(model_data['performance']['accuracy'] * 100, 2),
-                        'precision': round(model_data['performance']['precision'] * 100, 2),
-                        'recall': round(model_data['performance']['recall'] * 100, 2),
-                        'f1_score': round(model_data['performance']['f1_score'] * 100, 2),
-                        'auc': round(model_data['performance']['auc'] * 100, 2)
-                    },
-                    'pca_analysis': model_data.get('pca_analysis'),
-                    'model_version': '2.0.0-PCA'
-                }
-            })
-        else:
-            # Fallback metrics if file not found
-            return Response({
-                'success': True,
-                'data': {
-                    'model_name': 'Gradient Boosting',
-                    'feature_selection': 'PCA-optimized',
-                    'n_features': 15,
-                    'performance': {
-                        'accuracy': 92.47,
-                        'precision': 94.03,
-                        'recall': 98.03,
-                        'f1_score': 95.99,
-                        'auc': 81.81
-                    },
-                    'model_version': '2.0.0-PCA'
-                }
-            })
+        # The model version and file mtime are part of the key, so a retrained model shows up immediately
+        version = str(model_summary_path.stat().st_mtime_ns) if model_summary_path.exists() else 'fallback'
+        data = cached('model_metrics', lambda: _load_model_metrics(model_summary_path, ml_service),
+                      params=f'{ml_service.model_version}:{version}')
+        return Response({
+            'success': True,
+            'data': data
+        })
             
     except Exception as e:
         return Response({
@@ -67,32 +47,142 @@ def get_model_metrics(request):
             'error': {'message': f'Failed to load model metrics: {str(e)}'}
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _load_model_metrics(model_summary_path, ml_service):
+    if model_summary_path.exists():
+        with open(model_summary_path, 'r') as f:
+            model_data = json.load(f)
+        
+        return {
+            'model_name': model_data.get('best_model'),
+            'feature_selection': model_data.get('best_feature_set'),
+            'n_features': model_data.get('n_features'),
+            'selected_features': model_data.get('selected_features'),
+            'performance': {
+                'accuracy': round(model_data['performance']['accuracy'] * 100, 2),
+                'precision': round(model_data['performance']['precision'] * 100, 2),
+                'recall': round(model_data['performance']['recall'] * 100, 2),
+                'f1_score': round(model_data['performance']['f1_score'] * 100, 2),
+                'auc': round(model_data['performance']['auc'] * 100, 2)
+            },
+            'pca_analysis': model_data.get('pca_analysis'),
+            'model_version': ml_service.model_version,
+            'bundle': _bundle_info(ml_service.manifest)
+        }
+    
+    # Fallback metrics if file not found
+    return {
+        'model_name': 'Gradient Boosting',
+        'feature_selection': 'PCA-optimized',
+        'n_features': 15,
+        'performance': {
+            'accuracy': 92.47,
+            'precision': 94.03,
+            'recall': 98.03,
+            'f1_score': 95.99,
+            'auc': 81.81
+        },
+        'model_version': ml_service.model_version,
+        'bundle': _bundle_info(ml_service.manifest)
+    }
+
+def _bundle_info(manifest):
+    if manifest is None:
+        return None
+    return {
+        'version': manifest['version'],
+        'content_hash': manifest['content_hash'],
+        'created_at': manifest['created_at'],
+        'training': manifest.get('training', {})
+    }
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_model_status(request):
+    """Get load-time, hot-reload and prediction cache counters of the shared ML model"""
+    registry = get_registry()
+    # Trigger the change check so the reported state is current
+    get_ml_service()
+    return Response({
+        'success': True,
+        'data': {
+            **registry.stats(),
+            'prediction_cache': prediction_cache.stats()
+        }
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def analyze_patient(request, patient_id):
     """Trigger ML analysis for a patient"""
     try:
         patient = get_object_or_404(Patient, id=patient_id)
-        ml_service = MLService()
         
-        prediction_result = ml_service.predict_ckd_risk(patient)
+        if _wants_async(request):
+            job = enqueue_analysis([patient.id], requested_by=request.user)[0]
+            return Response({
+                'success': True,
+                'data': AnalysisJobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
         
-        # Save prediction to database
-        prediction = MLPrediction.objects.create(
-            patient=patient,
-            prediction_result=prediction_result['result'],
-            confidence=prediction_result['confidence'],
-            predicted_stage=prediction_result['stage'],
-            risk_level=prediction_result['risk_level'],
-            input_data=prediction_result['input_metrics'],
-            recommendations=prediction_result['recommendations'],
-            model_version=prediction_result['model_version']
-        )
+        # Reuses the latest prediction when nothing changed since it was made
+        prediction, created = run_analysis(patient)
         
         serializer = MLPredictionSerializer(prediction)
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': serializer.data,
+            'meta': {'cached': not created}
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': {'message': str(e)}
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_analyze_patients(request):
+    """Score a set of patients (or all with kidney metrics) in chunks, or queue them as jobs"""
+    patient_ids = request.data.get('patient_ids') or []
+    score_all = bool(request.data.get('all', False))
+    chunk_size = request.data.get('chunk_size')
+    
+    if not score_all and not patient_ids:
+        return Response({
+            'success': False,
+            'error': {'message': 'Provide "patient_ids" or set "all" to true'}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        chunk_size = int(chunk_size) if chunk_size else None
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'error': {'message': '"chunk_size" must be a positive integer'}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        patients = patients_with_kidney_metrics()
+        if not score_all:
+            patients = Patient.objects.filter(id__in=patient_ids).order_by('pk')
+        
+        if _wants_async(request):
+            jobs = enqueue_analysis(
+                patients.values_list('pk', flat=True), requested_by=request.user, chunk_size=chunk_size
+            )
+            return Response({
+                'success': True,
+                'data': AnalysisJobSerializer(jobs, many=True).data,
+                'meta': {'jobs': len(jobs)}
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        summary = score_patients(patients, chunk_size=chunk_size)
+        return Response({
+            'success': True,
+            'data': summary
         }, status=status.HTTP_201_CREATED)
         
     except Exception as e:
@@ -101,26 +191,39 @@ def analyze_patient(request, patient_id):
             'error': {'message': str(e)}
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_analysis_job(request, job_id):
+    """Get the status (and result once finished) of a queued analysis job"""
+    fail_stale_jobs([job_id])
+    job = get_object_or_404(AnalysisJob.objects.select_related('prediction'), id=job_id)
+    return Response({
+        'success': True,
+        'data': AnalysisJobSerializer(job).data
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_patient_prediction(request, patient_id):
     """Get latest ML prediction for a patient"""
     try:
-        patient = get_object_or_404(Patient, id=patient_id)
-        prediction = MLPrediction.objects.filter(patient=patient).first()
+        def latest_prediction():
+            patient = get_object_or_404(Patient, id=patient_id)
+            prediction = MLPrediction.objects.filter(patient=patient).first()
+            return MLPredictionSerializer(prediction).data if prediction else None
         
-        if prediction:
-            serializer = MLPredictionSerializer(prediction)
+        data = cached('latest_prediction', latest_prediction, patient_id=patient_id)
+        if data:
             return Response({
                 'success': True,
-                'data': serializer.data
+                'data': data
             })
         else:
             return Response({
                 'success': False,
                 'error': {'message': 'No prediction found for this patient'}
             }, status=status.HTTP_404_NOT_FOUND)
-            
+    
     except Exception as e:
         return Response({
             'success': False,
@@ -144,7 +247,7 @@ def get_patient_prediction_history(request, patient_id):
                 'patient_id': str(patient_id)
             }
         })
-            
+    
     except Exception as e:
         return Response({
             'success': False,
@@ -0,0 +1,278 @@
+import time
+import uuid
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+from alerts.counters import recount_counters
+from alerts.models import Alert
+from backend.cache import invalidate_patients
+from medical_data.models import KidneyMetrics, LabResult, Medication, VitalSigns
+from ml_predictions.feature_store import VECTOR_FIELDS
+from ml_predictions.features import FEATURE_FIELDS
+from ml_predictions.models import PatientFeatureVector
+from ml_predictions.trends import refresh_trends
+from .models import MedicalHistory, Patient
+from .synthetic import stages
+
+# Import of the CKD clinical dataset (ML/Chronic_Kidney_Dsease_data.csv, one
+# row per patient). Each CSV chunk is mapped to model rows with column-wise
+# pandas operations and upserted with bulk_create.
+#
+# Row ids are uuid5 of the dataset's PatientID, so re-running the import
+# updates the same rows instead of adding patients. Readings keep the time of
+# their first import; alerts are only created once (acknowledgements stay).
+
+DEFAULT_PATH = 'ML/Chronic_Kidney_Dsease_data.csv'
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_BATCH_SIZE = 1000
+NAMESPACE = uuid.UUID('6f1c7a9e-2b1d-5c3e-9a47-0d8e2f6b4c15')
+REQUIRED_COLUMNS = ['PatientID', 'Age', 'Gender', 'SystolicBP', 'DiastolicBP', 'SerumCreatinine', 'GFR']
+
+# Dataset codebook
+GENDERS = {0: 'male', 1: 'female'}
+ETHNICITIES = {0: 'Caucasian', 1: 'African American', 2: 'Asian', 3: 'Other'}
+
+# Binary columns -> MedicalHistory entries
+CONDITION_COLUMNS = {
+    'Diagnosis': 'Chronic Kidney Disease',
+    'PreviousAcuteKidneyInjury': 'Acute Kidney Injury',
+    'UrinaryTractInfections': 'Urinary Tract Infections',
+}
+FAMILY_HISTORY_COLUMNS = {
+    'FamilyHistoryKidneyDisease': 'Kidney Disease',
+    'FamilyHistoryHypertension': 'Hypertension',
+    'FamilyHistoryDiabetes': 'Diabetes',
+}
+
+# Column -> (LabResult.test_name, unit, normal low, normal high, category)
+LAB_COLUMNS = {
+    'SerumCreatinine': ('Serum Creatinine', 'mg/dL', 0.6, 1.3, 'kidney'),
+    'BUNLevels': ('BUN', 'mg/dL', 7, 20, 'kidney'),
+    'ACR': ('Albumin/Creatinine Ratio', 'mg/g', 0, 30, 'urine'),
+    'FastingBloodSugar': ('Fasting Blood Sugar', 'mg/dL', 70, 99, 'blood'),
+    'HbA1c': ('HbA1c', '%', 4.0, 5.6, 'blood'),
+    'SerumElectrolytesSodium': ('Sodium', 'mmol/L', 135, 145, 'blood'),
+    'SerumElectrolytesPotassium': ('Potassium', 'mmol/L', 3.5, 5.1, 'blood'),
+    'SerumElectrolytesCalcium': ('Calcium', 'mg/dL', 8.5, 10.5, 'blood'),
+    'SerumElectrolytesPhosphorus': ('Phosphorus', 'mg/dL', 2.5, 4.5, 'blood'),
+    'HemoglobinLevels': ('Hemoglobin', 'g/dL', 12, 17.5, 'blood'),
+    'CholesterolTotal': ('Total Cholesterol', 'mg/dL', 120, 200, 'blood'),
+    'CholesterolLDL': ('LDL Cholesterol', 'mg/dL', 0, 130, 'blood'),
+    'CholesterolHDL': ('HDL Cholesterol', 'mg/dL', 40, 90, 'blood'),
+    'CholesterolTriglycerides': ('Triglycerides', 'mg/dL', 0, 150, 'blood'),
+}
+
+# Binary columns -> (Medication.name, dosage, frequency)
+MEDICATION_COLUMNS = {
+    'ACEInhibitors': ('ACE inhibitor', 'As prescribed', 'Once daily'),
+    'Diuretics': ('Diuretic', 'As prescribed', 'Once daily'),
+    'NSAIDsUse': ('NSAID', 'As needed', 'As needed'),
+    'Statins': ('Statin', 'As prescribed', 'Once daily'),
+    'AntidiabeticMedications': ('Antidiabetic medication', 'As prescribed', 'As prescribed'),
+}
+
+# Fields refreshed when a row is imported again (readings keep their first-import time)
+UPDATE_FIELDS = {
+    Patient: ['first_name', 'last_name', 'gender', 'ethnicity', 'email'],
+    MedicalHistory: ['conditions', 'family_history'],
+    KidneyMetrics: ['egfr', 'creatinine', 'proteinuria', 'systolic_bp', 'diastolic_bp', 'stage'],
+    VitalSigns: ['systolic_bp', 'diastolic_bp'],
+    LabResult: ['value', 'unit', 'reference_range', 'is_abnormal', 'category'],
+    Medication: ['name', 'dosage', 'frequency', 'is_active'],
+}
+
+class DatasetError(ValueError):
+    pass
+
+def row_ids(keys, kind):
+    """Stable uuid5 per source key and row kind"""
+    return [uuid.uuid5(NAMESPACE, f'{kind}:{key}') for key in keys]
+
+def _flags(chunk, columns):
+    """Per row, the labels of the binary columns that are set"""
+    present = [column for column in columns if column in chunk]
+    if not present:
+        return [[] for _ in range(len(chunk))]
+    labels = np.array([columns[column] for column in present], dtype=object)
+    mask = chunk[present].fillna(0).to_numpy() == 1
+    return [labels[row].tolist() for row in mask]
+
+def map_chunk(chunk, now):
+    """Model rows for one CSV chunk: {model: DataFrame of field values}"""
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk]
+    if missing:
+        raise DatasetError(f"Dataset is missing columns: {', '.join(missing)}")
+    
+    chunk = chunk.drop_duplicates('PatientID', keep='last').reset_index(drop=True)
+    keys = chunk['PatientID'].astype('int64').astype(str)
+    patient_ids = pd.Series(row_ids(keys, 'patient'))
+    egfr = chunk['GFR'].astype(float).round(2)
+    stage = stages(egfr.to_numpy())
+    systolic = chunk['SystolicBP'].round().astype('int64')
+    diastolic = chunk['DiastolicBP'].round().astype('int64')
+    rows = {}
+    
+    rows[Patient] = pd.DataFrame({
+        'id': patient_ids,
+        'first_name': 'Patient' + keys,
+        'last_name': 'Sample',
+        'date_of_birth': [now.date() - timedelta(days=365 * age) for age in chunk['Age'].astype('int64').tolist()],
+        'gender': chunk['Gender'].map(GENDERS).fillna('other'),
+        'ethnicity': chunk['Ethnicity'].map(ETHNICITIES) if 'Ethnicity' in chunk else None,
+        'email': 'patient' + keys + '@example.com',
+    })
+    
+    rows[MedicalHistory] = pd.DataFrame({
+        'patient_id': patient_ids,
+        'conditions': _flags(chunk, CONDITION_COLUMNS),
+        'family_history': _flags(chunk, FAMILY_HISTORY_COLUMNS),
+    })
+    
+    rows[KidneyMetrics] = pd.DataFrame({
+        'id': row_ids(keys, 'metrics'),
+        'patient_id': patient_ids,
+        'timestamp': now,
+        'egfr': egfr,
+        'creatinine': chunk['SerumCreatinine'].astype(float).round(2),
+        'proteinuria': chunk['ProteinInUrine'].round(2) if 'ProteinInUrine' in chunk else None,
+        'systolic_bp': systolic,
+        'diastolic_bp': diastolic,
+        'stage': stage,
+    })
+    
+    rows[VitalSigns] = pd.DataFrame({
+        'id': row_ids(keys, 'vitals'),
+        'patient_id': patient_ids,
+        'timestamp': now,
+        'systolic_bp': systolic,
+        'diastolic_bp': diastolic,
+    })
+    
+    # One LabResult per (patient, lab column) with a value
+    columns = [column for column in LAB_COLUMNS if column in chunk]
+    labs = chunk[columns].assign(patient_id=patient_ids, key=keys).melt(
+        id_vars=['patient_id', 'key'], var_name='column', value_name='value'
+    ).dropna(subset=['value'])
+    spec = pd.DataFrame.from_dict(
+        LAB_COLUMNS, orient='index', columns=['test_name', 'unit', 'low', 'high', 'category']
+    )
+    labs = labs.join(spec, on='column')
+    rows[LabResult] = pd.DataFrame({
+        'id': row_ids(labs['key'] + ':' + labs['column'], 'lab'),
+        'patient_id': labs['patient_id'].to_numpy(),
+        'test_name': labs['test_name'].to_numpy(),
+        'value': labs['value'].round(4).to_numpy(),
+        'unit': labs['unit'].to_numpy(),
+        'reference_range': (labs['low'].astype(str) + '-' + labs['high'].astype(str)).to_numpy(),
+        'test_date': now,
+        'is_abnormal': ((labs['value'] < labs['low']) | (labs['value'] > labs['high'])).to_numpy(),
+        'category': labs['category'].to_numpy(),
+    })
+    
+    # One Medication per flagged medication column
+    columns = [column for column in MEDICATION_COLUMNS if column in chunk]
+    medications = chunk[columns].assign(patient_id=patient_ids, key=keys).melt(
+        id_vars=['patient_id', 'key'], var_name='column', value_name='taken'
+    )
+    spec = pd.DataFrame.from_dict(MEDICATION_COLUMNS, orient='index', columns=['name', 'dosage', 'frequency'])
+    medications = medications[medications['taken'] == 1].join(spec, on='column')
+    rows[Medication] = pd.DataFrame({
+        'id': row_ids(medications['key'] + ':' + medications['column'], 'medication'),
+        'patient_id': medications['patient_id'].to_numpy(),
+        'name': medications['name'].to_numpy(),
+        'dosage': medications['dosage'].to_numpy(),
+        'frequency': medications['frequency'].to_numpy(),
+        'start_date': now.date(),
+        'is_active': True,
+    })
+    
+    critical = egfr < 30
+    rows[Alert] = pd.DataFrame({
+        'id': row_ids(keys[critical], 'alert:egfr_critical'),
+        'patient_id': patient_ids[critical].to_numpy(),
+        'type': 'critical',
+        'title': 'Critical eGFR Level',
+        'message': [f'Patient eGFR is {value:.1f}, indicating severe kidney dysfunction' for value in egfr[critical]],
+        'priority': 'critical',
+        'priority_rank': Alert.PRIORITY_RANKS['critical'],
+        'category': 'lab',
+    })
+    
+    # Model features are dataset columns of the same name, including those no
+    # raw observation carries (BMI, DietQuality, symptoms)
+    features = [feature for feature in FEATURE_FIELDS if feature in chunk]
+    vectors = chunk[features].astype(float).rename(columns=FEATURE_FIELDS)
+    observed = now.isoformat()
+    vectors['patient_id'] = patient_ids
+    vectors['observed_at'] = [
+        {feature: observed for feature, value in zip(features, values) if not np.isnan(value)}
+        for values in chunk[features].astype(float).to_numpy()
+    ]
+    vectors['updated_at'] = now
+    rows[PatientFeatureVector] = vectors
+    return rows
+
+def _records(frame):
+    records = frame.to_dict('records')
+    for record in records:
+        for name, value in record.items():
+            if isinstance(value, float) and np.isnan(value):
+                record[name] = None
+    return records
+
+def save_chunk(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Upsert one mapped chunk in a single transaction; returns rows written"""
+    written = 0
+    with transaction.atomic():
+        for model, frame in rows.items():
+            objects = [model(**record) for record in _records(frame)]
+            if model is Alert:
+                # Never reset an alert someone already acknowledged
+                model.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+            elif model is PatientFeatureVector:
+                model.objects.bulk_create(
+                    objects, batch_size=batch_size,
+                    update_conflicts=True, unique_fields=['patient'], update_fields=VECTOR_FIELDS
+                )
+            else:
+                model.objects.bulk_create(
+                    objects, batch_size=batch_size,
+                    update_conflicts=True,
+                    unique_fields=['patient'] if model is MedicalHistory else ['id'],
+                    update_fields=UPDATE_FIELDS[model]
+                )
+            written += len(objects)
+    return written
+
+def import_dataset(path=DEFAULT_PATH, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                   limit=None, progress=None):
+    """Stream the CSV in chunks, map and upsert each; returns import stats
+    
+    `progress`, if given, is called with the running stats after each chunk.
+    Rows bypass save() and signals, so trends are fitted per chunk and alert
+    counters and cached responses are refreshed once at the end.
+    """
+    now = timezone.now()
+    started = time.monotonic()
+    stats = {'patients': 0, 'rows': 0, 'seconds': 0.0, 'patients_per_second': 0.0, 'rows_per_second': 0.0}
+    
+    for chunk in pd.read_csv(path, chunksize=chunk_size, nrows=limit):
+        rows = map_chunk(chunk, now)
+        stats['rows'] += save_chunk(rows, batch_size)
+        # Progression fields and TrendAnalysis come from the trend fit, not the CSV
+        refresh_trends(rows[Patient]['id'].tolist())
+        stats['patients'] += len(rows[Patient])
+        elapsed = max(time.monotonic() - started, 1e-9)
+        stats.update(
+            seconds=round(elapsed, 3),
+            patients_per_second=round(stats['patients'] / elapsed, 1),
+            rows_per_second=round(stats['rows'] / elapsed, 1),
+        )
+        if progress:
+            progress(stats)
+    
+    recount_counters()
+    invalidate_patients([], include_lists=True)
+    return stats
\ No newline at end of file
@@ -1,21 +1,45 @@
-from django.core.management.base import BaseCommand
+import multiprocessing
+import time
+from collections import deque
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.utils import timezone
 from patients.models import Patient, MedicalHistory
 from medical_data.models import KidneyMetrics, LabResult, Medication, VitalSigns
 from ml_predictions.models import MLPrediction, RiskFactor, TrendAnalysis
 from alerts.models import Alert, Notification
+from alerts.counters import recount_counters
+from ml_predictions.feature_store import refresh_feature_vectors
+from ml_predictions.trends import refresh_trends
+from backend.cache import invalidate_patients
+from patients.synthetic import MEDICATIONS, RISK_FACTORS, generate_chunk
 from datetime import datetime, timedelta, date
 import random
 from faker import Faker
 
 fake = Faker()
 
+# Insert order for --bulk (parents first)
+BULK_MODELS = [Patient, MedicalHistory, KidneyMetrics, VitalSigns, LabResult, Medication, RiskFactor, MLPrediction, Alert]
+
 class Command(BaseCommand):
     help = 'Create comprehensive fake data for CKD Digital Twin Dashboard'
     
     def add_arguments(self, parser):
         parser.add_argument('--patients', type=int, default=20, help='Number of patients to create')
         parser.add_argument('--clear', action='store_true', help='Clear existing data first')
+        
+        bulk = parser.add_argument_group('high-volume mode')
+        bulk.add_argument('--bulk', action='store_true',
+                          help='Generate rows in memory (see patients/synthetic.py) and insert with bulk_create')
+        bulk.add_argument('--workers', type=int, default=1, help='Processes generating rows (--bulk)')
+        bulk.add_argument('--seed', type=int, default=None, help='Seed for reproducible data (--bulk, default random)')
+        bulk.add_argument('--chunk-size', type=int, default=500, help='Patients generated and inserted per transaction (--bulk)')
+        bulk.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT (--bulk)')
+        bulk.add_argument('--metrics', type=int, default=24, help='Monthly kidney metrics per patient (--bulk)')
+        bulk.add_argument('--vitals', type=int, default=30, help='Vital signs per patient over 90 days (--bulk)')
+        bulk.add_argument('--labs', type=int, default=20, help='Lab results per patient (--bulk)')
     
     def handle(self, *args, **options):
         if options['clear']:
@@ -30,8 +54,13 @@ class Command(BaseCommand):
             User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
             self.stdout.write('Created admin user')
         
+        if options['bulk']:
+            return self.handle_bulk(num_patients, options)
+        
+        patient_ids = []
         for i in range(num_patients):
             patient = self.create_patient()
+            patient_ids.append(patient.id)
             self.create_medical_history(patient)
             self.create_kidney_metrics(patient)
             self.create_lab_results(patient)
@@ -43,8 +72,82 @@ class Command(BaseCommand):
             
             self.stdout.write(f'Created patient {i+1}: {patient.first_name} {patient.last_name}')
         
+        # Build the ML feature store rows and trends for the new patients
+        refresh_feature_vectors(patient_ids)
+        refresh_trends(patient_ids)
+        
         self.stdout.write(self.style.SUCCESS(f'Successfully created {num_patients} patients with complete data'))
     
+    def handle_bulk(self, num_patients, options):
+        """Generate patients in chunks (across --workers processes) and bulk insert each chunk
+        
+        Rows bypass save() and signals: alert counters, feature vectors, trends
+        and the response cache are brought up to date afterwards, and no alert rules
+        run or live events are sent for the generated observations.
+        """
+        for name in ('workers', 'chunk_size', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+        
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        chunk_size = options['chunk_size']
+        sizes = {name: max(options[name], 0) for name in ('metrics', 'vitals', 'labs')}
+        now = timezone.now()
+        tasks = [
+            (seed, index, min(chunk_size, num_patients - start), now, sizes)
+            for index, start in enumerate(range(0, num_patients, chunk_size))
+        ]
+        self.stdout.write(f'Seed {seed}, {len(tasks)} chunks, {options["workers"]} worker(s)')
+        
+        started = time.monotonic()
+        created = 0
+        inserted = 0
+        for rows in self.generate_chunks(tasks, options['workers']):
+            inserted += self.insert_chunk(rows, options['batch_size'])
+            patient_ids = [row['id'] for row in rows['Patient']]
+            refresh_feature_vectors(patient_ids)
+            refresh_trends(patient_ids)
+            created += len(patient_ids)
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{created}/{num_patients} patients, {inserted} rows ({inserted / elapsed:.0f} rows/s)')
+        
+        recount_counters()
+        invalidate_patients([], include_lists=True)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully created {created} patients ({inserted} rows) in {time.monotonic() - started:.1f}s'
+        ))
+    
+    def generate_chunks(self, tasks, workers):
+        """Yield generated chunks in order, keeping at most two per worker in flight"""
+        if workers == 1:
+            yield from map(generate_chunk, tasks)
+            return
+        
+        # Workers never use the database; don't let them inherit open connections
+        connections.close_all()
+        with multiprocessing.Pool(workers) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(generate_chunk, (task,)))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+    
+    def insert_chunk(self, rows, batch_size):
+        inserted = 0
+        with transaction.atomic():
+            for model in BULK_MODELS:
+                objects = [model(**row) for row in rows[model.__name__]]
+                if model is Alert:
+                    # Normally set in Alert.save()
+                    for alert in objects:
+                        alert.priority_rank = Alert.PRIORITY_RANKS[alert.priority]
+                model.objects.bulk_create(objects, batch_size=batch_size)
+                inserted += len(objects)
+        return inserted
+    
     def create_patient(self):
         gender = random.choice(['male', 'female'])
         first_name = fake.first_name_male() if gender == 'male' else fake.first_name_female()
@@ -118,11 +221,7 @@ class Command(BaseCommand):
                 proteinuria=round(random.uniform(0, 3.0), 2),
                 systolic_bp=random.randint(110, 180),
                 diastolic_bp=random.randint(70, 110),
-                stage=stage,
-                trend=random.choice(['improving', 'stable', 'declining']),
-                rate_of_change=round(random.uniform(-5, 5), 2),
-                predicted_stage=min(5, stage + random.randint(0, 1)),
-                time_to_next_stage=random.randint(30, 365) if stage < 5 else None
+                stage=stage
             )
     
     def create_lab_results(self, patient):
@@ -163,17 +262,8 @@ class Command(BaseCommand):
             )
     
     def create_medications(self, patient):
-        medications = [
-            ('Lisinopril', '10mg', 'Once daily'),
-            ('Metformin', '500mg', 'Twice daily'),
-            ('Amlodipine', '5mg', 'Once daily'),
-            ('Atorvastatin', '20mg', 'Once daily'),
-            ('Furosemide', '40mg', 'Once daily'),
-            ('Metoprolol', '50mg', 'Twice daily'),
-        ]
-        
         for i in range(random.randint(2, 5)):
-            name, dosage, frequency = random.choice(medications)
+            name, dosage, frequency = random.choice(MEDICATIONS)
             
             Medication.objects.create(
                 patient=patient,
@@ -240,17 +330,8 @@ class Command(BaseCommand):
             )
     
     def create_risk_factors(self, patient):
-        risk_factors = [
-            ('Age', 'medical', 'Age is a significant risk factor for CKD progression'),
-            ('Hypertension', 'medical', 'High blood pressure can damage kidney blood vessels'),
-            ('Diabetes', 'medical', 'Diabetes is the leading cause of kidney disease'),
-            ('Smoking', 'lifestyle', 'Smoking reduces blood flow to the kidneys'),
-            ('Obesity', 'lifestyle', 'Excess weight increases risk of diabetes and hypertension'),
-            ('Family History', 'genetic', 'Genetic predisposition to kidney disease'),
-        ]
-        
         for i in range(random.randint(2, 4)):
-            factor_name, factor_type, description = random.choice(risk_factors)
+            factor_name, factor_type, description = random.choice(RISK_FACTORS)
             
             RiskFactor.objects.create(
                 patient=patient,
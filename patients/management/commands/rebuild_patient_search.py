@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from patients.search import install_search_schema, rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Install the patient search index if missing and repopulate it from the patients table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias')
+    
+    def handle(self, *args, **options):
+        using = options['database']
+        if not install_search_schema(using):
+            raise CommandError('Patient search index is not supported on this database')
+        rebuild_search_index(using)
+        self.stdout.write(self.style.SUCCESS('Patient search index rebuilt'))
\ No newline at end of file
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from backend.cache import invalidate_patients
+from .models import MedicalHistory, Patient
+from .search import install_search_schema
+
+@receiver([post_save, post_delete], sender=Patient)
+def invalidate_patient_cache(sender, instance, **kwargs):
+    """Patient rows appear in the detail and list responses"""
+    invalidate_patients([instance.pk], include_lists=True)
+
+@receiver([post_save, post_delete], sender=MedicalHistory)
+def invalidate_medical_history_cache(sender, instance, **kwargs):
+    invalidate_patients([instance.patient_id], include_lists=True)
+
+@receiver(post_migrate)
+def create_search_index(sender, using='default', **kwargs):
+    """The search index is raw SQL (FTS5 / pg_trgm), so it is installed after migrate"""
+    if sender.name == 'patients':
+        install_search_schema(using)
\ No newline at end of file
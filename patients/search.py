@@ -0,0 +1,177 @@
+import re
+from django.db import connections
+from django.db.models import Q
+from .models import Patient
+
+SEARCH_TABLE = 'patient_search'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# A query of only 1-2 character prefixes can match most of the table; it is
+# ranked within its first CANDIDATE_LIMIT matches so latency stays flat, while
+# longer (selective) terms rank every match
+SHORT_PREFIX = 2
+CANDIDATE_LIMIT = 1000
+
+# SQLite: FTS5 index with prefix indexes for typeahead, kept current by triggers.
+# Its rowid mirrors patients.rowid so updates and deletes are index lookups.
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        patient_id UNINDEXED, first_name, last_name, email,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON patients BEGIN
+        INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, patient_id, first_name, last_name, email)
+        VALUES (new.rowid, new.id, new.first_name, new.last_name, coalesce(new.email, ''));
+    END""",
+    # Delete + insert rather than INSERT OR REPLACE: an upsert into patients
+    # (bulk_create with update_conflicts) overrides the trigger's REPLACE
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_update
+    AFTER UPDATE OF first_name, last_name, email ON patients BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.rowid;
+        INSERT INTO {SEARCH_TABLE} (rowid, patient_id, first_name, last_name, email)
+        VALUES (new.rowid, new.id, new.first_name, new.last_name, coalesce(new.email, ''));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON patients BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.rowid;
+    END""",
+]
+
+# PostgreSQL: trigram GIN index for substring matches of 3+ characters and
+# pattern-ops btree indexes for 1-2 character typeahead prefixes
+SEARCH_DOCUMENT = "lower(first_name || ' ' || last_name || ' ' || coalesce(email, ''))"
+POSTGRES_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS patients_search_trgm ON patients USING gin (({SEARCH_DOCUMENT}) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS patients_first_name_prefix ON patients (lower(first_name) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS patients_last_name_prefix ON patients (lower(last_name) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS patients_email_prefix ON patients (lower(coalesce(email, '')) text_pattern_ops)",
+]
+
+_available = {}
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+def install_search_schema(using='default'):
+    """Create the search index for this database if missing (idempotent)"""
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT count(*) FROM sqlite_master WHERE name = %s", [SEARCH_TABLE]
+                )
+                created = cursor.fetchone()[0] == 0
+                for statement in SQLITE_SCHEMA:
+                    cursor.execute(statement)
+                if created:
+                    rebuild_search_index(using)
+            elif connection.vendor == 'postgresql':
+                for statement in POSTGRES_SCHEMA:
+                    cursor.execute(statement)
+            else:
+                return False
+    except Exception as e:
+        # e.g. SQLite without FTS5 or no privilege to create pg_trgm: search falls back to icontains
+        print(f"Patient search index not installed: {e}")
+        _available[using] = False
+        return False
+    
+    _available[using] = True
+    return True
+
+def rebuild_search_index(using='default'):
+    """Repopulate the SQLite FTS table from patients (e.g. after VACUUM renumbered rowids)"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(f"""
+            INSERT INTO {SEARCH_TABLE} (rowid, patient_id, first_name, last_name, email)
+            SELECT rowid, id, first_name, last_name, coalesce(email, '') FROM patients
+        """)
+
+def search_available(using='default'):
+    if using not in _available:
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = %s", [SEARCH_TABLE])
+            elif connection.vendor == 'postgresql':
+                cursor.execute("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+            else:
+                _available[using] = False
+                return False
+            _available[using] = cursor.fetchone()[0] > 0
+    return _available[using]
+
+def _candidate_window(terms):
+    """Matches to rank: bounded for broad short prefixes, else all (None)"""
+    return CANDIDATE_LIMIT if all(len(term) <= SHORT_PREFIX for term in terms) else None
+
+def _sqlite_ids(cursor, terms, limit):
+    # Every term is a prefix query: "jo smi" -> "jo"* "smi"*
+    match = ' '.join(f'"{term}"*' for term in terms)
+    window = _candidate_window(terms)
+    # bm25 is ranked with a top-N sort before the outer limit applies
+    cursor.execute(f"""
+        SELECT patient_id FROM (
+            SELECT patient_id, bm25({SEARCH_TABLE}, 0.0, 10.0, 10.0, 2.0) AS score
+            FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s LIMIT %s
+        ) ORDER BY score LIMIT %s
+    """, [match, window or -1, limit])
+    return [row[0] for row in cursor.fetchall()]
+
+def _postgres_ids(cursor, terms, limit):
+    conditions, params = [], []
+    for term in terms:
+        if len(term) >= 3:
+            conditions.append(f"{SEARCH_DOCUMENT} LIKE %s")
+            params.append(f'%{term}%')
+        else:
+            conditions.append(
+                "(lower(first_name) LIKE %s OR lower(last_name) LIKE %s OR lower(coalesce(email, '')) LIKE %s)"
+            )
+            params.extend([f'{term}%'] * 3)
+    
+    # Names starting with the first term rank above mid-word matches
+    cursor.execute(f"""
+        SELECT id FROM (
+            SELECT id,
+                   (lower(first_name) LIKE %s OR lower(last_name) LIKE %s) AS prefix_match,
+                   similarity({SEARCH_DOCUMENT}, %s) AS score
+            FROM patients WHERE {' AND '.join(conditions)} LIMIT %s
+        ) candidates ORDER BY prefix_match DESC, score DESC LIMIT %s
+    """, [f'{terms[0]}%', f'{terms[0]}%', ' '.join(terms), *params, _candidate_window(terms), limit])
+    return [row[0] for row in cursor.fetchall()]
+
+def search_patients(query, limit=DEFAULT_LIMIT, using='default'):
+    """Ranked patients matching every word of `query` as a name/email prefix or substring"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    patients = Patient.objects.using(using).select_related('medical_history')
+    
+    if not search_available(using):
+        # No search index on this database: bounded icontains scan
+        for term in terms:
+            patients = patients.filter(
+                Q(first_name__icontains=term) | Q(last_name__icontains=term) | Q(email__icontains=term)
+            )
+        return list(patients.order_by('last_name', 'first_name')[:limit])
+    
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            ids = _sqlite_ids(cursor, terms, limit)
+        else:
+            ids = _postgres_ids(cursor, terms, limit)
+    
+    # Raw ids are in the backend's storage format; normalize through the field
+    id_field = Patient._meta.pk
+    ids = [id_field.to_python(patient_id) for patient_id in ids]
+    by_id = patients.in_bulk(ids)
+    return [by_id[patient_id] for patient_id in ids if patient_id in by_id]
@@ -0,0 +1,359 @@
+import uuid
+from datetime import timedelta
+import numpy as np
+from faker import Faker
+
+# Row generation for `create_fake_data --bulk`. Everything here is plain
+# Python/numpy (no ORM), so chunks can be built in worker processes and
+# handed back as picklable rows; the command turns them into model instances
+# and inserts them with bulk_create.
+#
+# Chunk output depends only on (seed, chunk index), never on which worker
+# built it or how many workers ran, so a seed always reproduces the same data.
+
+ETHNICITIES = ['Caucasian', 'African American', 'Hispanic', 'Asian', 'Other']
+CONDITIONS = ['Hypertension', 'Diabetes Type 2', 'Heart Disease', 'Chronic Kidney Disease', 'Obesity', 'High Cholesterol']
+ALLERGIES = ['Penicillin', 'Shellfish', 'Nuts', 'Latex', 'Aspirin']
+FAMILY_HISTORY = ['Kidney Disease', 'Diabetes', 'Hypertension', 'Heart Disease']
+
+MEDICATIONS = [
+    ('Lisinopril', '10mg', 'Once daily'),
+    ('Metformin', '500mg', 'Twice daily'),
+    ('Amlodipine', '5mg', 'Once daily'),
+    ('Atorvastatin', '20mg', 'Once daily'),
+    ('Furosemide', '40mg', 'Once daily'),
+    ('Metoprolol', '50mg', 'Twice daily'),
+]
+
+RISK_FACTORS = [
+    ('Age', 'medical', 'Age is a significant risk factor for CKD progression'),
+    ('Hypertension', 'medical', 'High blood pressure can damage kidney blood vessels'),
+    ('Diabetes', 'medical', 'Diabetes is the leading cause of kidney disease'),
+    ('Smoking', 'lifestyle', 'Smoking reduces blood flow to the kidneys'),
+    ('Obesity', 'lifestyle', 'Excess weight increases risk of diabetes and hypertension'),
+    ('Family History', 'genetic', 'Genetic predisposition to kidney disease'),
+]
+
+# Lab panel: test -> (unit, normal low, normal high, category)
+LAB_TESTS = {
+    'Serum Creatinine': ('mg/dL', 0.6, 1.3, 'kidney'),
+    'BUN': ('mg/dL', 7, 20, 'kidney'),
+    'Potassium': ('mmol/L', 3.5, 5.1, 'blood'),
+    'Hemoglobin': ('g/dL', 12, 17.5, 'blood'),
+    'HbA1c': ('%', 4.0, 5.6, 'blood'),
+    'Glucose': ('mg/dL', 70, 99, 'blood'),
+    'HDL Cholesterol': ('mg/dL', 40, 90, 'blood'),
+    'Total Cholesterol': ('mg/dL', 120, 200, 'blood'),
+    'Protein in Urine': ('mg/dL', 0, 14, 'urine'),
+}
+LAB_NAMES = list(LAB_TESTS)
+
+# Latest eGFR is drawn per stage: share of patients and eGFR range of stages 1-5
+STAGE_MIX = [0.15, 0.30, 0.35, 0.12, 0.08]
+STAGE_EGFR = [(90, 120), (60, 90), (30, 60), (15, 30), (6, 15)]
+# eGFR lower bound of stages 1-4 (below the last is stage 5)
+STAGE_LIMITS = [90, 60, 30, 15]
+# Share of patients losing eGFR several times faster than the typical 1-2 per year
+RAPID_PROGRESSORS = 0.1
+
+def chunk_rng(seed, index):
+    return np.random.default_rng(np.random.SeedSequence([seed, index]))
+
+_name_pools = {}
+
+def name_pools(seed):
+    """Faker-made names and addresses, built once per process and seed
+    
+    Calling Faker per field is what makes the row-by-row mode slow; rows pick
+    from these pools with the chunk's numpy generator instead.
+    """
+    if seed not in _name_pools:
+        fake = Faker('en_US')
+        fake.seed_instance(seed)
+        _name_pools[seed] = {
+            'male': [fake.first_name_male() for _ in range(300)],
+            'female': [fake.first_name_female() for _ in range(300)],
+            'last': [fake.last_name() for _ in range(1000)],
+            'street': [fake.street_name() for _ in range(500)],
+            'city': [fake.city() for _ in range(300)],
+            'state': [fake.state_abbr() for _ in range(50)],
+        }
+    return _name_pools[seed]
+
+def stages(egfr):
+    return 5 - np.digitize(egfr, STAGE_LIMITS[::-1])
+
+def creatinine_for(egfr, age, female):
+    """Serum creatinine giving this eGFR under the 2021 CKD-EPI equation"""
+    kappa = np.where(female, 0.7, 0.9)
+    alpha = np.where(female, -0.241, -0.302)
+    scale = egfr / (142 * 0.9938 ** age * np.where(female, 1.012, 1.0))
+    # Above kappa the equation uses exponent -1.2, below it alpha
+    return kappa * np.where(scale < 1, scale ** (-1 / 1.2), scale ** (1 / alpha))
+
+def _uuids(rng, count):
+    return [uuid.UUID(bytes=bytes(row), version=4) for row in rng.integers(0, 256, (count, 16), dtype=np.uint8)]
+
+def _times(now, days_ago):
+    return [now - timedelta(days=days) for days in days_ago.tolist()]
+
+def generate_chunk(task):
+    """Rows for one chunk of patients: {model name: [field dicts]}
+    
+    `task` is (seed, chunk index, patients, now, sizes) with sizes holding
+    'metrics' (monthly kidney metrics), 'vitals' (readings over 90 days) and
+    'labs' (results over the metrics period) per patient.
+    
+    Each patient gets a latest eGFR, a yearly slope (rapid progressors lose
+    eGFR several times faster) and a blood pressure, weight and HbA1c
+    baseline. Readings follow that course with noise, and creatinine, BUN,
+    potassium, hemoglobin, proteinuria and glucose are derived from eGFR or
+    the baselines, so stages, trends, labs and alerts agree with each other.
+    """
+    seed, index, count, now, sizes = task
+    rng = chunk_rng(seed, index)
+    pools = name_pools(seed)
+    today = now.date()
+    rows = {name: [] for name in (
+        'Patient', 'MedicalHistory', 'KidneyMetrics', 'VitalSigns', 'LabResult',
+        'Medication', 'RiskFactor', 'MLPrediction', 'Alert',
+    )}
+    
+    # Patient baselines
+    patient_ids = _uuids(rng, count)
+    female = rng.random(count) < 0.5
+    age = rng.integers(25, 86, count)
+    stage_now = rng.choice(5, count, p=STAGE_MIX)
+    low, high = np.array(STAGE_EGFR).T
+    egfr_now = rng.uniform(low[stage_now], high[stage_now])
+    slope = np.where(rng.random(count) < RAPID_PROGRESSORS, rng.normal(-6, 2, count), rng.normal(-1.5, 1.5, count))
+    systolic_base = rng.normal(126 + 5 * stage_now, 12)
+    diastolic_base = 0.5 * systolic_base + rng.normal(14, 5, count)
+    diabetic = rng.random(count) < 0.25 + 0.05 * stage_now
+    hba1c_base = np.where(diabetic, rng.normal(7.6, 0.9, count), rng.normal(5.3, 0.3, count))
+    height = np.where(female, rng.normal(162, 7, count), rng.normal(176, 7, count))
+    weight_base = np.clip(rng.normal(27, 5, count) * (height / 100) ** 2, 42, 180)
+    # Daily weight drift (kg), larger with advanced disease (fluid retention)
+    weight_drift = rng.normal(0, 0.01, count) + 0.01 * (stage_now >= 3)
+    hdl = np.clip(rng.normal(np.where(female, 55, 45), 10), 20, 100)
+    
+    first_names = [
+        pools['female'][i] if is_female else pools['male'][i]
+        for i, is_female in zip(rng.integers(0, 300, count).tolist(), female.tolist())
+    ]
+    last_names = [pools['last'][i] for i in rng.integers(0, 1000, count).tolist()]
+    birth_offsets = (age * 365 + rng.integers(0, 365, count)).tolist()
+    
+    for i, patient_id in enumerate(patient_ids):
+        email_name = f'{first_names[i]}.{last_names[i]}'.lower().replace(' ', '')
+        rows['Patient'].append({
+            'id': patient_id,
+            'first_name': first_names[i],
+            'last_name': last_names[i],
+            'date_of_birth': today - timedelta(days=birth_offsets[i]),
+            'gender': 'female' if female[i] else 'male',
+            'ethnicity': ETHNICITIES[rng.integers(len(ETHNICITIES))],
+            'email': f'{email_name}.{patient_id.hex[:6]}@example.com',
+            'phone': f'{rng.integers(200, 1000)}-{rng.integers(200, 1000)}-{rng.integers(0, 10000):04d}',
+            'street': f'{rng.integers(1, 9999)} {pools["street"][rng.integers(500)]}',
+            'city': pools['city'][rng.integers(300)],
+            'state': pools['state'][rng.integers(50)],
+            'zip_code': f'{rng.integers(501, 99951):05d}',
+            'country': 'USA',
+        })
+        conditions = set(rng.choice(CONDITIONS, rng.integers(0, 3), replace=False).tolist())
+        conditions.add('Chronic Kidney Disease')
+        if diabetic[i]:
+            conditions.add('Diabetes Type 2')
+        if systolic_base[i] > 140:
+            conditions.add('Hypertension')
+        rows['MedicalHistory'].append({
+            'patient_id': patient_id,
+            'conditions': sorted(conditions),
+            'allergies': rng.choice(ALLERGIES, rng.integers(0, 3), replace=False).tolist(),
+            'family_history': rng.choice(FAMILY_HISTORY, rng.integers(0, 3), replace=False).tolist(),
+        })
+    
+    # Kidney metrics: one per month back from today, following the patient's slope
+    months = sizes['metrics']
+    if months:
+        days_ago = np.arange(months) * 30 + rng.uniform(0, 3, (count, months))
+        years_ago = days_ago / 365
+        egfr = egfr_now[:, None] - slope[:, None] * years_ago
+        egfr = np.clip(egfr * rng.normal(1, 0.04, egfr.shape), 5, 150)
+        creatinine = np.clip(creatinine_for(egfr, (age[:, None] - years_ago), female[:, None]), 0.3, 25)
+        stage = stages(egfr)
+        proteinuria = np.clip(0.05 * np.exp(0.55 * stage) * rng.lognormal(0, 0.4, egfr.shape), 0, 9999)
+        systolic = np.rint(systolic_base[:, None] + rng.normal(0, 8, egfr.shape)).astype(int)
+        diastolic = np.rint(diastolic_base[:, None] + rng.normal(0, 6, egfr.shape)).astype(int)
+        next_year = stages(np.clip(egfr + slope[:, None], 5, 150))
+        # Days until eGFR falls to the lower bound of the current stage
+        stage_floor = np.array(STAGE_LIMITS + [0])[stage - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            to_next = np.where((slope[:, None] < 0) & (stage < 5), (egfr - stage_floor) / -slope[:, None] * 365, np.nan)
+        trend = np.where(slope > 1, 'improving', np.where(slope < -1, 'declining', 'stable'))
+        
+        egfr, creatinine, proteinuria = (np.round(values, 2).tolist() for values in (egfr, creatinine, proteinuria))
+        stage, next_year, systolic, diastolic = (values.tolist() for values in (stage, next_year, systolic, diastolic))
+        to_next = np.where(np.isnan(to_next), -1, np.minimum(to_next, 3650)).astype(int).tolist()
+        rate_of_change = np.round(np.clip(slope, -99, 99), 2).tolist()
+        for i, patient_id in enumerate(patient_ids):
+            for timestamp, j in zip(_times(now, days_ago[i]), range(months)):
+                rows['KidneyMetrics'].append({
+                    'patient_id': patient_id,
+                    'timestamp': timestamp,
+                    'egfr': egfr[i][j],
+                    'creatinine': creatinine[i][j],
+                    'proteinuria': proteinuria[i][j],
+                    'systolic_bp': systolic[i][j],
+                    'diastolic_bp': diastolic[i][j],
+                    'stage': stage[i][j],
+                    'trend': trend[i],
+                    'rate_of_change': rate_of_change[i],
+                    'predicted_stage': max(stage[i][j], next_year[i][j]),
+                    'time_to_next_stage': to_next[i][j] if to_next[i][j] >= 0 else None,
+                })
+    
+    # Vital signs at random times over the last 90 days
+    readings = sizes['vitals']
+    if readings:
+        days_ago = np.sort(rng.uniform(0, 90, (count, readings)), axis=1)
+        systolic = np.rint(systolic_base[:, None] + rng.normal(0, 9, days_ago.shape)).astype(int).tolist()
+        diastolic = np.rint(diastolic_base[:, None] + rng.normal(0, 6, days_ago.shape)).astype(int).tolist()
+        heart_rate = np.rint(np.clip(rng.normal(74, 9, days_ago.shape), 38, 180)).astype(int).tolist()
+        # Celsius, about 1% of readings febrile
+        temperature = rng.normal(36.8, 0.25, days_ago.shape) + (rng.random(days_ago.shape) < 0.01) * rng.uniform(1.2, 2.6, days_ago.shape)
+        temperature = np.round(temperature, 1).tolist()
+        weight = np.round(weight_base[:, None] - weight_drift[:, None] * days_ago + rng.normal(0, 0.5, days_ago.shape), 2).tolist()
+        heights = np.round(height, 2).tolist()
+        for i, patient_id in enumerate(patient_ids):
+            for j, timestamp in enumerate(_times(now, days_ago[i])):
+                rows['VitalSigns'].append({
+                    'patient_id': patient_id,
+                    'timestamp': timestamp,
+                    'systolic_bp': systolic[i][j],
+                    'diastolic_bp': diastolic[i][j],
+                    'heart_rate': heart_rate[i][j],
+                    'temperature': temperature[i][j],
+                    'weight': weight[i][j],
+                    'height': heights[i],
+                })
+    
+    # Lab results over the metrics period, derived from the eGFR at that time
+    results = sizes['labs']
+    if results:
+        shape = (count, results)
+        days_ago = rng.uniform(0, max(months, 1) * 30, shape)
+        egfr = np.clip((egfr_now[:, None] - slope[:, None] * days_ago / 365) * rng.normal(1, 0.04, shape), 5, 150)
+        test = rng.integers(0, len(LAB_NAMES), shape)
+        hba1c = hba1c_base[:, None] + rng.normal(0, 0.2, shape)
+        values = np.select([test == LAB_NAMES.index(name) for name in LAB_NAMES], [
+            creatinine_for(egfr, age[:, None], female[:, None]),
+            (8 + 900 / egfr) * rng.normal(1, 0.1, shape),
+            4.1 + np.clip(45 - egfr, 0, None) * 0.03 + rng.normal(0, 0.3, shape),
+            np.where(female, 13.5, 15)[:, None] - np.clip(60 - egfr, 0, None) * 0.06 + rng.normal(0, 0.6, shape),
+            hba1c,
+            (28.7 * hba1c - 46.7) * rng.normal(1, 0.08, shape),
+            hdl[:, None] + rng.normal(0, 4, shape),
+            rng.normal(190, 30, shape),
+            5 * np.exp(0.5 * stages(egfr)) * rng.lognormal(0, 0.4, shape),
+        ])
+        values = np.round(np.clip(values, 0, 99999), 2).tolist()
+        test = test.tolist()
+        for i, patient_id in enumerate(patient_ids):
+            for j, test_date in enumerate(_times(now, days_ago[i])):
+                name = LAB_NAMES[test[i][j]]
+                unit, normal_low, normal_high, category = LAB_TESTS[name]
+                value = values[i][j]
+                rows['LabResult'].append({
+                    'patient_id': patient_id,
+                    'test_name': name,
+                    'value': value,
+                    'unit': unit,
+                    'reference_range': f'{normal_low}-{normal_high}',
+                    'test_date': test_date,
+                    'is_abnormal': not normal_low <= value <= normal_high,
+                    'category': category,
+                })
+    
+    for i, patient_id in enumerate(patient_ids):
+        for choice in rng.choice(len(MEDICATIONS), rng.integers(2, 6), replace=False).tolist():
+            name, dosage, frequency = MEDICATIONS[choice]
+            active = rng.random() < 0.75
+            rows['Medication'].append({
+                'patient_id': patient_id,
+                'name': name,
+                'dosage': dosage,
+                'frequency': frequency,
+                'start_date': today - timedelta(days=int(rng.integers(30, 730))),
+                'end_date': None if active else today - timedelta(days=int(rng.integers(0, 30))),
+                'is_active': active,
+                'notes': '',
+            })
+        for choice in rng.choice(len(RISK_FACTORS), rng.integers(2, 5), replace=False).tolist():
+            name, factor_type, description = RISK_FACTORS[choice]
+            rows['RiskFactor'].append({
+                'patient_id': patient_id,
+                'factor_name': name,
+                'factor_type': factor_type,
+                'impact_score': round(float(rng.uniform(20, 90)), 2),
+                'description': description,
+                'is_modifiable': factor_type in ['lifestyle', 'medical'],
+            })
+    
+    # Prediction and alerts from each patient's latest kidney metrics
+    if months:
+        risk_levels = ['low', 'medium', 'high', 'critical']
+        for i, patient_id in enumerate(patient_ids):
+            latest = rows['KidneyMetrics'][i * months]
+            stage_i = latest['stage']
+            recommendations = []
+            if stage_i >= 3:
+                recommendations.extend([
+                    'Regular nephrology follow-up recommended',
+                    'Monitor blood pressure closely',
+                    'Consider dietary protein restriction'
+                ])
+            if stage_i >= 4:
+                recommendations.extend([
+                    'Prepare for renal replacement therapy',
+                    'Discuss dialysis options'
+                ])
+            rows['MLPrediction'].append({
+                'patient_id': patient_id,
+                'prediction_result': f'CKD Stage {stage_i}',
+                'confidence': round(float(rng.uniform(75, 95)), 2),
+                'predicted_stage': stage_i,
+                'risk_level': risk_levels[min(stage_i - 1, 3)],
+                'input_data': {
+                    'age': int(age[i]),
+                    'egfr': latest['egfr'],
+                    'creatinine': latest['creatinine'],
+                    'blood_pressure': f"{latest['systolic_bp']}/{latest['diastolic_bp']}"
+                },
+                'recommendations': recommendations,
+                'model_version': '1.0.0',
+            })
+            
+            if latest['egfr'] < 30:
+                rows['Alert'].append({
+                    'patient_id': patient_id,
+                    'type': 'critical',
+                    'title': 'Critical eGFR Level',
+                    'message': f"Patient eGFR is {latest['egfr']}, indicating severe kidney dysfunction",
+                    'priority': 'critical',
+                    'category': 'lab',
+                    'acknowledged': bool(rng.random() < 0.5),
+                })
+            if latest['systolic_bp'] > 160:
+                rows['Alert'].append({
+                    'patient_id': patient_id,
+                    'type': 'warning',
+                    'title': 'High Blood Pressure',
+                    'message': f"Systolic BP is {latest['systolic_bp']} mmHg - requires attention",
+                    'priority': 'high',
+                    'category': 'vital',
+                    'acknowledged': bool(rng.random() < 0.5),
+                })
+    
+    return rows
\ No newline at end of file
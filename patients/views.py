@@ -1,8 +1,9 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from backend.cache import ALL_PATIENTS, cached
 from .models import Patient
+from .search import DEFAULT_LIMIT, MAX_LIMIT, search_patients
 from .serializers import PatientSerializer, PatientCreateSerializer
 
 class PatientViewSet(viewsets.ModelViewSet):
@@ -20,18 +21,21 @@ class PatientViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def search(self, request):
-        query = request.query_params.get('q', '')
+        query = request.query_params.get('q', '').strip()
         if query:
-            patients = self.queryset.filter(
-                Q(first_name__icontains=query) |
-                Q(last_name__icontains=query) |
-                Q(email__icontains=query)
-            )
+            try:
+                limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+            except ValueError:
+                limit = DEFAULT_LIMIT
+            limit = max(1, min(limit, MAX_LIMIT))
+            
+            # Ranked, prefix-matching lookup on the search index (see patients/search.py)
+            patients = search_patients(query, limit=limit)
             serializer = self.get_serializer(patients, many=True)
             return Response({
                 'success': True,
                 'data': serializer.data,
-                'meta': {'query': query, 'count': len(serializer.data)}
+                'meta': {'query': query, 'count': len(serializer.data), 'limit': limit}
             })
         return Response({
             'success': False,
@@ -39,25 +43,30 @@ class PatientViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
+        list_patients = super().list
+        # Any patient write retires every cached page (see patients/receivers.py)
+        data = cached('patient_list', lambda: list_patients(request, *args, **kwargs).data,
+                      patient_id=ALL_PATIENTS, params=request.get_full_path())
         return Response({
             'success': True,
-            'data': response.data['results'] if 'results' in response.data else response.data,
+            'data': data['results'] if 'results' in data else data,
             'meta': {
                 'pagination': {
                     'page': int(request.query_params.get('page', 1)),
-                    'count': response.data.get('count', len(response.data)),
-                    'next': response.data.get('next'),
-                    'previous': response.data.get('previous')
+                    'count': data.get('count', len(data)),
+                    'next': data.get('next'),
+                    'previous': data.get('previous')
                 }
             }
         })
     
     def retrieve(self, request, *args, **kwargs):
-        response = super().retrieve(request, *args, **kwargs)
+        retrieve_patient = super().retrieve
+        data = cached('patient_detail', lambda: retrieve_patient(request, *args, **kwargs).data,
+                      patient_id=kwargs.get(self.lookup_field))
         return Response({
             'success': True,
-            'data': response.data
+            'data': data
         })
     
     def create(self, request, *args, **kwargs):